@@ -0,0 +1,135 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure the memory and time the parser spends on holders.
+
+Loads every test blueprint of the repository, and a generated type library
+of the size of a large plugin catalog, into holders. Then looks up every key
+of every dict holder, as the parser does, and restores the holders to plain
+values. For each document set, reports the number of holders, the time of
+each step and the peak memory growth of loading, measured in a separate
+process.
+
+    python benchmarks/holders.py [--types 2000]
+"""
+
+import os
+import gc
+import time
+import argparse
+import resource
+import multiprocessing
+
+from dsl_parser import yaml_loader
+from dsl_parser.holder import Holder
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _test_blueprints():
+    blueprints = []
+    for directory, _, filenames in os.walk(ROOT):
+        if '.git' in directory:
+            continue
+        for filename in filenames:
+            if filename.endswith('.yaml'):
+                with open(os.path.join(directory, filename)) as f:
+                    blueprints.append((filename, f.read()))
+    return blueprints
+
+
+def _type_library(types):
+    lines = ['tosca_definitions_version: cloudify_dsl_1_3', 'node_types:']
+    for i in range(types):
+        lines.extend([
+            '    type_{0}:'.format(i),
+            '        derived_from: cloudify.nodes.Root',
+            '        properties:',
+            '            name: {{default: "type_{0}", type: string}}'
+            .format(i),
+            '            size: {default: 10, type: integer}',
+            '        interfaces:',
+            '            cloudify.interfaces.lifecycle:',
+            '                create:',
+            '                    implementation: plugin.tasks.create',
+            '                    inputs:',
+            '                        args: {default: [1, 2, 3]}',
+        ])
+    return [('types.yaml', '\n'.join(lines))]
+
+
+def _holders(holder):
+    stack = [holder]
+    while stack:
+        holder = stack.pop()
+        yield holder
+        if isinstance(holder.value, dict):
+            stack.extend(holder.value.iterkeys())
+            stack.extend(holder.value.itervalues())
+        elif isinstance(holder.value, (list, set)):
+            stack.extend(holder.value)
+
+
+def _measure(documents, results):
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    loaded = [yaml_loader.load(content, filename)
+              for filename, content in documents]
+    load_time = time.time() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    holders = [holder for document in loaded if isinstance(document, Holder)
+               for holder in _holders(document)]
+
+    start = time.time()
+    for holder in holders:
+        if isinstance(holder.value, dict):
+            for key_holder in holder.value.keys():
+                holder.get_item(key_holder.value)
+    lookup_time = time.time() - start
+
+    start = time.time()
+    for document in loaded:
+        if isinstance(document, Holder):
+            document.restore()
+    restore_time = time.time() - start
+    results.put((len(holders), load_time, lookup_time, restore_time,
+                 rss_after - rss_before))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--types', type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    print '{0:>16} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10}'.format(
+        'documents', 'holders', 'load ms', 'lookup ms', 'restore ms',
+        'rss KB')
+    for name, documents in [('test blueprints', _test_blueprints()),
+                            ('type library', _type_library(args.types))]:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_measure,
+                                          args=(documents, results))
+        process.start()
+        holders, load_time, lookup_time, restore_time, rss = results.get()
+        process.join()
+        print '{0:>16} {1:>10} {2:>10.1f} {3:>10.1f} {4:>10.1f} {5:>10}'\
+            .format(name, holders, load_time * 1000, lookup_time * 1000,
+                    restore_time * 1000, rss)
+
+
+if __name__ == '__main__':
+    main()
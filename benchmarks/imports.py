@@ -0,0 +1,112 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure parsing blueprints importing many files over http.
+
+The synthetic blueprints import plugin files served by a local http server
+adding a fixed latency to each response, each plugin importing a shared
+types file. For each number of imports, parses the blueprint in a separate
+process, reporting the parsing time.
+
+    python benchmarks/imports.py [--sizes 1,4,12,32] [--latency 0.1]
+"""
+
+import time
+import argparse
+import threading
+import multiprocessing
+import BaseHTTPServer
+import SocketServer
+
+from dsl_parser import parser
+
+
+TYPES = """
+node_types:
+    cloudify.nodes.Root: {}
+"""
+
+PLUGIN = """
+imports:
+    -   http://localhost:{port}/types.yaml
+node_types:
+    plugin_{index}.nodes.Server:
+        derived_from: cloudify.nodes.Root
+"""
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def _serve(latency):
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            name = self.path.strip('/')
+            if name == 'types.yaml':
+                body = TYPES
+            else:
+                index = int(name[len('plugin_'):-len('.yaml')])
+                body = PLUGIN.format(port=server.server_port, index=index)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = _Server(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def _measure(size, latency, results):
+    server = _serve(latency)
+    blueprint = 'tosca_definitions_version: cloudify_dsl_1_3\nimports:\n'
+    blueprint += ''.join(
+        '    -   http://localhost:{0}/plugin_{1}.yaml\n'.format(
+            server.server_port, index) for index in range(size))
+    blueprint += 'node_templates:\n    server:\n'
+    blueprint += '        type: plugin_0.nodes.Server\n'
+    start = time.time()
+    parser.parse(blueprint)
+    elapsed = time.time() - start
+    server.shutdown()
+    results.put(elapsed)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='1,4,12,32')
+    arg_parser.add_argument('--latency', type=float, default=0.1)
+    args = arg_parser.parse_args()
+
+    print '{0:>10} {1:>10}'.format('imports', 'parse s')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_measure,
+                                          args=(size, args.latency, results))
+        process.start()
+        elapsed = results.get()
+        process.join()
+        print '{0:>10} {1:>10.2f}'.format(size, elapsed)
+
+
+if __name__ == '__main__':
+    main()
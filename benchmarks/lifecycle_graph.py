@@ -0,0 +1,172 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure building the task graphs of the lifecycle workflows.
+
+The synthetic deployments hold servers, each with eight applications
+contained in it, all connected to a single database. For each size, builds
+the graph installing all the instances, and the graphs installing and
+uninstalling a tenth of the servers with their contents, where the rest of
+the instances are intact related instances. Each graph is built in a
+separate process, without executing it, reporting the build time and the
+peak memory growth.
+
+    python benchmarks/lifecycle_graph.py [--sizes 1000,10000,50000]
+"""
+
+import os
+import gc
+import time
+import shutil
+import tempfile
+import argparse
+import resource
+import multiprocessing
+
+from cloudify.plugins import lifecycle
+from cloudify.workflows import local
+from cloudify.workflows.workflow_context import CloudifyWorkflowContext
+
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_3
+node_types:
+    cloudify.nodes.Root:
+        interfaces:
+            cloudify.interfaces.lifecycle:
+                create: {{}}
+                configure: {{}}
+                start: {{}}
+                stop: {{}}
+                delete: {{}}
+            cloudify.interfaces.validation:
+                creation: {{}}
+                deletion: {{}}
+            cloudify.interfaces.monitoring:
+                start: {{}}
+                stop: {{}}
+relationships:
+    cloudify.relationships.depends_on:
+        source_interfaces:
+            cloudify.interfaces.relationship_lifecycle: &operations
+                preconfigure: {{}}
+                postconfigure: {{}}
+                establish: {{}}
+                unlink: {{}}
+        target_interfaces:
+            cloudify.interfaces.relationship_lifecycle: *operations
+        properties:
+            connection_type:
+                default: all_to_all
+    cloudify.relationships.contained_in:
+        derived_from: cloudify.relationships.depends_on
+    cloudify.relationships.connected_to:
+        derived_from: cloudify.relationships.depends_on
+node_templates:
+    db:
+        type: cloudify.nodes.Root
+    server:
+        type: cloudify.nodes.Root
+        instances:
+            deploy: {servers}
+    app:
+        type: cloudify.nodes.Root
+        instances:
+            deploy: 8
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: server
+            -   type: cloudify.relationships.connected_to
+                target: db
+"""
+
+SCENARIOS = ['install', 'install 10%', 'uninstall 10%']
+
+
+def _workflow_context(size, directory):
+    blueprint_path = os.path.join(directory, 'blueprint.yaml')
+    with open(blueprint_path, 'w') as f:
+        f.write(BLUEPRINT.format(servers=max(size // 9, 1)))
+    env = local.init_env(blueprint_path)
+    return CloudifyWorkflowContext({
+        'local': True,
+        'storage': env.storage,
+        'deployment_id': env.name,
+        'blueprint_id': env.name,
+        'execution_id': 'benchmark',
+        'workflow_id': 'benchmark'
+    })
+
+
+def _split(ctx):
+    servers = sorted(ctx.get_node('server').instances,
+                     key=lambda instance: instance.id)
+    modified = set(servers[:max(len(servers) // 10, 1)])
+    for server in list(modified):
+        modified.update(server.contained_instances)
+    intact = set(ctx.node_instances) - modified
+    return modified, intact
+
+
+def _measure(size, scenario, results):
+    directory = tempfile.mkdtemp()
+    try:
+        ctx = _workflow_context(size, directory)
+    finally:
+        shutil.rmtree(directory)
+    graph = ctx.graph_mode()
+    # only the graph construction is measured
+    graph.execute = lambda: None
+    if scenario == 'install':
+        modified, intact = set(ctx.node_instances), set()
+    else:
+        modified, intact = _split(ctx)
+    processor = lifecycle.LifecycleProcessor(graph=graph,
+                                             node_instances=modified,
+                                             related_nodes=intact)
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    if scenario.startswith('uninstall'):
+        processor.uninstall()
+    else:
+        processor.install()
+    elapsed = time.time() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((len(modified) + len(intact), elapsed,
+                 len(list(graph.tasks_iter())), rss_after - rss_before))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='1000,10000,50000')
+    args = arg_parser.parse_args()
+
+    print '{0:>10} {1:>14} {2:>10} {3:>10} {4:>10}'.format(
+        'instances', 'scenario', 'build s', 'tasks', 'rss MB')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        for scenario in SCENARIOS:
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_measure,
+                                              args=(size, scenario, results))
+            process.start()
+            instances, elapsed, tasks, rss = results.get()
+            process.join()
+            print '{0:>10} {1:>14} {2:>10.2f} {3:>10} {4:>10.1f}'.format(
+                instances, scenario, elapsed, tasks, rss / 1024.0)
+
+
+if __name__ == '__main__':
+    main()
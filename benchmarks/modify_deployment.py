@@ -0,0 +1,136 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure planning scale operations of large deployments.
+
+The synthetic deployments hold hosts, each with an application server and
+an agent contained in it, a database all the application servers are
+connected to and a scaling group of a host and its contents. Hosts make
+a tenth of the instances. For each size, plans scaling the group out and
+in by one and scaling the hosts out by one, each in a separate process,
+reporting the planning time and the peak memory growth.
+
+    python benchmarks/modify_deployment.py [--sizes 1000,10000,50000]
+"""
+
+import gc
+import time
+import argparse
+import resource
+import multiprocessing
+
+from dsl_parser import parser
+from dsl_parser import multi_instance
+
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_3
+node_types:
+    host: {{}}
+    app: {{}}
+    agent: {{}}
+    db: {{}}
+relationships:
+    cloudify.relationships.depends_on:
+        properties:
+            connection_type:
+                default: all_to_all
+    cloudify.relationships.contained_in:
+        derived_from: cloudify.relationships.depends_on
+    cloudify.relationships.connected_to:
+        derived_from: cloudify.relationships.depends_on
+node_templates:
+    db:
+        type: db
+    host:
+        type: host
+    app:
+        type: app
+        instances:
+            deploy: 8
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: host
+            -   type: cloudify.relationships.connected_to
+                target: db
+    agent:
+        type: agent
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: host
+groups:
+    tier:
+        members: [host]
+policies:
+    tier_policy:
+        type: cloudify.policies.scaling
+        properties:
+            default_instances: {hosts}
+        targets: [tier]
+"""
+
+SCENARIOS = [
+    ('group +1', lambda hosts: {'tier': {'instances': hosts + 1}}),
+    ('group -1', lambda hosts: {'tier': {'instances': hosts - 1}}),
+    ('node +1', lambda hosts: {'app': {'instances': 9}}),
+]
+
+
+def _deployment(size):
+    hosts = max(size // 10, 2)
+    plan = parser.parse(BLUEPRINT.format(hosts=hosts))
+    return hosts, multi_instance.create_deployment_plan(plan)
+
+
+def _measure(size, scenario, results):
+    hosts, plan = _deployment(size)
+    modified_nodes = dict(SCENARIOS)[scenario](hosts)
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    modification = multi_instance.modify_deployment(
+        nodes=plan['nodes'],
+        previous_nodes=plan['nodes'],
+        previous_node_instances=plan['node_instances'],
+        modified_nodes=modified_nodes,
+        scaling_groups=plan['scaling_groups'])
+    elapsed = time.time() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    changed = sum(len(instances) for instances in modification.values())
+    results.put((len(plan['node_instances']), elapsed, changed,
+                 rss_after - rss_before))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='1000,10000,50000')
+    args = arg_parser.parse_args()
+
+    print '{0:>10} {1:>10} {2:>10} {3:>10} {4:>10}'.format(
+        'instances', 'scenario', 'plan s', 'changed', 'rss MB')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        for scenario, _ in SCENARIOS:
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_measure,
+                                              args=(size, scenario, results))
+            process.start()
+            instances, elapsed, changed, rss = results.get()
+            process.join()
+            print '{0:>10} {1:>10} {2:>10.2f} {3:>10} {4:>10.1f}'.format(
+                instances, scenario, elapsed, changed, rss / 1024.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure parsing blueprints from paths.
+
+Parses each of the blueprints of the test suite a number of times,
+reporting the total parsing time of all of them, then parses synthetic
+blueprints of node templates related to each other and of data types,
+reporting the parsing time of each size. Each
+measurement runs in a separate process.
+
+    python benchmarks/parse_blueprints.py [--repeat 20] [--sizes 200,500,1000]
+"""
+
+import os
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+from dsl_parser import parser
+
+
+BLUEPRINTS = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'cloudify', 'tests', 'resources',
+    'blueprints')
+
+SYNTHETIC = """
+tosca_definitions_version: cloudify_dsl_1_3
+data_types:
+    type_0:
+        properties:
+            key: {{}}
+{data_types}
+node_types:
+    server:
+        properties:
+            port:
+                type: integer
+                default: 80
+relationships:
+    cloudify.relationships.depends_on: {{}}
+    cloudify.relationships.connected_to:
+        derived_from: cloudify.relationships.depends_on
+node_templates:
+    node_0:
+        type: server
+{node_templates}
+"""
+
+DATA_TYPE = """
+    type_{index}:
+        derived_from: type_0
+        properties:
+            key_{index}:
+                type: type_0
+                required: false
+"""
+
+NODE_TEMPLATE = """
+    node_{index}:
+        type: server
+        relationships:
+            -   type: cloudify.relationships.connected_to
+                target: node_{previous}
+"""
+
+
+def _parse(paths, repeat, results):
+    try:
+        start = time.time()
+        for _ in range(repeat):
+            for path in paths:
+                parser.parse_from_path(path)
+        results.put(time.time() - start)
+    except Exception as e:
+        results.put(e)
+
+
+def _measure(paths, repeat):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_parse,
+                                      args=(paths, repeat, results))
+    process.start()
+    elapsed = results.get()
+    process.join()
+    if isinstance(elapsed, Exception):
+        raise elapsed
+    return elapsed
+
+
+def _test_suite_blueprints():
+    paths = []
+    for path in sorted(glob.glob(os.path.join(BLUEPRINTS, '*.yaml'))):
+        try:
+            parser.parse_from_path(path)
+        except Exception:
+            # blueprints requiring inputs or resources
+            continue
+        paths.append(path)
+    return paths
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--sizes', default='200,500,1000')
+    args = arg_parser.parse_args()
+
+    paths = _test_suite_blueprints()
+    print '{0:>20} {1:>10}'.format('blueprints', 'parse s')
+    print '{0:>20} {1:>10.2f}'.format(
+        '{0} x {1}'.format(len(paths), args.repeat),
+        _measure(paths, args.repeat))
+
+    directory = tempfile.mkdtemp()
+    try:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            path = os.path.join(directory, 'blueprint_{0}.yaml'.format(size))
+            with open(path, 'w') as f:
+                f.write(SYNTHETIC.format(
+                    data_types=''.join(
+                        DATA_TYPE.format(index=index)
+                        for index in range(1, size)),
+                    node_templates=''.join(
+                        NODE_TEMPLATE.format(index=index, previous=index - 1)
+                        for index in range(1, size))))
+            print '{0:>20} {1:>10.2f}'.format(
+                '{0} types, nodes'.format(size), _measure([path], 1))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure validating and processing the intrinsic functions of a plan.
+
+The synthetic blueprints hold node templates with a deep properties tree
+of plain values, a few get_input and get_property calls, and an operation
+whose inputs use get_attribute. For each size, validates the functions of
+the parsed plan and processes them as preparing a deployment plan does,
+each in a separate process, reporting both times and the peak memory
+growth.
+
+    python benchmarks/plan_functions.py [--sizes 100,1000,2000]
+"""
+
+import gc
+import time
+import argparse
+import resource
+import multiprocessing
+
+from dsl_parser import functions
+from dsl_parser import parser
+from dsl_parser import tasks
+
+
+HEADER = """
+tosca_definitions_version: cloudify_dsl_1_3
+inputs:
+    port:
+        default: 8080
+node_types:
+    type:
+        properties:
+            port: {}
+            settings: {}
+node_templates:
+"""
+
+NODE_TEMPLATE = """
+    node_{index}:
+        type: type
+        properties:
+            port: {{get_input: port}}
+            settings:
+                name: node_{index}
+                levels: &levels_{index}
+                    -   a: 1
+                        b: [1, 2, 3, {{c: 4, d: [5, 6]}}]
+                        e: {{f: {{g: {{h: {{i: value}}}}}}}}
+                    -   a: 2
+                        b: [7, 8, 9, {{c: 10, d: [11, 12]}}]
+                        e: {{f: {{g: {{h: {{i: value}}}}}}}}
+                copy: {{get_property: [SELF, port]}}
+        interfaces:
+            interface:
+                op:
+                    implementation: plugin.task
+                    inputs:
+                        levels: *levels_{index}
+                        address: {{get_attribute: [SELF, address]}}
+"""
+
+
+def _plan(size):
+    blueprint = HEADER + ''.join(NODE_TEMPLATE.format(index=index)
+                                 for index in range(size))
+    blueprint += """
+plugins:
+    plugin:
+        executor: central_deployment_agent
+        install: false
+"""
+    return parser.parse(blueprint)
+
+
+def _measure(size, results):
+    plan = _plan(size)
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    functions.validate_functions(plan)
+    validated = time.time()
+    tasks._process_functions(plan)
+    processed = time.time()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((validated - start, processed - validated,
+                 rss_after - rss_before))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='100,1000,2000')
+    args = arg_parser.parse_args()
+
+    print '{0:>10} {1:>10} {2:>10} {3:>10}'.format(
+        'nodes', 'validate s', 'process s', 'rss MB')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_measure,
+                                          args=(size, results))
+        process.start()
+        validate, process_, rss = results.get()
+        process.join()
+        print '{0:>10} {1:>10.2f} {2:>10.2f} {3:>10.1f}'.format(
+            size, validate, process_, rss / 1024.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure preparing deployment plans of blueprints with large properties.
+
+The synthetic blueprints hold ten node templates, each with a large
+properties payload, a few intrinsic functions and as many instances as
+needed to reach the requested deployment size, all connected to a single
+database. For each size, parses the
+blueprint and then prepares the deployment plan in a separate process,
+reporting the preparation time and the peak memory growth. The peak left by
+parsing is reset through /proc, so this only runs on Linux.
+
+    python benchmarks/prepare_deployment.py [--sizes 1000,5000]
+        [--payload 5000]
+"""
+
+import gc
+import time
+import argparse
+import resource
+import multiprocessing
+
+from dsl_parser import parser
+from dsl_parser import tasks
+
+
+NODE_TEMPLATES = 10
+
+HEADER = """
+tosca_definitions_version: cloudify_dsl_1_3
+inputs:
+    port:
+        default: 8080
+node_types:
+    type:
+        properties:
+            port: {}
+            payload: {}
+relationships:
+    cloudify.relationships.depends_on:
+        properties:
+            connection_type:
+                default: all_to_all
+    cloudify.relationships.connected_to:
+        derived_from: cloudify.relationships.depends_on
+node_templates:
+    db:
+        type: type
+        properties:
+            port: 5432
+            payload: []
+"""
+
+NODE_TEMPLATE = """
+    node_{index}:
+        type: type
+        instances:
+            deploy: {instances}
+        properties:
+            port: {{get_input: port}}
+            payload: *payload
+        relationships:
+            -   type: cloudify.relationships.connected_to
+                target: db
+"""
+
+
+def _blueprint(size, payload):
+    # the payload is written once and referenced by every node template
+    lines = [HEADER.replace(
+        'payload: {}',
+        'payload:\n                default: &payload\n' + ''.join(
+            '                    - {{key: key_{0}, value: [1, 2, 3]}}\n'
+            .format(i) for i in range(payload)), 1)]
+    instances = max(size // NODE_TEMPLATES, 1)
+    for index in range(NODE_TEMPLATES):
+        lines.append(NODE_TEMPLATE.format(index=index, instances=instances))
+    return ''.join(lines)
+
+
+def _reset_peak_rss():
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def _measure(size, payload, results):
+    plan = parser.parse(_blueprint(size, payload))
+    gc.collect()
+    _reset_peak_rss()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    deployment_plan = tasks.prepare_deployment_plan(plan)
+    elapsed = time.time() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((len(deployment_plan['node_instances']), elapsed,
+                 rss_after - rss_before))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='1000,5000')
+    arg_parser.add_argument('--payload', type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    print '{0:>10} {1:>10} {2:>10}'.format('instances', 'prepare s',
+                                           'rss MB')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_measure,
+                                          args=(size, args.payload, results))
+        process.start()
+        instances, elapsed, rss = results.get()
+        process.join()
+        print '{0:>10} {1:>10.2f} {2:>10.1f}'.format(
+            instances, elapsed, rss / 1024.0)
+
+
+if __name__ == '__main__':
+    main()
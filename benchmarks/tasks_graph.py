@@ -0,0 +1,217 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measure building and executing large task dependency graphs.
+
+The graphs are shaped like the ones of the built-in lifecycle workflows:
+a subgraph per node instance, holding a sequence of tasks, with subgraphs
+depending on the subgraphs of the instances they are related to. Tasks
+succeed as soon as they are sent. Each size is measured in a separate
+process, reporting build and execution time and the peak memory growth.
+
+The graphs are measured both with TaskDependencyGraph and with a reference
+copy of its previous networkx based storage, to compare the two.
+
+    python benchmarks/tasks_graph.py [--sizes 10000,50000,100000]
+                                     [--graphs compact,networkx]
+"""
+
+import gc
+import time
+import random
+import argparse
+import resource
+import multiprocessing
+
+import networkx as nx
+
+from cloudify.workflows import tasks
+from cloudify.workflows.tasks_graph import SubgraphTask, TaskDependencyGraph
+
+
+TASKS_PER_SUBGRAPH = 10
+RELATIONSHIPS_PER_SUBGRAPH = 2
+
+
+class _Task(tasks.WorkflowTask):
+
+    def __init__(self):
+        super(_Task, self).__init__(workflow_context=None)
+        self.async_result = tasks.StubAsyncResult()
+
+    def apply_async(self):
+        self.set_state(tasks.TASK_SUCCEEDED)
+
+    def is_local(self):
+        return True
+
+    @property
+    def name(self):
+        return 'task'
+
+    @property
+    def cloudify_context(self):
+        return {}
+
+
+class _NetworkxTaskDependencyGraph(TaskDependencyGraph):
+    """TaskDependencyGraph, storing the tasks in a networkx DiGraph as it
+    did before the compact adjacency index"""
+
+    def __init__(self, workflow_context):
+        super(_NetworkxTaskDependencyGraph, self).__init__(workflow_context)
+        self.graph = nx.DiGraph()
+        # execute() returns once no task id is left
+        self._ids = self.graph.node
+
+    def add_task(self, task):
+        self.graph.add_node(task.id, task=task)
+        task.state_listener = self._task_state_changed
+        with self._state_changed:
+            self._candidates[task.id] = task
+        self._task_state_changed(task)
+
+    def get_task(self, task_id):
+        data = self.graph.node.get(task_id)
+        return data['task'] if data is not None else None
+
+    def remove_task(self, task):
+        if task.is_subgraph:
+            for subgraph_task in task.tasks.values():
+                self.remove_task(subgraph_task)
+        if task.id in self.graph:
+            dependents = self.graph.predecessors(task.id)
+            self.graph.remove_node(task.id)
+            with self._state_changed:
+                self._terminated.pop(task.id, None)
+                self._candidates.pop(task.id, None)
+            self._dependencies_removed(dependents)
+
+    def add_dependency(self, src_task, dst_task):
+        if not self.graph.has_node(src_task.id):
+            raise RuntimeError('source task {0} is not in graph (task id: '
+                               '{1})'.format(src_task, src_task.id))
+        if not self.graph.has_node(dst_task.id):
+            raise RuntimeError('destination task {0} is not in graph (task '
+                               'id: {1})'.format(dst_task, dst_task.id))
+        self.graph.add_edge(src_task.id, dst_task.id)
+
+    def _dependencies_removed(self, task_ids):
+        with self._state_changed:
+            for task_id in task_ids:
+                task = self.get_task(task_id)
+                if task is None:
+                    continue
+                to_visit = [task]
+                while to_visit:
+                    current = to_visit.pop()
+                    self._candidates[current.id] = current
+                    if current.is_subgraph:
+                        to_visit.extend(current.tasks.values())
+
+    def _task_has_dependencies(self, task):
+        return (len(self.graph.succ.get(task.id, {})) > 0 or
+                (task.containing_subgraph and self._task_has_dependencies(
+                    task.containing_subgraph)))
+
+    def tasks_iter(self):
+        return (data['task'] for _, data in self.graph.nodes_iter(data=True))
+
+    def _handle_terminated_task(self, task):
+        handler_result = task.handle_task_terminated()
+        if handler_result.action == tasks.HandlerResult.HANDLER_FAIL:
+            if isinstance(task, SubgraphTask) and task.failed_task:
+                task = task.failed_task
+            message = "Workflow failed: Task failed '{0}'".format(task.name)
+            if task.error:
+                message = '{0} -> {1}'.format(message, task.error)
+            raise RuntimeError(message)
+
+        dependents = self.graph.predecessors(task.id)
+        removed_edges = [(dependent, task.id)
+                         for dependent in dependents]
+        self.graph.remove_edges_from(removed_edges)
+        self.graph.remove_node(task.id)
+        if handler_result.action == tasks.HandlerResult.HANDLER_RETRY:
+            new_task = handler_result.retried_task
+            self.add_task(new_task)
+            added_edges = [(dependent, new_task.id)
+                           for dependent in dependents]
+            self.graph.add_edges_from(added_edges)
+        else:
+            self._dependencies_removed(dependents)
+
+
+GRAPHS = {
+    'compact': TaskDependencyGraph,
+    'networkx': _NetworkxTaskDependencyGraph
+}
+
+
+def _build(graph_class, size):
+    graph = graph_class(workflow_context=None)
+    subgraphs = []
+    random.seed(0)
+    for i in range(size // TASKS_PER_SUBGRAPH):
+        subgraph = graph.subgraph('instance_{0}'.format(i))
+        subgraph.sequence().add(*[_Task() for _ in
+                                  range(TASKS_PER_SUBGRAPH - 1)])
+        for _ in range(min(i, RELATIONSHIPS_PER_SUBGRAPH)):
+            graph.add_dependency(subgraph, random.choice(subgraphs))
+        subgraphs.append(subgraph)
+    return graph
+
+
+def _measure(graph_name, size, results):
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    graph = _build(GRAPHS[graph_name], size)
+    built = time.time()
+    rss_built = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    graph.execute()
+    executed = time.time()
+    results.put((built - start, executed - built, rss_built - rss_before))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='10000,50000,100000')
+    arg_parser.add_argument('--graphs', default='compact,networkx',
+                            help='graph implementations to measure, of: '
+                                 '{0}'.format(', '.join(sorted(GRAPHS))))
+    args = arg_parser.parse_args()
+    graph_names = args.graphs.split(',')
+    for graph_name in graph_names:
+        if graph_name not in GRAPHS:
+            arg_parser.error('unknown graph: {0}'.format(graph_name))
+
+    print '{0:>8} {1:>8} {2:>10} {3:>10} {4:>12} {5:>14}'.format(
+        'graph', 'tasks', 'build s', 'execute s', 'tasks/s', 'graph rss MB')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        for graph_name in graph_names:
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_measure, args=(graph_name, size, results))
+            process.start()
+            build, execute, rss = results.get()
+            process.join()
+            print ('{0:>8} {1:>8} {2:>10.2f} {3:>10.2f} {4:>12.0f} '
+                   '{5:>14.1f}'.format(graph_name, size, build, execute,
+                                       size / execute, rss / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Compare the pure python and the libyaml based blueprint loaders.
+
+Loads every YAML file of the repository (mostly test blueprints), and a
+generated type library of the size of a large plugin catalog, with each
+loader. Reports the load time and the peak memory growth, measured in a
+separate process per loader.
+
+    python benchmarks/yaml_loader.py [--repeat N] [--types N]
+"""
+
+import os
+import gc
+import sys
+import time
+import argparse
+import resource
+import multiprocessing
+
+from dsl_parser import yaml_loader
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _test_blueprints():
+    blueprints = []
+    for directory, _, filenames in os.walk(ROOT):
+        if '.git' in directory:
+            continue
+        for filename in filenames:
+            if filename.endswith('.yaml'):
+                with open(os.path.join(directory, filename)) as f:
+                    blueprints.append((filename, f.read()))
+    return blueprints
+
+
+def _type_library(types):
+    lines = ['tosca_definitions_version: cloudify_dsl_1_3', 'node_types:']
+    for i in range(types):
+        lines.extend([
+            '    type_{0}:'.format(i),
+            '        derived_from: cloudify.nodes.Root',
+            '        properties:',
+            '            name: {{default: "type_{0}", type: string}}'
+            .format(i),
+            '            size: {default: 10, type: integer}',
+            '        interfaces:',
+            '            cloudify.interfaces.lifecycle:',
+            '                create:',
+            '                    implementation: plugin.tasks.create',
+            '                    inputs:',
+            '                        args: {default: [1, 2, 3]}',
+        ])
+    return [('types.yaml', '\n'.join(lines))]
+
+
+def _measure(use_libyaml, documents, repeat, results):
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    for _ in range(repeat):
+        loaded = [yaml_loader.load(content, filename, use_libyaml)
+                  for filename, content in documents]
+    elapsed = time.time() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed / repeat, rss_after - rss_before, len(loaded)))
+
+
+def _run(use_libyaml, documents, repeat):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_measure, args=(use_libyaml, documents, repeat, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--types', type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    if yaml_loader.CMarkedLoader is None:
+        sys.exit('PyYAML was built without libyaml')
+
+    for name, documents in [('test blueprints', _test_blueprints()),
+                            ('type library', _type_library(args.types))]:
+        size = sum(len(content) for _, content in documents)
+        print '{0}: {1} documents, {2} KB'.format(
+            name, len(documents), size / 1024)
+        timings = {}
+        for use_libyaml in (False, True):
+            elapsed, rss_growth, _ = _run(use_libyaml, documents,
+                                          args.repeat)
+            timings[use_libyaml] = elapsed
+            print '    {0:<8} {1:8.1f} ms/load  peak rss +{2} KB'.format(
+                'libyaml' if use_libyaml else 'python',
+                elapsed * 1000, rss_growth)
+        print '    speedup: {0:.1f}x'.format(timings[False] / timings[True])
+
+
+if __name__ == '__main__':
+    main()
@@ -49,6 +49,7 @@ class AMQPClient(object):
                  ssl_cert_path):
         self.connection = None
         self.channel = None
+        self.batch_channel = None
         self._is_closed = False
         credentials = pika.credentials.PlainCredentials(
             username=amqp_user,
@@ -73,15 +74,18 @@ class AMQPClient(object):
         for exchange in [self.EVENTS_EXCHANGE_NAME, self.LOGS_EXCHANGE_NAME]:
             self.channel.exchange_declare(exchange=exchange, type='fanout',
                                           **self.channel_settings)
+        self.batch_channel = None
+
+    def _exchange(self, message_type):
+        if message_type == 'event':
+            return self.EVENTS_EXCHANGE_NAME
+        return self.LOGS_EXCHANGE_NAME
 
     def publish_message(self, message, message_type):
         if self._is_closed:
             raise exceptions.ClosedAMQPClientException(
                 'Publish failed, AMQP client already closed')
-        if message_type == 'event':
-            exchange = self.EVENTS_EXCHANGE_NAME
-        else:
-            exchange = self.LOGS_EXCHANGE_NAME
+        exchange = self._exchange(message_type)
         routing_key = ''
         body = json.dumps(message)
         try:
@@ -100,6 +104,42 @@ class AMQPClient(object):
                                        routing_key=routing_key,
                                        body=body)
 
+    def publish_messages(self, messages):
+        """Publish several messages, waiting for the broker once.
+
+        The messages are published in a transaction on a channel of their
+        own, which is committed once all of them were sent. If the
+        connection is lost before the commit, none of the messages was
+        published, and all of them are published again on a new
+        connection.
+
+        :param messages: list of (message, message_type) tuples
+        """
+        if self._is_closed:
+            raise exceptions.ClosedAMQPClientException(
+                'Publish failed, AMQP client already closed')
+        bodies = [(self._exchange(message_type), json.dumps(message))
+                  for message, message_type in messages]
+        try:
+            self._publish_transaction(bodies)
+        except pika.exceptions.ConnectionClosed as e:
+            logger.warn(
+                'Connection closed unexpectedly for thread {0}, '
+                'reconnecting. ({1}: {2})'
+                .format(threading.current_thread(), type(e).__name__, repr(e)))
+            self._connect()
+            self._publish_transaction(bodies)
+
+    def _publish_transaction(self, bodies):
+        if self.batch_channel is None:
+            self.batch_channel = self.connection.channel()
+            self.batch_channel.tx_select()
+        for exchange, body in bodies:
+            self.batch_channel.basic_publish(exchange=exchange,
+                                             routing_key='',
+                                             body=body)
+        self.batch_channel.tx_commit()
+
     def close(self):
         if self._is_closed:
             return
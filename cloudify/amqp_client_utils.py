@@ -13,11 +13,14 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from threading import Thread, RLock, Event
-from Queue import Queue
+import time
+import logging
+from threading import Thread, RLock, Event, Lock
+from Queue import Queue, Empty, Full
 
 from cloudify import amqp_client
-from cloudify.exceptions import ClosedAMQPClientException
+from cloudify.exceptions import (ClosedAMQPClientException,
+                                 TimeoutException)
 
 
 class AMQPWrappedThread(Thread):
@@ -39,18 +42,39 @@ class AMQPWrappedThread(Thread):
         self.daemon = True
 
 
+logger = logging.getLogger(__name__)
+
 _STOP = object()
 
 
 class _GlobalAMQPClient(object):
+    """Publishes messages from a queue, in batches, on a single thread.
+
+    The queue is bounded: once it holds MAX_QUEUE_SIZE messages, publishing
+    an event waits up to EVENT_PUT_TIMEOUT seconds for room for it, while
+    logs are dropped. Batches of up to BATCH_SIZE queued messages are
+    published at once, see AMQPClient.publish_messages.
+    """
+
+    MAX_QUEUE_SIZE = 10000
+    BATCH_SIZE = 100
+    EVENT_PUT_TIMEOUT = 30
+
     def __init__(self, *client_args, **client_kwargs):
         self.client_started = Event()
         self._connect_lock = RLock()
         self._callers = 0
         self._thread = None
-        self._queue = Queue()
+        self._queue = Queue(maxsize=self.MAX_QUEUE_SIZE)
+        self._stopping = Event()
         self._client_args = client_args
         self._client_kwargs = client_kwargs
+        self._metrics_lock = Lock()
+        self._published = 0
+        self._dropped = 0
+        self._batches = 0
+        self._total_latency = 0
+        self._max_latency = 0
 
     def register_caller(self):
         with self._connect_lock:
@@ -73,7 +97,55 @@ class _GlobalAMQPClient(object):
         self.unregister_caller()
 
     def publish_message(self, message, message_type):
-        self._queue.put((message, message_type))
+        request = (message, message_type, time.time())
+        if message_type == 'event':
+            self._put_event(request)
+            return
+        try:
+            self._queue.put_nowait(request)
+        except Full:
+            dropped = self._count_dropped(1)
+            # only some of the drops are reported, to not flood the log
+            if dropped & (dropped - 1) == 0:
+                logger.warning('AMQP publish queue is full, {0} logs dropped '
+                               'so far'.format(dropped))
+
+    def _put_event(self, request):
+        # waiting for room is only worthwhile while the publishing thread is
+        # alive to make it
+        publishing = self._thread is not None and self._thread.is_alive()
+        try:
+            self._queue.put(request, publishing, self.EVENT_PUT_TIMEOUT)
+        except Full:
+            self._count_dropped(1)
+            raise TimeoutException(
+                'AMQP publish queue is full{0}, the event was not queued'
+                .format('' if publishing else
+                        ' and its publishing thread is not running'))
+
+    def _count_dropped(self, count):
+        with self._metrics_lock:
+            self._dropped += count
+            return self._dropped
+
+    def metrics(self):
+        """Publishing metrics.
+
+        :returns: dict of the number of queued messages, of published and
+                  dropped messages, of published batches, and of the
+                  average and maximal time in seconds from queueing a
+                  message to the broker accepting it.
+        """
+        with self._metrics_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'published': self._published,
+                'dropped': self._dropped,
+                'batches': self._batches,
+                'average_latency': (self._total_latency / self._published
+                                    if self._published else 0),
+                'max_latency': self._max_latency
+            }
 
     def close(self):
         self.unregister_caller()
@@ -85,26 +157,77 @@ class _GlobalAMQPClient(object):
 
     def _connect(self):
         self._client = self._make_client()
+        self._stopping.clear()
         self.client_started.set()
         self._thread = Thread(target=self._handle_publish_message)
         self._thread.start()
 
     def _disconnect(self):
-        self._queue.put(_STOP)
+        try:
+            self._queue.put_nowait(_STOP)
+        except Full:
+            # the publishing thread stops once it emptied the queue
+            pass
+        self._stopping.set()
+
+    def _next_batch(self):
+        """Wait for a message, then take the queued ones after it.
+
+        :returns: tuple of the requests and whether publishing should stop
+        """
+        batch = []
+        request = self._queue.get()
+        while request is not _STOP:
+            batch.append(request)
+            if len(batch) >= self.BATCH_SIZE:
+                break
+            try:
+                request = self._queue.get_nowait()
+            except Empty:
+                break
+        return batch, request is _STOP
 
     def _handle_publish_message(self):
         while True:
-            request = self._queue.get()
-            if request is _STOP:
+            batch, stop = self._next_batch()
+            if batch:
+                try:
+                    self._publish_batch(batch)
+                except Exception as e:
+                    # this thread must keep emptying the queue, or callers
+                    # publishing events would wait for room in vain
+                    dropped = self._count_dropped(len(batch))
+                    logger.warning(
+                        'Error publishing {0} messages to RabbitMQ, {1} '
+                        'messages dropped so far ({2}: {3})'.format(
+                            len(batch), dropped, type(e).__name__, e))
+            if stop or (self._stopping.is_set() and self._queue.empty()):
                 break
-            try:
-                self._client.publish_message(*request)
-            except ClosedAMQPClientException:
-                with self._connect_lock:
-                    self._client = self._make_client()
-                self._client.publish_message(*request)
-        self._client.close()
-        self.client_started.clear()
+        try:
+            self._client.close()
+        finally:
+            self.client_started.clear()
+
+    def _publish_batch(self, batch):
+        messages = [(message, message_type)
+                    for message, message_type, _ in batch]
+        try:
+            self._client.publish_messages(messages)
+        except ClosedAMQPClientException:
+            # not under the connect lock, which is held while
+            # waiting for this thread to stop
+            self._client = self._make_client()
+            self._client.publish_messages(messages)
+        self._record_batch(batch)
+
+    def _record_batch(self, batch):
+        now = time.time()
+        latencies = [now - queued_at for _, _, queued_at in batch]
+        with self._metrics_lock:
+            self._published += len(batch)
+            self._batches += 1
+            self._total_latency += sum(latencies)
+            self._max_latency = max(self._max_latency, max(latencies))
 
 
 def init_amqp_client():
@@ -38,6 +38,13 @@ logger = get_logger(__name__)
 LOGFILE_SIZE_BYTES = 5 * 1024 * 1024
 LOGFILE_BACKUP_COUNT = 5
 
+# Size of the write buffer of each log file
+WRITE_BUFFER_SIZE = 64 * 1024
+# Maximal number of messages received before flushing the log files
+MAX_DRAINED_MESSAGES = 1000
+# Seconds between checks of the log files sizes for rotation
+ROTATION_INTERVAL = 1
+
 
 def configure_app(app):
     app.user_options['worker'].add(
@@ -78,7 +85,9 @@ class ZMQLoggingServerBootstep(bootsteps.StartStopStep):
                 'enabled': self.enabled,
                 'logdir': self.logdir,
                 'socket_url': self.socket_url,
-                'cache_size': self.cache_size
+                'cache_size': self.cache_size,
+                'stats': (self.logging_server.stats()
+                          if self.logging_server else None)
             }
         }
 
@@ -120,9 +129,19 @@ class ZMQLoggingServerBootstep(bootsteps.StartStopStep):
 
 
 class ZMQLoggingServer(object):
+    """Writes the log messages received on a socket to log files.
+
+    All pending messages are received on each wakeup, and the log files
+    they were written to are flushed once they were all received. Log
+    files are rotated by a thread of their own, so rotating them does not
+    hold back receiving messages.
+    """
 
     def __init__(self, logdir, socket_url, cache_size):
         self.closed = False
+        self._closed_event = threading.Event()
+        self._handlers_lock = threading.RLock()
+        self._received = 0
         self.zmq_context = zmq.Context(io_threads=1)
         self.socket = self.zmq_context.socket(zmq.PULL)
         self.socket.bind(socket_url)
@@ -135,10 +154,10 @@ class ZMQLoggingServer(object):
         # on agent hosts, we want to rotate the logs using python's
         # RotatingFileHandler.
         if os.environ.get('MGMTWORKER_HOME'):
-            self.handler_func = logging.FileHandler
+            self.handler_func = BufferedFileHandler
         else:
             self.handler_func = functools.partial(
-                logging.handlers.RotatingFileHandler,
+                BufferedRotatingFileHandler,
                 maxBytes=LOGFILE_SIZE_BYTES,
                 backupCount=LOGFILE_BACKUP_COUNT)
 
@@ -150,11 +169,13 @@ class ZMQLoggingServer(object):
         self._get_handler = cache_decorator(self._get_handler)
 
     def start(self):
+        rotation_thread = threading.Thread(target=self._rotate_handlers_loop)
+        rotation_thread.daemon = True
+        rotation_thread.start()
         while not self.closed:
             try:
                 if self.poller.poll(1000):
-                    message = json.loads(self.socket.recv(), encoding='utf-8')
-                    self._process(message)
+                    self._drain()
             except Exception:
                 if not self.closed:
                     logger.warning('Error raised during record processing',
@@ -163,13 +184,53 @@ class ZMQLoggingServer(object):
     def close(self):
         if not self.closed:
             self.closed = True
+            self._closed_event.set()
             self.socket.close()
             self.zmq_context.term()
-            self._get_handler.clear()
+            with self._handlers_lock:
+                self._get_handler.clear()
+
+    def stats(self):
+        """Statistics of the received messages and of the handler cache."""
+        with self._handlers_lock:
+            cache_stats = self._get_handler.stats()
+        return {
+            'received': self._received,
+            'open_handlers': cache_stats['size'],
+            'handler_hits': cache_stats['hits'],
+            'handler_misses': cache_stats['misses'],
+            'handler_evictions': cache_stats['evictions']
+        }
+
+    def _drain(self):
+        handlers = set()
+        try:
+            for _ in range(MAX_DRAINED_MESSAGES):
+                try:
+                    message = self.socket.recv(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                self._received += 1
+                try:
+                    handlers.add(self._process(
+                        json.loads(message, encoding='utf-8')))
+                except Exception:
+                    if not self.closed:
+                        logger.warning('Error raised during record '
+                                       'processing', exc_info=True)
+        finally:
+            for handler in handlers:
+                handler.flush_buffer()
 
     def _process(self, entry):
-        handler = self._get_handler(entry['context'])
-        handler.emit(Record(entry['message']))
+        with self._handlers_lock:
+            handler = self._get_handler(entry['context'])
+        handler.acquire()
+        try:
+            handler.emit(Record(entry['message']))
+        finally:
+            handler.release()
+        return handler
 
     def _get_handler(self, handler_context):
         logfile = os.path.join(self.logdir, '{0}.log'.format(handler_context))
@@ -177,6 +238,77 @@ class ZMQLoggingServer(object):
         handler.setFormatter(Formatter)
         return handler
 
+    def _rotate_handlers_loop(self):
+        while not self.closed:
+            self._closed_event.wait(ROTATION_INTERVAL)
+            if self.closed:
+                break
+            try:
+                self._rotate_handlers()
+            except Exception:
+                if not self.closed:
+                    logger.warning('Error raised during log rotation',
+                                   exc_info=True)
+
+    def _rotate_handlers(self):
+        with self._handlers_lock:
+            handlers = list(self._get_handler._cache.values())
+        for handler in handlers:
+            handler.rollover_if_needed()
+
+
+class _BufferedHandlerMixin(object):
+    """Writes records to a buffered stream, flushed by flush_buffer.
+
+    Log handlers flush their stream after each record, which is a write
+    system call per record.
+    """
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, WRITE_BUFFER_SIZE)
+
+    def flush(self):
+        # called after each record, the stream is flushed by flush_buffer
+        pass
+
+    def flush_buffer(self):
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def rollover_if_needed(self):
+        pass
+
+
+class BufferedFileHandler(_BufferedHandlerMixin, logging.FileHandler):
+    pass
+
+
+class BufferedRotatingFileHandler(_BufferedHandlerMixin,
+                                  logging.handlers.RotatingFileHandler):
+    """A rotating file handler, not rotating its file when emitting.
+
+    The file is rotated by rollover_if_needed instead.
+    """
+
+    def shouldRollover(self, record):
+        return 0
+
+    def rollover_if_needed(self):
+        self.acquire()
+        try:
+            if self.stream is None or self.maxBytes <= 0:
+                return
+            self.stream.flush()
+            self.stream.seek(0, 2)
+            if self.stream.tell() >= self.maxBytes:
+                self.doRollover()
+        finally:
+            self.release()
+
 
 class Record(object):
     def __init__(self, message):
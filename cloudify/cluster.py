@@ -151,6 +151,8 @@ class ClusterHTTPClient(HTTPClient):
     retry_interval = 3
 
     def __init__(self, *args, **kwargs):
+        # failing over to another node is handled by do_request
+        kwargs['connect_retries'] = 0
         super(ClusterHTTPClient, self).__init__(*args, **kwargs)
 
     def do_request(self, *args, **kwargs):
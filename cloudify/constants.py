@@ -58,6 +58,10 @@ BROKER_SSL_CERT_PATH = 'BROKER_SSL_CERT_PATH'
 BYPASS_MAINTENANCE = 'BYPASS_MAINTENANCE'
 LOGGING_CONFIG_FILE = '/etc/cloudify/logging.conf'
 CLUSTER_SETTINGS_PATH_KEY = 'CLOUDIFY_CLUSTER_SETTINGS_PATH'
+DISPATCH_POOL_SIZE_KEY = 'CLOUDIFY_DISPATCH_POOL_SIZE'
+DISPATCH_POOL_MAX_TASKS_KEY = 'CLOUDIFY_DISPATCH_POOL_MAX_TASKS'
+RESOURCE_CACHE_DIR_KEY = 'CLOUDIFY_RESOURCE_CACHE_DIR'
+RESOURCE_CACHE_SIZE_KEY = 'CLOUDIFY_RESOURCE_CACHE_SIZE'
 
 MGMTWORKER_QUEUE = 'cloudify.management'
 DEPLOYMENT = 'deployment'
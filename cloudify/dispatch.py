@@ -15,6 +15,7 @@
 
 
 import importlib
+import atexit
 import copy
 import json
 import logging
@@ -47,6 +48,11 @@ from cloudify.workflows import api
 from cloudify.constants import LOGGING_CONFIG_FILE
 
 CLOUDIFY_DISPATCH = 'CLOUDIFY_DISPATCH'
+POOL_WORKER_ARG = '--pool-worker'
+DEFAULT_DISPATCH_POOL_MAX_TASKS = 100
+# Environment variables that a dispatch worker only reads when it starts
+WORKER_STARTUP_ENV = ['PATH', 'PYTHONPATH', 'PYTHONHOME', 'VIRTUAL_ENV',
+                      'LD_LIBRARY_PATH']
 
 # This is relevant in integration tests when cloudify-agent is installed in
 # editable mode. Adding this directory using PYTHONPATH will make it appear
@@ -125,13 +131,18 @@ class TaskHandler(object):
                 }, f)
             env = self._build_subprocess_env()
             command_args = [sys.executable, __file__, dispatch_dir]
+            worker_pool = _get_worker_pool()
             try:
-                subprocess.check_call(command_args,
-                                      env=env,
-                                      bufsize=1,
-                                      close_fds=os.name != 'nt',
-                                      stdout=output,
-                                      stderr=output)
+                if worker_pool:
+                    worker_pool.dispatch(dispatch_dir, env,
+                                         self._worker_key(env))
+                else:
+                    subprocess.check_call(command_args,
+                                          env=env,
+                                          bufsize=1,
+                                          close_fds=os.name != 'nt',
+                                          stdout=output,
+                                          stderr=output)
             except subprocess.CalledProcessError:
                 # this means something really bad happened because we generally
                 # catch all exceptions in the subprocess and exit cleanly
@@ -236,6 +247,21 @@ class TaskHandler(object):
 
         return env
 
+    def _worker_key(self, env):
+        """Operations share warm dispatch workers only when they run the
+        same plugin, in the same virtualenv and startup environment"""
+        plugin = self.cloudify_context.get('plugin') or {}
+        tenant = self.cloudify_context.get('tenant') or {}
+        return (
+            tuple(plugin.get(key) for key in ['name', 'package_name',
+                                              'package_version',
+                                              'visibility', 'tenant_name']),
+            self.cloudify_context.get('deployment_id', SYSTEM_DEPLOYMENT),
+            tenant.get('name'),
+            VIRTUALENV,
+            sys.executable,
+            tuple(env.get(name) for name in WORKER_STARTUP_ENV))
+
     def _extract_plugin_dir(self):
         plugin = self.cloudify_context.get('plugin', {})
         plugin_name = plugin.get('name')
@@ -387,7 +413,9 @@ class OperationHandler(TaskHandler):
 
         if self.cloudify_context.get('has_intrinsic_functions'):
             with state.current_ctx.push(ctx, kwargs):
-                kwargs = ctx._endpoint.evaluate_functions(payload=kwargs)
+                kwargs = ctx._endpoint.evaluate_functions(
+                    payload=kwargs,
+                    paths=self.cloudify_context.get('function_paths'))
 
         if not self.cloudify_context.get('no_ctx_kwarg'):
             kwargs['ctx'] = ctx
@@ -605,6 +633,133 @@ class WorkflowHandler(TaskHandler):
             raise caught_error
 
 
+class _DispatchWorker(object):
+    """A warm dispatch process, handling one operation at a time.
+
+    The worker gets the dispatch directory and environment of each
+    operation over its stdin, and runs it exactly like a dispatch
+    subprocess would (see `_pool_worker_main`).
+    """
+
+    def __init__(self, env):
+        self.tasks = 0
+        self._process = subprocess.Popen(
+            [sys.executable, __file__, POOL_WORKER_ARG],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            close_fds=os.name != 'nt')
+
+    def dispatch(self, dispatch_dir, env):
+        """Run the operation in `dispatch_dir` using this worker
+
+        :return: whether this worker may be reused for other operations
+        """
+        self.tasks += 1
+        try:
+            self._process.stdin.write('{0}\n'.format(json.dumps({
+                'dispatch_dir': dispatch_dir,
+                'env': env,
+                'cwd': os.getcwd()
+            })))
+            self._process.stdin.flush()
+            response = self._process.stdout.readline()
+        except IOError:
+            response = None
+        if not response:
+            # the worker died while handling the operation, this is the
+            # equivalent of a dispatch subprocess exiting with an error
+            self.close(kill=True)
+            raise subprocess.CalledProcessError(
+                self._process.returncode, POOL_WORKER_ARG)
+        return json.loads(response)['reusable']
+
+    def close(self, kill=False):
+        if kill and self._process.poll() is None:
+            self._process.kill()
+        for stream in (self._process.stdin, self._process.stdout):
+            try:
+                stream.close()
+            except IOError:
+                pass
+        self._process.wait()
+
+
+class _DispatchWorkerPool(object):
+    """Warm dispatch processes, kept per plugin environment.
+
+    Workers are keyed by the plugin, virtualenv and startup environment of
+    the operation (see `TaskHandler._worker_key`), so a worker only runs
+    operations of the same plugin. At most `size` idle workers are kept
+    per plugin environment.
+
+    Unlike a dispatch subprocess, a worker does not isolate the operations
+    it runs from each other: only its working directory, environment and
+    sys.path are restored after each operation. Module level state carries
+    over to the following operations of the worker, including imported
+    modules and their globals, monkeypatches, signal handlers and logging
+    configuration. A worker is recycled after `max_tasks` operations, after
+    an operation failed, or after an operation left threads running.
+    """
+
+    def __init__(self, size, max_tasks):
+        self._size = size
+        self._max_tasks = max_tasks
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def dispatch(self, dispatch_dir, env, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            worker = idle.pop() if idle else None
+        if worker is None:
+            worker = _DispatchWorker(env)
+        reusable = worker.dispatch(dispatch_dir, env)
+        if reusable and worker.tasks < self._max_tasks:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self._size:
+                    idle.append(worker)
+                    return
+        worker.close()
+
+    def close(self):
+        with self._lock:
+            workers = [worker for idle in self._idle.values()
+                       for worker in idle]
+            self._idle = {}
+        for worker in workers:
+            worker.close()
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def _get_worker_pool():
+    """The dispatch worker pool, if enabled using the
+    CLOUDIFY_DISPATCH_POOL_SIZE environment variable
+
+    CLOUDIFY_DISPATCH_POOL_SIZE is the number of idle workers kept per
+    plugin environment, and CLOUDIFY_DISPATCH_POOL_MAX_TASKS the number of
+    operations a worker runs before it is recycled. Operations run by the
+    same worker share module level state, see `_DispatchWorkerPool`, so the
+    pool should only be enabled for plugins that don't depend on it.
+    """
+    global _worker_pool
+    size = int(os.environ.get(constants.DISPATCH_POOL_SIZE_KEY) or 0)
+    if size <= 0:
+        return None
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            max_tasks = int(
+                os.environ.get(constants.DISPATCH_POOL_MAX_TASKS_KEY) or
+                DEFAULT_DISPATCH_POOL_MAX_TASKS)
+            _worker_pool = _DispatchWorkerPool(size, max_tasks)
+            atexit.register(_worker_pool.close)
+    return _worker_pool
+
+
 TASK_HANDLERS = {
     'operation': OperationHandler,
     'workflow': WorkflowHandler
@@ -625,7 +780,69 @@ def dispatch(__cloudify_context, *args, **kwargs):
 
 
 def main():
-    dispatch_dir = sys.argv[1]
+    if sys.argv[1] == POOL_WORKER_ARG:
+        _pool_worker_main()
+    else:
+        _dispatch_from_dir(sys.argv[1])
+
+
+def _pool_worker_main():
+    # requests are read from stdin, and responses written to stdout. The
+    # operations themselves must not use them, so stdin is replaced with
+    # /dev/null, and stdout/stderr are redirected to the output file of
+    # the current operation
+    requests = os.fdopen(os.dup(sys.stdin.fileno()), 'r')
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    for line in iter(requests.readline, ''):
+        request = json.loads(line)
+        dispatch_dir = request['dispatch_dir']
+        worker_cwd = os.getcwd()
+        worker_env = dict(os.environ)
+        worker_path = list(sys.path)
+        worker_threads = set(threading.enumerate())
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        with open(os.path.join(dispatch_dir, 'output'), 'a') as output:
+            os.dup2(output.fileno(), 1)
+            os.dup2(output.fileno(), 2)
+            try:
+                payload_type, payload = _dispatch_from_dir(dispatch_dir)
+            except BaseException:
+                # the worker exits, and the calling process reports the
+                # output like it does for a failed dispatch subprocess
+                traceback.print_exc()
+                raise
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os.dup2(devnull, 1)
+                os.dup2(devnull, 2)
+                # like a dispatch subprocess, the operation must not affect
+                # the operations that follow it
+                os.chdir(worker_cwd)
+                os.environ.clear()
+                os.environ.update(worker_env)
+                sys.path[:] = worker_path
+        # an operation that failed might have left the process in a bad
+        # state, retries are expected to leave it as is
+        reusable = payload_type == 'result' or (
+            payload['known_exception_type'] ==
+            exceptions.OperationRetry.__name__)
+        # threads left running would keep running along the operations
+        # that follow
+        if any(thread not in worker_threads
+               for thread in threading.enumerate()):
+            reusable = False
+        responses.write('{0}\n'.format(json.dumps({'reusable': reusable})))
+        responses.flush()
+
+
+def _dispatch_from_dir(dispatch_dir):
     with open(os.path.join(dispatch_dir, 'input.json')) as f:
         dispatch_inputs = json.load(f)
     cloudify_context = dispatch_inputs['cloudify_context']
@@ -703,6 +920,7 @@ def main():
             'type': payload_type,
             'payload': payload
         }, f)
+    return payload_type, payload
 
 
 if __name__ == '__main__':
@@ -14,6 +14,9 @@
 #    * limitations under the License.
 
 import os
+import shutil
+import hashlib
+import tempfile
 
 import jinja2
 
@@ -21,9 +24,31 @@ from cloudify import constants
 from cloudify import manager
 from cloudify import logs
 from cloudify.logs import CloudifyPluginLoggingHandler
+from cloudify.lru_cache import LRUCache
 from cloudify.exceptions import NonRecoverableError
 
 
+# Number of compiled resource templates kept in memory
+TEMPLATE_CACHE_SIZE = 100
+
+
+# Compiled jinja templates, by the digest of their source, so that
+# resources rendered for several node instances are compiled once
+_templates = LRUCache(maxsize=TEMPLATE_CACHE_SIZE, thread_safe=True)
+
+
+def _get_template(source):
+    if isinstance(source, unicode):
+        digest = hashlib.sha256(source.encode('utf-8')).digest()
+    else:
+        digest = hashlib.sha256(source).digest()
+    template = _templates.get(digest)
+    if template is None:
+        template = jinja2.Template(source)
+        _templates.put(digest, template)
+    return template
+
+
 class Endpoint(object):
 
     def __init__(self, ctx):
@@ -62,20 +87,26 @@ class Endpoint(object):
         if not template_variables:
             return resource
 
-        resource_path = resource
-        if download:
-            with open(resource_path, 'rb') as f:
-                resource = f.read()
-
-        template = jinja2.Template(resource)
-        rendered_resource = template.render(template_variables)
+        if not download:
+            return _get_template(resource).render(template_variables)
 
-        if download:
-            with open(resource_path, 'wb') as f:
-                f.write(rendered_resource)
-            return resource_path
-        else:
-            return rendered_resource
+        resource_path = resource
+        with open(resource_path, 'rb') as f:
+            template = _get_template(f.read())
+        # the rendered resource is written as it is generated, and replaces
+        # the downloaded resource once complete
+        fd, rendered_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(resource_path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in template.generate(template_variables):
+                    f.write(chunk.encode('utf-8'))
+            shutil.copymode(resource_path, rendered_path)
+            os.rename(rendered_path, resource_path)
+        except Exception:
+            os.remove(rendered_path)
+            raise
+        return resource_path
 
     def get_provider_context(self):
         raise NotImplementedError('Implemented by subclasses')
@@ -120,12 +151,29 @@ class Endpoint(object):
         raise NonRecoverableError('could not find ip for host node instance: '
                                   '{0}'.format(host_id))
 
-    def evaluate_functions(self, payload):
+    def evaluate_functions(self, payload, paths=None):
         raise NotImplementedError('Implemented by subclasses')
 
     def _evaluate_functions_impl(self,
                                  payload,
-                                 evaluate_functions_method):
+                                 evaluate_functions_method,
+                                 paths=None):
+        """Evaluate the intrinsic functions in payload.
+
+        :param paths: The paths of the functions in payload, as indexed in
+                      the deployment plan (optional). When given, only the
+                      functions at these paths are evaluated, and the rest
+                      of payload is not sent for evaluation.
+        """
+        if paths is not None:
+            if not paths:
+                return payload
+            evaluated = self._evaluate_functions_impl(
+                {'functions': [_get_path(payload, path) for path in paths]},
+                evaluate_functions_method)['functions']
+            for path, value in zip(paths, evaluated):
+                _set_path(payload, path, value)
+            return payload
         evaluation_context = {}
         if self.ctx.type == constants.NODE_INSTANCE:
             evaluation_context['self'] = self.ctx.instance.id
@@ -211,7 +259,7 @@ class ManagerEndpoint(Endpoint):
                                additional_context,
                                out_func=logs.amqp_event_out)
 
-    def evaluate_functions(self, payload):
+    def evaluate_functions(self, payload, paths=None):
         client = manager.get_rest_client()
 
         def evaluate_functions_method(deployment_id, context, payload):
@@ -219,7 +267,8 @@ class ManagerEndpoint(Endpoint):
                                              context,
                                              payload)['payload']
         return self._evaluate_functions_impl(payload,
-                                             evaluate_functions_method)
+                                             evaluate_functions_method,
+                                             paths)
 
     def get_workdir(self):
         if not self.ctx.deployment.id:
@@ -307,12 +356,22 @@ class LocalEndpoint(Endpoint):
                                additional_context,
                                out_func=logs.stdout_event_out)
 
-    def evaluate_functions(self, payload):
+    def evaluate_functions(self, payload, paths=None):
         def evaluate_functions_method(deployment_id, context, payload):
             return self.storage.env.evaluate_functions(payload=payload,
                                                        context=context)
         return self._evaluate_functions_impl(
-            payload, evaluate_functions_method)
+            payload, evaluate_functions_method, paths)
 
     def get_workdir(self):
         return self.storage.get_workdir()
+
+
+def _get_path(value, path):
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _set_path(value, path, new_value):
+    _get_path(value, path[:-1])[path[-1]] = new_value
@@ -13,82 +13,217 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-# Copied and modified from
-# http://code.activestate.com/recipes/498245-lru-and-lfu-cache-decorators/
-
-import collections
+import time
 import functools
-from itertools import ifilterfalse
+import threading
+
+
+_missing = object()
+_kwd_mark = object()
+
+# fields of the links of the entries list
+_PREV, _NEXT, _KEY = 0, 1, 2
+
+
+class LRUCache(object):
+    """A least-recently-used cache, optionally expiring its entries.
+
+    Values are held in a dict, and the keys in a circular doubly linked
+    list, least recently used first, so lookups, insertions and evictions
+    are all O(1).
+
+    :param maxsize: maximal number of entries
+    :param ttl: seconds after which an entry expires, None to keep entries
+                until they are evicted
+    :param on_purge: called with the value of each evicted, expired or
+                     cleared entry
+    :param thread_safe: whether to guard the cache with a lock
+    """
+
+    def __init__(self, maxsize=100, ttl=None, on_purge=None,
+                 thread_safe=False, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_purge = on_purge
+        self.lock = threading.RLock() if thread_safe else None
+        self.data = {}
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None]
+        self._expires = {}
+        self._timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return self._locked(self._contains, key)
+
+    def get(self, key, default=None):
+        return self._locked(self._get, key, default)
+
+    def put(self, key, value):
+        self._locked(self._put, key, value)
+
+    def pop(self, key, default=None):
+        """Remove an entry without purging it, returning its value."""
+        return self._locked(self._pop, key, default)
+
+    def expire(self):
+        """Purge all the expired entries."""
+        self._locked(self._expire)
 
+    def clear(self):
+        self._locked(self._clear)
 
-def lru_cache(maxsize=100, on_purge=None):
+    def keys(self):
+        """The keys of the entries, least recently used first."""
+        return self._locked(self._keys)
+
+    def stats(self):
+        return self._locked(self._stats)
+
+    def _locked(self, func, *args):
+        if self.lock is None:
+            return func(*args)
+        with self.lock:
+            return func(*args)
+
+    def _contains(self, key):
+        return key in self.data and not self._expired(key)
+
+    def _get(self, key, default=None):
+        link = self._links.get(key)
+        if link is None:
+            self.misses += 1
+            return default
+        if self.ttl is not None and self._expired(key):
+            self._purge(self._pop(key))
+            self.expirations += 1
+            self.misses += 1
+            return default
+        # move the link to the end, as the most recently used entry
+        link_prev, link_next = link[_PREV], link[_NEXT]
+        link_prev[_NEXT] = link_next
+        link_next[_PREV] = link_prev
+        last = self._root[_PREV]
+        last[_NEXT] = self._root[_PREV] = link
+        link[_PREV] = last
+        link[_NEXT] = self._root
+        self.hits += 1
+        return self.data[key]
+
+    def _put(self, key, value):
+        previous = self._pop(key, _missing)
+        if previous is not _missing and previous is not value:
+            self._purge(previous)
+        last = self._root[_PREV]
+        link = [last, self._root, key]
+        last[_NEXT] = self._root[_PREV] = self._links[key] = link
+        self.data[key] = value
+        if self.ttl is not None:
+            self._expires[key] = self._timer() + self.ttl
+        while len(self.data) > self.maxsize:
+            self._purge(self._pop(self._root[_NEXT][_KEY]))
+            self.evictions += 1
+
+    def _pop(self, key, default=None):
+        link = self._links.pop(key, None)
+        if link is None:
+            return default
+        link_prev, link_next = link[_PREV], link[_NEXT]
+        link_prev[_NEXT] = link_next
+        link_next[_PREV] = link_prev
+        self._expires.pop(key, None)
+        return self.data.pop(key)
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        now = self._timer()
+        expired = [key for key, expires in self._expires.iteritems()
+                   if expires <= now]
+        for key in expired:
+            self._purge(self._pop(key))
+            self.expirations += 1
+
+    def _clear(self):
+        values = self.data.values()
+        self.data.clear()
+        self._links.clear()
+        self._expires.clear()
+        self._root[:] = [self._root, self._root, None]
+        for value in values:
+            self._purge(value)
+
+    def _keys(self):
+        keys = []
+        link = self._root[_NEXT]
+        while link is not self._root:
+            keys.append(link[_KEY])
+            link = link[_NEXT]
+        return keys
+
+    def _stats(self):
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def _expired(self, key):
+        return self.ttl is not None and self._expires[key] <= self._timer()
+
+    def _purge(self, value):
+        if self.on_purge:
+            self.on_purge(value)
+
+
+def lru_cache(maxsize=100, on_purge=None, ttl=None, thread_safe=False):
     """Least-recently-used cache decorator.
 
     Arguments to the cached function must be hashable.
-    Clear the cache with f.clear().
+    Clear the cache with f.clear(), and get its statistics with f.stats().
+    In thread safe mode, the lock is held while a missing value is
+    computed, so each value is computed once.
     """
-    maxqueue = maxsize * 10
 
     def decorating_function(user_function):
-        cache = {}
-        queue = collections.deque()
-        refcount = collections.defaultdict(int)
-        sentinel = object()
-        kwd_mark = object()
+        cache = LRUCache(maxsize=maxsize, ttl=ttl, on_purge=on_purge,
+                         thread_safe=thread_safe)
 
         # lookup optimizations (ugly but fast)
-        queue_append, queue_popleft = queue.append, queue.popleft
-        queue_appendleft, queue_pop = queue.appendleft, queue.pop
+        cache_get, cache_put = cache._get, cache._put
 
-        @functools.wraps(user_function)
-        def wrapper(*args, **kwargs):
+        def get(*args, **kwargs):
             # cache key records both positional and keyword args
             key = args
             if kwargs:
-                key += (kwd_mark,) + tuple(sorted(kwargs.items()))
-
-            # record recent use of this key
-            queue_append(key)
-            refcount[key] += 1
-
-            # get cache entry or compute if not found
-            try:
-                result = cache[key]
-            except KeyError:
+                key += (_kwd_mark,) + tuple(sorted(kwargs.items()))
+            result = cache_get(key, _missing)
+            if result is _missing:
                 result = user_function(*args, **kwargs)
-                cache[key] = result
-
-                # purge least recently used cache entry
-                if len(cache) > maxsize:
-                    key = queue_popleft()
-                    refcount[key] -= 1
-                    while refcount[key]:
-                        key = queue_popleft()
-                        refcount[key] -= 1
-                    if on_purge:
-                        on_purge(cache[key])
-                    del cache[key], refcount[key]
-
-            # periodically compact the queue by eliminating duplicate keys
-            # while preserving order of most recent access
-            if len(queue) > maxqueue:
-                refcount.clear()
-                queue_appendleft(sentinel)
-                for key in ifilterfalse(refcount.__contains__,
-                                        iter(queue_pop, sentinel)):
-                    queue_appendleft(key)
-                    refcount[key] = 1
+                cache_put(key, result)
             return result
 
-        def clear():
-            if on_purge:
-                for value in cache.itervalues():
-                    on_purge(value)
-            cache.clear()
-            queue.clear()
-            refcount.clear()
+        if thread_safe:
+            @functools.wraps(user_function)
+            def wrapper(*args, **kwargs):
+                with cache.lock:
+                    return get(*args, **kwargs)
+        else:
+            wrapper = functools.wraps(user_function)(get)
 
-        wrapper._cache = cache
-        wrapper.clear = clear
+        wrapper.cache = cache
+        wrapper._cache = cache.data
+        wrapper.clear = cache.clear
+        wrapper.stats = cache.stats
         return wrapper
     return decorating_function
@@ -22,6 +22,7 @@ from cloudify_rest_client import CloudifyClient
 from cloudify_rest_client.constants import VisibilityState
 
 from cloudify import constants
+from cloudify import resource_cache
 from cloudify.state import ctx, workflow_ctx, NotInContext
 from cloudify.cluster import CloudifyClusterClient, get_cluster_settings
 from cloudify.exceptions import HttpException, NonRecoverableError
@@ -152,16 +153,23 @@ def get_rest_client(tenant=None):
     )
 
 
-def _save_resource(logger, resource, resource_path, target_path):
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _target_path(resource_path, target_path):
     if not target_path:
         target_path = os.path.join(utils.create_temp_folder(),
                                    os.path.basename(resource_path))
-    with open(target_path, 'wb') as f:
-        f.write(resource)
-    logger.info("Downloaded %s to %s" % (resource_path, target_path))
     return target_path
 
 
+def _save_response(response, target_path):
+    """Write the content of a streamed response in chunks."""
+    with open(target_path, 'wb') as f:
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+
+
 def download_resource_from_manager(resource_path, logger, target_path=None):
     """
     Download resource from the manager file server.
@@ -171,8 +179,12 @@ def download_resource_from_manager(resource_path, logger, target_path=None):
     :param target_path: optional target path for the resource
     :returns: path to the downloaded resource
     """
-    resource = get_resource_from_manager(resource_path)
-    return _save_resource(logger, resource, resource_path, target_path)
+    target_path = _target_path(resource_path, target_path)
+    url = '{0}/{1}'.format(utils.get_manager_file_server_url(),
+                           resource_path)
+    _save_response(_request_resource(url, stream=True), target_path)
+    logger.info("Downloaded %s to %s" % (resource_path, target_path))
+    return target_path
 
 
 def download_resource(blueprint_id,
@@ -201,11 +213,11 @@ def download_resource(blueprint_id,
     :param target_path: optional target path for the resource
     :returns: path to the downloaded resource
     """
-    resource = get_resource(blueprint_id,
-                            deployment_id,
-                            tenant_name,
-                            resource_path)
-    return _save_resource(logger, resource, resource_path, target_path)
+    target_path = _target_path(resource_path, target_path)
+    _fetch_resource(blueprint_id, deployment_id, tenant_name,
+                    resource_path, target_path=target_path)
+    logger.info("Downloaded %s to %s" % (resource_path, target_path))
+    return target_path
 
 
 def get_resource_from_manager(resource_path, base_url=None):
@@ -219,6 +231,17 @@ def get_resource_from_manager(resource_path, base_url=None):
         base_url = utils.get_manager_file_server_url()
 
     url = '{0}/{1}'.format(base_url, resource_path)
+    return _request_resource(url).content
+
+
+def _request_resource(url, entry=None, stream=False):
+    """GET a resource from the manager file server.
+
+    :param entry: optional resource cache entry, to validate
+    :param stream: whether to leave the content to be read in chunks
+    :returns: the response, which is not modified (304) when the cached
+              resource is still valid
+    """
     verify = utils.get_local_rest_certificate()
 
     headers = {}
@@ -228,10 +251,19 @@ def get_resource_from_manager(resource_path, base_url=None):
     except NotInContext:
         headers[constants.CLOUDIFY_TOKEN_AUTHENTICATION_HEADER] = \
             workflow_ctx.rest_token
-    response = requests.get(url, verify=verify, headers=headers)
+    if entry and entry.get('digest'):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    response = requests.get(url, verify=verify, headers=headers,
+                            stream=stream)
+    if response.status_code == 304 and entry:
+        return response
     if not response.ok:
+        response.close()
         raise HttpException(url, response.status_code, response.reason)
-    return response.content
+    return response
 
 
 def get_resource(blueprint_id, deployment_id, tenant_name, resource_path):
@@ -252,10 +284,79 @@ def get_resource(blueprint_id, deployment_id, tenant_name, resource_path):
     :param resource_path: path to resource relative to blueprint folder
     :returns: resource content
     """
+    return _fetch_resource(blueprint_id, deployment_id, tenant_name,
+                           resource_path)
+
+
+def _fetch_resource(blueprint_id, deployment_id, tenant_name,
+                    resource_path, target_path=None):
+    """Get a resource, or stream it to target_path if given.
+
+    :returns: the resource content, or target_path
+    """
+    stream = target_path is not None
+
+    def _result(response):
+        if not stream:
+            return response.content
+        _save_response(response, target_path)
+        return target_path
+
+    cache = resource_cache.get_resource_cache()
+    if cache is None:
+        return _result(_find_resource(blueprint_id, deployment_id,
+                                      tenant_name, resource_path,
+                                      stream=stream)[1])
+
+    # the url remembered for the resource is requested first, skipping the
+    # lookup in the deployment and blueprint folders
+    key = (tenant_name, blueprint_id, deployment_id, resource_path)
+    entry = cache.get(key)
+    response = None
+    if entry is not None:
+        url = entry['url']
+        try:
+            response = _request_resource(url, entry, stream=stream)
+        except HttpException as e:
+            if e.code != 404:
+                raise
+            cache.remove(key)
+        else:
+            if response.status_code == 304:
+                if stream and cache.copy(entry, target_path):
+                    return target_path
+                content = None if stream else cache.read(entry)
+                if content is not None:
+                    return content
+                # evicted since validated
+                response = _request_resource(url, stream=stream)
+    if response is None:
+        url, response = _find_resource(blueprint_id, deployment_id,
+                                       tenant_name, resource_path,
+                                       stream=stream)
+    result = _result(response)
+    validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
+    if stream:
+        cache.put(key, url, content_path=target_path, **validators)
+    else:
+        cache.put(key, url, result, **validators)
+    return result
+
+
+def _find_resource(blueprint_id, deployment_id, tenant_name, resource_path,
+                   stream=False):
+    """Look up a resource in the deployment folder, then the blueprint's.
+
+    :returns: tuple of the url the resource was found at and the response
+    """
 
     def _get_resource(base_url):
+        url = '{0}/{1}'.format(base_url, resource_path)
         try:
-            return get_resource_from_manager(resource_path, base_url=base_url)
+            return url, _request_resource(url, stream=stream)
         except HttpException as e:
             if e.code != 404:
                 raise
@@ -316,6 +417,23 @@ def get_node_instance(node_instance_id, evaluate_functions=False):
         node_instance_id,
         evaluate_functions=evaluate_functions
     )
+    return _to_node_instance(node_instance_id, instance)
+
+
+def get_node_instances(node_instance_ids):
+    """
+    Read the data of several node instances from the storage at once.
+
+    :param node_instance_ids: the node instance ids
+    :return: dict of the found node instances by their id
+    """
+    client = get_rest_client()
+    instances = client.node_instances.get_many(node_instance_ids)
+    return dict((instance_id, _to_node_instance(instance_id, instance))
+                for instance_id, instance in instances.items())
+
+
+def _to_node_instance(node_instance_id, instance):
     return NodeInstance(node_instance_id,
                         instance.node_id,
                         runtime_properties=instance.runtime_properties,
@@ -339,6 +457,26 @@ def update_node_instance(node_instance):
         version=node_instance.version)
 
 
+def update_node_instances(node_instances):
+    """
+    Update the data changes of several node instances in the storage.
+
+    Each node instance is checked against its own version, and a failed
+    update does not prevent the updates of the others.
+
+    :param node_instances: the node instances with the updated data
+    :return: dict of the update errors by node instance id
+    """
+    client = get_rest_client()
+    _, errors = client.node_instances.update_many(
+        dict(node_instance_id=node_instance.id,
+             state=node_instance.state,
+             runtime_properties=node_instance.runtime_properties,
+             version=node_instance.version)
+        for node_instance in node_instances)
+    return errors
+
+
 def get_node_instance_ip(node_instance_id):
     """
     Get the IP address of the host the node instance denoted by
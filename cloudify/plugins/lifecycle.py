@@ -86,6 +86,12 @@ class LifecycleProcessor(object):
         self.intact_nodes = related_nodes or set()
         self.modified_relationship_ids = modified_relationship_ids or {}
         self.ignore_failure = ignore_failure
+        # relationships are matched by their target ids, so membership
+        # checks don't depend on the type of the given collections
+        self._node_instance_ids = set(
+            instance.id for instance in self.node_instances)
+        self._intact_node_ids = set(
+            instance.id for instance in self.intact_nodes)
 
     def install(self):
         self._process_node_instances(
@@ -132,7 +138,7 @@ class LifecycleProcessor(object):
                                install=install)
 
         def intact_on_dependency_added(instance, rel, source_task_sequence):
-            if (rel.target_node_instance in self.node_instances or
+            if (rel.target_id in self._node_instance_ids or
                     rel.target_node_instance.node_id in
                     self.modified_relationship_ids.get(instance.node_id, {})):
                 intact_tasks = _relationship_operations(rel, intact_op)
@@ -150,18 +156,17 @@ class LifecycleProcessor(object):
 
     def _add_dependencies(self, subgraphs, instances, install,
                           on_dependency_added=None):
-        subgraph_sequences = dict(
-            (instance_id, subgraph.sequence())
-            for instance_id, subgraph in subgraphs.items())
+        subgraph_sequences = {}
         for instance in instances:
             relationships = list(instance.relationships)
             if not install:
                 relationships = reversed(relationships)
             for rel in relationships:
-                if (rel.target_node_instance in self.node_instances or
-                        rel.target_node_instance in self.intact_nodes):
+                target_id = rel.target_id
+                if (target_id in self._node_instance_ids or
+                        target_id in self._intact_node_ids):
                     source_subgraph = subgraphs[instance.id]
-                    target_subgraph = subgraphs[rel.target_id]
+                    target_subgraph = subgraphs[target_id]
                     if install:
                         self.graph.add_dependency(source_subgraph,
                                                   target_subgraph)
@@ -169,7 +174,10 @@ class LifecycleProcessor(object):
                         self.graph.add_dependency(target_subgraph,
                                                   source_subgraph)
                     if on_dependency_added:
-                        task_sequence = subgraph_sequences[instance.id]
+                        task_sequence = subgraph_sequences.get(instance.id)
+                        if task_sequence is None:
+                            task_sequence = source_subgraph.sequence()
+                            subgraph_sequences[instance.id] = task_sequence
                         on_dependency_added(instance, rel, task_sequence)
 
 
@@ -376,7 +384,7 @@ def _wait_for_host_to_start(host_node_instance):
 
 
 def prepare_running_agent(host_node_instance):
-    tasks = []
+    tasks = [_refresh_agent_route(host_node_instance)]
     install_method = utils.internal.get_install_method(
         host_node_instance.node.properties)
 
@@ -408,6 +416,18 @@ def prepare_running_agent(host_node_instance):
     return tasks
 
 
+def _refresh_agent_route(host_node_instance):
+    # the agent was just installed, so the following tasks for the host are
+    # sent according to its new cloudify_agent runtime properties
+    ctx = host_node_instance.ctx
+    return ctx.local_task(
+        local_task=ctx.internal.agent_routes.invalidate,
+        node=host_node_instance,
+        kwargs={'host_id': host_node_instance.id},
+        info='refresh agent route',
+        send_task_events=False)
+
+
 def _host_post_start(host_node_instance):
     install_method = utils.internal.get_install_method(
         host_node_instance.node.properties)
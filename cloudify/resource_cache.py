@@ -0,0 +1,222 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import json
+import errno
+import shutil
+import hashlib
+import tempfile
+
+from cloudify import constants
+
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+ENTRIES_FOLDER = 'entries'
+OBJECTS_FOLDER = 'objects'
+
+
+class ResourceCache(object):
+    """An on-disk cache of the resources of the manager file server.
+
+    Entries are keyed by the resource tenant, blueprint, deployment and
+    path. An entry holds the url the resource was found at, its validators
+    (ETag and Last-Modified) and the digest of its content. Contents are
+    stored once per digest, so resources shared by several blueprints or
+    deployments are stored once.
+
+    The cache may be shared by several processes: files are written to
+    temporary files which are then renamed. Once the contents grow over
+    ``max_size`` bytes, the least recently used contents are evicted.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._entries = os.path.join(directory, ENTRIES_FOLDER)
+        self._objects = os.path.join(directory, OBJECTS_FOLDER)
+        for folder in [self._entries, self._objects]:
+            try:
+                os.makedirs(folder)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def get(self, key):
+        """The entry of a resource, or None if the resource is unknown.
+
+        :param key: (tenant, blueprint id, deployment id, resource path)
+        :returns: dict of url, etag, last_modified and digest. The digest
+                  is None unless the content of the resource is cached.
+        """
+        try:
+            with open(self._entry_path(key)) as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if entry.get('digest') and \
+                not os.path.exists(self._object_path(entry['digest'])):
+            entry['digest'] = None
+        return entry
+
+    def read(self, entry):
+        """The cached content of an entry, or None if it was evicted."""
+        if not entry.get('digest'):
+            return None
+        path = self._object_path(entry['digest'])
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            # modification times order the contents for eviction
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return content
+
+    def copy(self, entry, target_path):
+        """Copy the cached content of an entry to a file.
+
+        :returns: whether the content was copied, False if it was evicted
+        """
+        if not entry.get('digest'):
+            return False
+        path = self._object_path(entry['digest'])
+        try:
+            shutil.copyfile(path, target_path)
+            os.utime(path, None)
+        except (IOError, OSError):
+            if os.path.exists(path):
+                raise
+            return False
+        return True
+
+    def put(self, key, url, content=None, etag=None, last_modified=None,
+            content_path=None):
+        """Remember the url of a resource, and its content if validated.
+
+        The content is given either as a string or as the path of a file
+        holding it. It is only stored when the resource has a validator,
+        as it can not be revalidated otherwise, and fits in the cache.
+        """
+        digest = None
+        if content_path:
+            size = os.path.getsize(content_path)
+        else:
+            size = len(content) if content is not None else None
+        if size is not None and size <= self.max_size and \
+                (etag or last_modified):
+            if content_path:
+                digest = _file_digest(content_path)
+            else:
+                digest = hashlib.sha256(content).hexdigest()
+            path = self._object_path(digest)
+            if os.path.exists(path):
+                os.utime(path, None)
+            else:
+                if content_path:
+                    self._write_file(path, content_path)
+                else:
+                    self._write(path, content)
+                self._evict()
+        self._write(self._entry_path(key), json.dumps({
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'digest': digest
+        }))
+
+    def remove(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def _entry_path(self, key):
+        return os.path.join(self._entries,
+                            hashlib.sha1(repr(tuple(key))).hexdigest())
+
+    def _object_path(self, digest):
+        return os.path.join(self._objects, digest)
+
+    def _write(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.rename(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def _write_file(self, path, source_path):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.rename(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def _evict(self):
+        objects = []
+        total_size = 0
+        for name in os.listdir(self._objects):
+            try:
+                stat = os.stat(os.path.join(self._objects, name))
+            except OSError:
+                continue
+            objects.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+        objects.sort()
+        while total_size > self.max_size and objects:
+            _, size, name = objects.pop(0)
+            try:
+                os.remove(os.path.join(self._objects, name))
+            except OSError:
+                continue
+            total_size -= size
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_resource_cache():
+    """The resource cache of this agent, None if caching is disabled.
+
+    The cache directory is set by the CLOUDIFY_RESOURCE_CACHE_DIR
+    environment variable, defaulting to a folder in the agent work
+    directory. Its size is set by CLOUDIFY_RESOURCE_CACHE_SIZE in bytes,
+    where 0 disables caching.
+    """
+    max_size = int(os.environ.get(constants.RESOURCE_CACHE_SIZE_KEY) or
+                   DEFAULT_MAX_SIZE)
+    if max_size <= 0:
+        return None
+    directory = os.environ.get(constants.RESOURCE_CACHE_DIR_KEY)
+    if not directory:
+        work_dir = os.environ.get(constants.CELERY_WORK_DIR_KEY)
+        if not work_dir:
+            return None
+        directory = os.path.join(work_dir, 'resource_cache')
+    return ResourceCache(directory, max_size=max_size)
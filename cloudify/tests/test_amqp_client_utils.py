@@ -0,0 +1,143 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+import threading
+
+import mock
+import testtools
+
+from cloudify import amqp_client_utils
+from cloudify.exceptions import (ClosedAMQPClientException,
+                                 TimeoutException)
+
+
+class _TestAMQPClient(amqp_client_utils._GlobalAMQPClient):
+    MAX_QUEUE_SIZE = 5
+    BATCH_SIZE = 3
+    EVENT_PUT_TIMEOUT = 0.1
+
+
+class TestGlobalAMQPClient(testtools.TestCase):
+
+    def setUp(self):
+        super(TestGlobalAMQPClient, self).setUp()
+        self.batches = []
+        self.publishing = threading.Event()
+        self.release = threading.Event()
+
+        def publish_messages(messages):
+            self.publishing.set()
+            self.release.wait(5)
+            self.batches.append(messages)
+
+        self.amqp_client = mock.Mock()
+        self.amqp_client.publish_messages.side_effect = publish_messages
+        patch = mock.patch('cloudify.amqp_client.create_client',
+                           return_value=self.amqp_client)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_messages_published_in_batches(self):
+        client = _TestAMQPClient()
+        with client:
+            client.publish_message({'id': 0}, 'event')
+            self.publishing.wait(5)
+            # queued while the first message is being published
+            for i in range(1, 5):
+                client.publish_message({'id': i}, 'log')
+            self.release.set()
+        self.assertEqual([
+            [({'id': 0}, 'event')],
+            [({'id': 1}, 'log'), ({'id': 2}, 'log'), ({'id': 3}, 'log')],
+            [({'id': 4}, 'log')]
+        ], self.batches)
+        metrics = client.metrics()
+        self.assertEqual(5, metrics['published'])
+        self.assertEqual(3, metrics['batches'])
+        self.assertEqual(0, metrics['queue_depth'])
+        self.assertGreaterEqual(metrics['max_latency'],
+                                metrics['average_latency'])
+        self.amqp_client.close.assert_called_once_with()
+
+    def test_logs_dropped_when_queue_full(self):
+        client = _TestAMQPClient()
+        with client:
+            client.publish_message({'id': 0}, 'log')
+            self.publishing.wait(5)
+            for i in range(1, 8):
+                client.publish_message({'id': i}, 'log')
+            self.assertEqual(5, client.metrics()['queue_depth'])
+            self.assertEqual(2, client.metrics()['dropped'])
+            self.release.set()
+        published = [message['id'] for batch in self.batches
+                     for message, _ in batch]
+        self.assertEqual(range(6), published)
+
+    def test_batch_published_again_on_closed_client(self):
+        self.release.set()
+        self.amqp_client.publish_messages.side_effect = [
+            ClosedAMQPClientException(), None]
+        client = _TestAMQPClient()
+        with client:
+            client.publish_message({'id': 0}, 'event')
+        self.assertEqual(
+            [mock.call([({'id': 0}, 'event')])] * 2,
+            self.amqp_client.publish_messages.call_args_list)
+        self.assertEqual(1, client.metrics()['published'])
+
+    def test_publishing_continues_after_error(self):
+        self.release.set()
+        self.amqp_client.publish_messages.side_effect = [
+            RuntimeError('connection lost'), None]
+        client = _TestAMQPClient()
+        with client:
+            client.publish_message({'id': 0}, 'event')
+            deadline = time.time() + 5
+            while not client.metrics()['dropped']:
+                self.assertLess(time.time(), deadline)
+                time.sleep(0.01)
+            self.assertTrue(client._thread.is_alive())
+            client.publish_message({'id': 1}, 'event')
+        self.assertEqual(2, self.amqp_client.publish_messages.call_count)
+        metrics = client.metrics()
+        self.assertEqual(1, metrics['published'])
+        self.assertEqual(1, metrics['dropped'])
+
+    def test_event_put_times_out_when_queue_full(self):
+        client = _TestAMQPClient()
+        with client:
+            client.publish_message({'id': 0}, 'log')
+            self.publishing.wait(5)
+            for i in range(1, 6):
+                client.publish_message({'id': i}, 'log')
+            self.assertRaises(TimeoutException, client.publish_message,
+                              {'id': 6}, 'event')
+            # stopping does not wait for room in the queue
+            client._disconnect()
+            self.release.set()
+        published = [message['id'] for batch in self.batches
+                     for message, _ in batch]
+        self.assertEqual(range(6), published)
+        self.assertFalse(client._thread.is_alive())
+
+    def test_event_put_does_not_wait_without_publishing_thread(self):
+        client = _TestAMQPClient()
+        for i in range(5):
+            client.publish_message({'id': i}, 'log')
+        with mock.patch.object(_TestAMQPClient, 'EVENT_PUT_TIMEOUT', 30):
+            e = self.assertRaises(TimeoutException, client.publish_message,
+                                  {'id': 5}, 'event')
+        self.assertIn('not running', str(e))
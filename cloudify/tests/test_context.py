@@ -32,6 +32,7 @@ from cloudify.decorators import operation
 from cloudify.manager import NodeInstance
 from cloudify.workflows import local
 from cloudify import constants, state, context, exceptions, conflict_handlers
+from cloudify.endpoint import LocalEndpoint
 
 import cloudify.tests as tests_path
 from cloudify.test_utils import workflow_test
@@ -394,6 +395,44 @@ def _context_with_endpoint(endpoint, **kwargs):
     return context.NodeInstanceContext(**context_kwargs)
 
 
+class TestEvaluateFunctions(testtools.TestCase):
+
+    def setUp(self):
+        super(TestEvaluateFunctions, self).setUp()
+        self.storage = mock.Mock()
+        self.storage.env.evaluate_functions.side_effect = \
+            lambda payload, context: payload.update(evaluated=True) or payload
+        ctx = mock.Mock(type=constants.DEPLOYMENT)
+        self.endpoint = LocalEndpoint(ctx, self.storage)
+        self.function = {'get_attribute': ['SELF', 'port']}
+        self.payload = {'plain': {'key': 'value'},
+                        'port': self.function,
+                        'urls': ['a', self.function]}
+
+    def test_whole_payload_evaluated(self):
+        self.endpoint.evaluate_functions(self.payload)
+        self.storage.env.evaluate_functions.assert_called_once_with(
+            payload=self.payload, context={})
+
+    def test_only_paths_evaluated(self):
+        self.storage.env.evaluate_functions.side_effect = \
+            lambda payload, context: {'functions': [8080, 8081]}
+        result = self.endpoint.evaluate_functions(
+            self.payload, paths=[['port'], ['urls', 1]])
+        self.storage.env.evaluate_functions.assert_called_once_with(
+            payload={'functions': [self.function, self.function]},
+            context={})
+        self.assertEqual({'plain': {'key': 'value'},
+                          'port': 8080,
+                          'urls': ['a', 8081]}, result)
+
+    def test_no_paths_not_evaluated(self):
+        self.assertEqual(self.payload,
+                         self.endpoint.evaluate_functions(self.payload,
+                                                          paths=[]))
+        self.assertFalse(self.storage.env.evaluate_functions.called)
+
+
 class TestPropertiesRefresh(testtools.TestCase):
     def test_refresh_fetches(self):
         """Refreshing a node instance fetches new properties."""
@@ -15,6 +15,8 @@
 
 import sys
 import os
+import time
+import threading
 import tempfile
 import shutil
 import logging
@@ -23,6 +25,7 @@ from mock import patch, MagicMock, Mock
 import testtools
 
 from cloudify import amqp_client
+from cloudify import constants
 from cloudify import dispatch
 from cloudify import exceptions
 from cloudify import utils
@@ -376,6 +379,97 @@ class TestDispatchTaskHandler(testtools.TestCase):
         }, args=args or [], kwargs=kwargs or {})
 
 
+class TestDispatchWorkerPool(TestDispatchTaskHandler):
+    """Run the dispatch tests using warm dispatch workers"""
+
+    def setUp(self):
+        super(TestDispatchWorkerPool, self).setUp()
+        env = patch.dict(os.environ, {
+            constants.DISPATCH_POOL_SIZE_KEY: '1',
+            constants.DISPATCH_POOL_MAX_TASKS_KEY: '3'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self._close_pool)
+
+    @staticmethod
+    def _close_pool():
+        if dispatch._worker_pool:
+            dispatch._worker_pool.close()
+            dispatch._worker_pool = None
+
+    def _pid(self):
+        return self._operation(func9, task_target='stub') \
+            .dispatch_to_subprocess()
+
+    def test_worker_reused(self):
+        pid = self._pid()
+        self.assertNotEqual(os.getpid(), pid)
+        self.assertEqual(pid, self._pid())
+
+    def test_worker_recycled_after_max_tasks(self):
+        pids = [self._pid() for _ in range(4)]
+        self.assertEqual(1, len(set(pids[:3])))
+        self.assertNotEqual(pids[0], pids[3])
+
+    def test_worker_recycled_after_error(self):
+        pid = self._pid()
+        self.assertRaises(
+            exceptions.RecoverableError,
+            self._operation(func8, task_target='stub',
+                            args=['message']).dispatch_to_subprocess)
+        self.assertNotEqual(pid, self._pid())
+
+    def test_worker_exit(self):
+        pid = self._pid()
+        op_handler = self._operation(func10, task_target='stub')
+        e = self.assertRaises(exceptions.NonRecoverableError,
+                              op_handler.dispatch_to_subprocess)
+        self.assertIn('Unhandled exception occurred in operation dispatch',
+                      str(e))
+        self.assertNotEqual(pid, self._pid())
+
+    def test_worker_restores_cwd_and_env(self):
+        pid = self._pid()
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        self._operation(func11, task_target='stub',
+                        args=[workdir]).dispatch_to_subprocess()
+        worker_pid, cwd, value = self._operation(
+            func12, task_target='stub').dispatch_to_subprocess()
+        self.assertEqual(pid, worker_pid)
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertIsNone(value)
+
+    def test_worker_keeps_module_state(self):
+        first = self._operation(func13, task_target='stub') \
+            .dispatch_to_subprocess()
+        second = self._operation(func13, task_target='stub') \
+            .dispatch_to_subprocess()
+        # unlike dispatch subprocesses, a worker keeps module globals
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[1] + 1, second[1])
+
+    def test_worker_recycled_after_leftover_thread(self):
+        pid = self._pid()
+        self._operation(func14, task_target='stub').dispatch_to_subprocess()
+        self.assertNotEqual(pid, self._pid())
+
+    def test_worker_keyed_by_plugin(self):
+        op_handler = self._operation(func9, task_target='stub')
+        env = op_handler._build_subprocess_env()
+        key = op_handler._worker_key(env)
+        self.assertEqual(key, op_handler._worker_key(env))
+        op_handler.cloudify_context['plugin'] = {'name': 'plugin',
+                                                 'package_name': 'package',
+                                                 'package_version': '1.0'}
+        plugin_key = op_handler._worker_key(env)
+        self.assertNotEqual(key, plugin_key)
+        op_handler.cloudify_context['plugin']['package_version'] = '2.0'
+        self.assertNotEqual(plugin_key, op_handler._worker_key(env))
+        op_handler.cloudify_context['deployment_id'] = 'other'
+        self.assertNotEqual(key, op_handler._worker_key(env))
+
+
 if os.environ.get('CLOUDIFY_DISPATCH'):
     amqp_client.create_client = Mock()
 
@@ -426,6 +520,38 @@ def func8(message):
     raise RuntimeError(message)
 
 
+def func9():
+    return os.getpid()
+
+
+def func10():
+    os._exit(1)
+
+
+def func11(workdir):
+    os.chdir(workdir)
+    os.environ['FUNC11_VAR'] = 'value'
+
+
+def func12():
+    return os.getpid(), os.getcwd(), os.environ.get('FUNC11_VAR')
+
+
+def func13():
+    global func13_calls
+    func13_calls += 1
+    return os.getpid(), func13_calls
+
+
+func13_calls = 0
+
+
+def func14():
+    thread = threading.Thread(target=time.sleep, args=(60,))
+    thread.daemon = True
+    thread.start()
+
+
 class UserException(Exception):
     pass
 
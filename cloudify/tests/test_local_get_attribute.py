@@ -86,6 +86,9 @@ def run_all_operations(**_):
     node = workflow_ctx.get_node('node1')
     instance = next(node.instances)
     instance.execute_operation('test.op')
+    # functions in kwargs are evaluated as well as the indexed ones
+    instance.execute_operation('test.op', kwargs={
+        'extra': {'get_attribute': ['SELF', 'self_ref_property']}})
     relationship = next(instance.relationships)
     relationship.execute_source_operation('test.op')
     relationship.execute_target_operation('test.op')
@@ -107,7 +110,9 @@ def op(self_ref=None,
        source_ref=None,
        target_ref=None,
        static=None,
+       extra=None,
        **_):
+    assert extra in (None, 'self_ref_value'), 'extra: {0}'.format(extra)
     if operation_ctx.type == constants.NODE_INSTANCE:
         assert self_ref == 'self_ref_value', \
             'self: {0}'.format(self_ref)
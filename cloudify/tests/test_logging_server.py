@@ -86,10 +86,12 @@ class TestLoggingServer(testtools.TestCase):
 
     def test_server_logging_handler_type_on_management(self):
         with patch.dict(os.environ, {'MGMTWORKER_HOME': 'stub'}):
-            self._test_server_logging_type(logging.FileHandler)
+            self._test_server_logging_type(
+                logging_server.BufferedFileHandler)
 
     def test_server_logging_handler_type_on_agent(self):
-        self._test_server_logging_type(logging.handlers.RotatingFileHandler)
+        self._test_server_logging_type(
+            logging_server.BufferedRotatingFileHandler)
 
     def _test_server_logging_type(self, expected_type):
         server, _ = self.test_basic()
@@ -98,6 +100,48 @@ class TestLoggingServer(testtools.TestCase):
         # type(server_handler) doesn't do the right thing on 2.6
         self.assertEqual(server_handler.__class__, expected_type)
 
+    def test_handler_stats(self):
+        server, logger = self.test_basic()
+        logger.info('second message')
+        self._assert_in_log('second message')
+        other_logger = self._logger(server, 'other')
+        other_logger.info('other message')
+        self._assert_in_log('other message', 'other')
+        self.assertEqual({
+            'received': 3,
+            'open_handlers': 2,
+            'handler_hits': 1,
+            'handler_misses': 2,
+            'handler_evictions': 0
+        }, server.info(self.worker)['logging_server']['stats'])
+
+    def test_burst_written_on_drain(self):
+        server, logger = self.test_basic()
+        messages = ['burst message {0}'.format(i) for i in range(2000)]
+        for message in messages:
+            logger.info(message)
+        self._assert_in_log(messages[-1])
+        with open(os.path.join(self.workdir, 'logger.log')) as f:
+            logged = f.read()
+        for message in messages:
+            self.assertIn(message, logged)
+
+    @patch('cloudify.celery.logging_server.ROTATION_INTERVAL', 3600)
+    @patch('cloudify.celery.logging_server.LOGFILE_SIZE_BYTES', 100)
+    def test_rotation(self):
+        server, logger = self.test_basic()
+        logger.info('x' * 200)
+        self._assert_in_log('x' * 200)
+        logfile = os.path.join(self.workdir, 'logger.log')
+        # not rotated when emitting
+        self.assertFalse(os.path.exists(logfile + '.1'))
+        server.logging_server._rotate_handlers()
+        self.assertTrue(os.path.exists(logfile + '.1'))
+        logger.info('after rotation')
+        self._assert_in_log('after rotation')
+        with open(logfile) as f:
+            self.assertNotIn('x' * 200, f.read())
+
     def test_error_on_processing(self):
         server, logger = self.test_basic()
         for i in range(10):
@@ -14,9 +14,10 @@
 #    * limitations under the License.
 
 import unittest
+import threading
 import collections
 
-from cloudify.lru_cache import lru_cache
+from cloudify.lru_cache import lru_cache, LRUCache
 
 
 class TestLRUCacheDecorator(unittest.TestCase):
@@ -67,3 +68,76 @@ class TestLRUCacheDecorator(unittest.TestCase):
         func.clear()
         self.assertEqual(set([0, 1, 2]), set(purges))
         self.assertEqual(0, len(func._cache))
+
+    def test_stats(self):
+        @lru_cache(maxsize=2)
+        def func(index):
+            return index
+
+        for i in [0, 1, 0, 2, 1]:
+            func(i)
+        self.assertEqual({
+            'size': 2,
+            'maxsize': 2,
+            'hits': 1,
+            'misses': 4,
+            'evictions': 2,
+            'expirations': 0
+        }, func.stats())
+        self.assertEqual([(2,), (1,)], func.cache.keys())
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_least_recently_used_evicted(self):
+        purges = []
+        cache = LRUCache(maxsize=2, on_purge=purges.append)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.put('c', 3)
+        self.assertEqual([2], purges)
+        self.assertNotIn('b', cache)
+        self.assertEqual(['a', 'c'], cache.keys())
+
+    def test_ttl(self):
+        now = [0]
+        purges = []
+        cache = LRUCache(ttl=10, on_purge=purges.append,
+                         timer=lambda: now[0])
+        cache.put('a', 1)
+        now[0] = 5
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        now[0] = 10
+        self.assertNotIn('a', cache)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual([1], purges)
+        self.assertEqual(2, cache.get('b'))
+        now[0] = 15
+        cache.expire()
+        self.assertEqual([1, 2], purges)
+        self.assertEqual(0, len(cache))
+        self.assertEqual(2, cache.stats()['expirations'])
+
+    def test_thread_safe(self):
+        calls = []
+
+        @lru_cache(maxsize=10, thread_safe=True)
+        def func(index):
+            calls.append(index)
+            return index
+
+        def run():
+            for i in range(1000):
+                func(i % 20)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = func.stats()
+        self.assertEqual(4000, stats['hits'] + stats['misses'])
+        self.assertEqual(len(calls), stats['misses'])
+        self.assertEqual(10, len(func._cache))
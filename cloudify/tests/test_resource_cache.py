@@ -0,0 +1,172 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import shutil
+import tempfile
+
+import mock
+import testtools
+
+from cloudify import constants, manager
+from cloudify.resource_cache import ResourceCache
+
+
+def _response(status_code, content='', etag=None):
+    response = mock.Mock()
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.reason = 'reason'
+    response.content = content
+    response.iter_content.return_value = [content[:2], content[2:]]
+    response.headers = {'ETag': etag} if etag else {}
+    return response
+
+
+class TestResourceCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestResourceCache, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_put_and_read(self):
+        cache = ResourceCache(self.directory)
+        key = ('tenant', 'blueprint', 'deployment', 'script.sh')
+        self.assertIsNone(cache.get(key))
+        cache.put(key, 'http://url', 'content', etag='"1"')
+        entry = cache.get(key)
+        self.assertEqual('http://url', entry['url'])
+        self.assertEqual('"1"', entry['etag'])
+        self.assertEqual('content', cache.read(entry))
+        cache.remove(key)
+        self.assertIsNone(cache.get(key))
+
+    def test_content_without_validator_not_stored(self):
+        cache = ResourceCache(self.directory)
+        key = ('tenant', 'blueprint', None, 'script.sh')
+        cache.put(key, 'http://url', 'content')
+        entry = cache.get(key)
+        self.assertEqual('http://url', entry['url'])
+        self.assertIsNone(cache.read(entry))
+
+    def test_same_content_stored_once(self):
+        cache = ResourceCache(self.directory)
+        cache.put(('t', 'b1', None, 'a'), 'http://1', 'content', etag='"1"')
+        cache.put(('t', 'b2', None, 'a'), 'http://2', 'content', etag='"1"')
+        self.assertEqual(1, len(os.listdir(os.path.join(self.directory,
+                                                        'objects'))))
+
+    def test_least_recently_used_evicted(self):
+        cache = ResourceCache(self.directory, max_size=12)
+        keys = [('t', 'b', None, str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, 'http://url', str(i) * 4, etag='"1"')
+            # modification times must differ
+            os.utime(cache._object_path(cache.get(key)['digest']),
+                     (i, i))
+        cache.read(cache.get(keys[0]))
+        cache.put(('t', 'b', None, '3'), 'http://url', '3333', etag='"1"')
+        self.assertIsNotNone(cache.read(cache.get(keys[0])))
+        self.assertIsNone(cache.get(keys[1])['digest'])
+        self.assertIsNone(cache.read(cache.get(keys[1])))
+
+
+class TestGetResourceCached(testtools.TestCase):
+
+    def setUp(self):
+        super(TestGetResourceCached, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        patches = [
+            mock.patch.dict(os.environ, {
+                constants.RESOURCE_CACHE_DIR_KEY: directory,
+                constants.MANAGER_FILE_SERVER_URL_KEY: 'http://manager',
+                constants.LOCAL_REST_CERT_FILE_KEY: 'cert'
+            }),
+            mock.patch('cloudify.manager.ctx'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _get_resource(self):
+        return manager.get_resource('blueprint', 'deployment', 'tenant',
+                                    'script.sh')
+
+    @mock.patch('cloudify.manager.get_rest_client')
+    @mock.patch('cloudify.manager.requests.get')
+    def test_resolved_folder_and_content_reused(self, get, get_rest_client):
+        get_rest_client.return_value.blueprints.get.return_value = {
+            'visibility': 'tenant'}
+        get.side_effect = [_response(404),
+                           _response(200, 'content', etag='"1"')]
+        self.assertEqual('content', self._get_resource())
+        self.assertEqual(2, get.call_count)
+        blueprint_url = get.call_args[0][0]
+        self.assertIn('blueprints/tenant/blueprint', blueprint_url)
+
+        get.reset_mock()
+        get_rest_client.reset_mock()
+        get.side_effect = [_response(304)]
+        self.assertEqual('content', self._get_resource())
+        get.assert_called_once_with(blueprint_url, verify='cert',
+                                    headers=mock.ANY, stream=False)
+        self.assertEqual('"1"',
+                         get.call_args[1]['headers']['If-None-Match'])
+        self.assertFalse(get_rest_client.called)
+
+        get.reset_mock()
+        get.side_effect = [_response(200, 'changed', etag='"2"')]
+        self.assertEqual('changed', self._get_resource())
+        get.side_effect = [_response(304)]
+        self.assertEqual('changed', self._get_resource())
+
+    @mock.patch('cloudify.manager.get_rest_client')
+    @mock.patch('cloudify.manager.requests.get')
+    def test_removed_resource_looked_up_again(self, get, get_rest_client):
+        get.side_effect = [_response(200, 'content', etag='"1"')]
+        self.assertEqual('content', self._get_resource())
+        get.side_effect = [_response(404), _response(404), _response(404)]
+        get_rest_client.return_value.blueprints.get.return_value = {
+            'visibility': 'tenant'}
+        error = self.assertRaises(manager.HttpException, self._get_resource)
+        self.assertEqual(404, error.code)
+        self.assertEqual(4, get.call_count)
+
+    @mock.patch('cloudify.manager.get_rest_client')
+    @mock.patch('cloudify.manager.requests.get')
+    def test_download_streamed_and_cached(self, get, get_rest_client):
+        target_path = os.path.join(tempfile.mkdtemp(), 'script.sh')
+        self.addCleanup(shutil.rmtree, os.path.dirname(target_path))
+        logger = mock.Mock()
+
+        get.side_effect = [_response(200, 'content', etag='"1"')]
+        self.assertEqual(target_path, manager.download_resource(
+            'blueprint', 'deployment', 'tenant', 'script.sh', logger,
+            target_path=target_path))
+        self.assertTrue(get.call_args[1]['stream'])
+        with open(target_path) as f:
+            self.assertEqual('content', f.read())
+        os.remove(target_path)
+
+        get.side_effect = [_response(304)]
+        manager.download_resource('blueprint', 'deployment', 'tenant',
+                                  'script.sh', logger,
+                                  target_path=target_path)
+        with open(target_path) as f:
+            self.assertEqual('content', f.read())
+        get.side_effect = [_response(304)]
+        self.assertEqual('content', self._get_resource())
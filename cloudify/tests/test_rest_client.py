@@ -0,0 +1,209 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+import threading
+import SocketServer
+import BaseHTTPServer
+
+import mock
+import testtools
+
+from cloudify_rest_client import client
+from cloudify_rest_client.exceptions import CloudifyClientError
+from cloudify_rest_client.node_instances import NodeInstancesClient
+from cloudify_rest_client.responses import ListResponse, iterate_pages
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = '{"items": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class TestHTTPClientSessions(testtools.TestCase):
+
+    def _client(self, **kwargs):
+        return client.HTTPClient('localhost', **kwargs)
+
+    def test_session_shared_by_verification_settings(self):
+        verified = self._client()
+        self.assertIs(verified._session, self._client()._session)
+        unverified = self._client(trust_all=True)
+        self.assertIsNot(verified._session, unverified._session)
+        self.assertIs(unverified._session,
+                      self._client(trust_all=True)._session)
+        with_cert = self._client(cert='/path/to/cert')
+        self.assertIsNot(verified._session, with_cert._session)
+        self.assertIsNot(unverified._session, with_cert._session)
+
+    def test_session_follows_changed_verification_settings(self):
+        http_client = self._client()
+        verified_session = http_client._session
+        http_client.trust_all = True
+        self.assertIsNot(verified_session, http_client._session)
+
+    def test_connect_not_retried_by_default(self):
+        adapter = self._client()._session.get_adapter('http://localhost')
+        self.assertEqual(0, adapter.max_retries.total)
+        adapter = self._client(connect_retries=2)._session.get_adapter(
+            'http://localhost')
+        self.assertEqual(2, adapter.max_retries.connect)
+        self.assertEqual(0, adapter.max_retries.read)
+
+    def test_connections_reused(self):
+        server = _ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.shutdown)
+
+        before = client.connection_stats()
+        # a distinct pool size, so no other test shares the session
+        clients = [client.HTTPClient('127.0.0.1', port=server.server_port,
+                                     pool_maxsize=3) for _ in range(2)]
+        # the kept alive connection is closed before the server shuts down
+        self.addCleanup(clients[0]._session.close)
+        for http_client in clients * 2:
+            self.assertEqual({'items': []}, http_client.get('/nodes'))
+        after = client.connection_stats()
+        self.assertEqual(4, after['requests'] - before['requests'])
+        self.assertEqual(1, after['connections_opened'] -
+                         before['connections_opened'])
+        self.assertEqual(3, after['connections_reused'] -
+                         before['connections_reused'])
+
+
+class TestNodeInstancesUpdateMany(testtools.TestCase):
+
+    def test_updates_sent_concurrently(self):
+        lock = threading.Lock()
+        running = [0]
+        all_running = threading.Event()
+
+        def patch(uri, data, **kwargs):
+            node_instance_id = uri.rsplit('/', 1)[-1]
+            with lock:
+                running[0] += 1
+                if running[0] == 3:
+                    all_running.set()
+            all_running.wait(5)
+            if node_instance_id == 'b':
+                raise CloudifyClientError('conflict', status_code=409)
+            return dict(data, id=node_instance_id)
+
+        api = mock.Mock()
+        api.patch.side_effect = patch
+        updated, errors = NodeInstancesClient(api).update_many(
+            dict(node_instance_id=node_instance_id, state='started',
+                 version=1)
+            for node_instance_id in ['a', 'b', 'c'])
+        self.assertTrue(all_running.is_set())
+        self.assertEqual(['a', 'c'], sorted(updated))
+        self.assertEqual('started', updated['a'].state)
+        self.assertEqual(['b'], errors.keys())
+        self.assertEqual(409, errors['b'].status_code)
+
+
+class _PagedList(object):
+    """A list method stub, paging over items"""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+        self.threads = []
+
+    def __call__(self, _offset, _size, **kwargs):
+        self.calls.append((_offset, _size, kwargs))
+        self.threads.append(threading.current_thread())
+        return ListResponse(
+            self.items[_offset:_offset + _size],
+            {'pagination': {'offset': _offset, 'size': _size,
+                            'total': len(self.items)}})
+
+
+class TestIteratePages(testtools.TestCase):
+
+    def test_pages(self):
+        list_method = _PagedList(range(7))
+        self.assertEqual(range(7), list(iterate_pages(
+            list_method, page_size=3, deployment_id='d')))
+        self.assertEqual([(0, 3, {'deployment_id': 'd'}),
+                          (3, 3, {'deployment_id': 'd'}),
+                          (6, 3, {'deployment_id': 'd'})],
+                         list_method.calls)
+
+    def test_prefetch(self):
+        list_method = _PagedList(range(7))
+        items = iterate_pages(list_method, page_size=3, prefetch=True)
+        self.assertEqual(0, next(items))
+        # the second page is fetched while the first one is consumed
+        deadline = time.time() + 5
+        while len(list_method.calls) < 2:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(range(1, 7), list(items))
+        self.assertEqual([0, 3, 6],
+                         [offset for offset, _, _ in list_method.calls])
+        self.assertNotIn(threading.current_thread(), list_method.threads)
+
+    def test_break_stops_fetching(self):
+        for prefetch, fetched in [(False, 1), (True, 2)]:
+            list_method = _PagedList(range(10))
+            for item in iterate_pages(list_method, page_size=2,
+                                      prefetch=prefetch):
+                if item == 1:
+                    break
+            # the prefetched page may still be fetched after the break
+            deadline = time.time() + 5
+            while len(list_method.calls) < fetched:
+                self.assertLess(time.time(), deadline)
+                time.sleep(0.01)
+            self.assertEqual(fetched, len(list_method.calls))
+
+    def test_items_added_while_iterating(self):
+        list_method = _PagedList(range(4))
+        items = []
+        for item in iterate_pages(list_method, page_size=2):
+            items.append(item)
+            if item == 0:
+                list_method.items.extend([4, 5])
+        self.assertEqual(range(6), items)
+
+    def test_items_removed_while_iterating(self):
+        list_method = _PagedList(range(6))
+        items = []
+        for item in iterate_pages(list_method, page_size=2):
+            items.append(item)
+            if item == 0:
+                del list_method.items[:2]
+        # the items shifted before the offset are skipped
+        self.assertEqual([0, 1, 4, 5], items)
+        self.assertEqual(2, len(list_method.calls))
@@ -0,0 +1,161 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+import threading
+import unittest
+
+from mock import patch
+
+from cloudify.workflows import tasks
+from cloudify.workflows.tasks_graph import TaskDependencyGraph
+
+
+class _Task(tasks.WorkflowTask):
+    """A task that succeeds when applied, optionally from another thread"""
+
+    def __init__(self, executed, delay=None, retries=0):
+        super(_Task, self).__init__(workflow_context=None)
+        self.executed = executed
+        self.delay = delay
+        self.retries = retries
+        self.async_result = tasks.StubAsyncResult()
+
+    def apply_async(self):
+        self.executed.append(self)
+        if self.delay is None:
+            self.set_state(tasks.TASK_SUCCEEDED)
+        else:
+            timer = threading.Timer(self.delay, self.set_state,
+                                    args=(tasks.TASK_SUCCEEDED, ))
+            timer.daemon = True
+            timer.start()
+
+    def _handle_task_succeeded(self):
+        if self.current_retries < self.retries:
+            return tasks.HandlerResult.retry(retry_after=0.3)
+        return tasks.HandlerResult.cont()
+
+    def _duplicate(self):
+        return _Task(self.executed, delay=self.delay, retries=self.retries)
+
+    def is_local(self):
+        return True
+
+    @property
+    def name(self):
+        return 'task'
+
+    @property
+    def cloudify_context(self):
+        return {}
+
+
+class TestTaskDependencyGraphExecute(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = TaskDependencyGraph(workflow_context=None)
+        self.executed = []
+
+    def test_sequence_order(self):
+        sequence = self.graph.sequence()
+        chain = [_Task(self.executed) for _ in range(100)]
+        sequence.add(*chain)
+        start = time.time()
+        self.graph.execute()
+        self.assertEqual(chain, self.executed)
+        # a dependency edge no longer costs a full polling interval
+        self.assertLess(time.time() - start,
+                        len(chain) * TaskDependencyGraph.WAKEUP_INTERVAL)
+
+    def test_state_change_wakes_execution(self):
+        sequence = self.graph.sequence()
+        chain = [_Task(self.executed, delay=0.01) for _ in range(5)]
+        sequence.add(*chain)
+        start = time.time()
+        with patch.object(TaskDependencyGraph, 'WAKEUP_INTERVAL', 60):
+            self.graph.execute()
+        self.assertEqual(chain, self.executed)
+        self.assertLess(time.time() - start, 10)
+
+    def test_subgraph_dependencies(self):
+        first = self.graph.subgraph('first')
+        second = self.graph.subgraph('second')
+        first_tasks = [_Task(self.executed, delay=0.01) for _ in range(3)]
+        second_tasks = [_Task(self.executed) for _ in range(3)]
+        first.sequence().add(*first_tasks)
+        second.sequence().add(*second_tasks)
+        self.graph.add_dependency(second, first)
+        self.graph.execute()
+        self.assertEqual(first_tasks + second_tasks, self.executed)
+
+    def test_retry_waits_for_execute_after(self):
+        task = _Task(self.executed, retries=1)
+        after = _Task(self.executed)
+        self.graph.sequence().add(task, after)
+        start = time.time()
+        self.graph.execute()
+        self.assertGreaterEqual(time.time() - start, 0.3)
+        self.assertEqual(3, len(self.executed))
+        self.assertIs(after, self.executed[-1])
+        self.assertEqual(1, self.executed[1].current_retries)
+
+
+class TestTaskDependencyGraphStore(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = TaskDependencyGraph(workflow_context=None)
+        self.executed = []
+
+    def _add(self, count):
+        added = [_Task(self.executed) for _ in range(count)]
+        for task in added:
+            self.graph.add_task(task)
+        return added
+
+    def test_duplicate_dependencies_are_ignored(self):
+        first, second = self._add(2)
+        self.graph.add_dependency(second, first)
+        self.graph.add_dependency(second, first)
+        self.graph.remove_task(first)
+        self.assertFalse(self.graph._task_has_dependencies(second))
+
+    def test_remove_task_releases_dependents(self):
+        first, second, third = self._add(3)
+        self.graph.add_dependency(second, first)
+        self.graph.add_dependency(third, second)
+        self.graph.remove_task(second)
+        self.assertIsNone(self.graph.get_task(second.id))
+        self.assertFalse(self.graph._task_has_dependencies(third))
+        self.assertEqual([first, third], list(self.graph.tasks_iter()))
+        self.graph.execute()
+        self.assertEqual([first, third], self.executed)
+
+    def test_dependency_on_missing_task(self):
+        task, = self._add(1)
+        self.assertRaises(RuntimeError, self.graph.add_dependency,
+                          task, _Task(self.executed))
+
+    def test_retried_task_keeps_dependents(self):
+        task = _Task(self.executed, retries=2)
+        dependents = [_Task(self.executed) for _ in range(3)]
+        self.graph.add_task(task)
+        for dependent in dependents:
+            self.graph.add_task(dependent)
+            self.graph.add_dependency(dependent, task)
+        with patch.object(TaskDependencyGraph, 'WAKEUP_INTERVAL', 0.01):
+            self.graph.execute()
+        self.assertEqual(6, len(self.executed))
+        self.assertEqual(dependents, self.executed[3:])
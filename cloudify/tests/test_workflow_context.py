@@ -0,0 +1,433 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+import threading
+
+import testtools
+from celery import Celery
+from mock import Mock, patch
+
+from cloudify.exceptions import OperationRetry
+from cloudify.manager import NodeInstance
+from cloudify.plugins import lifecycle
+from cloudify.workflows import tasks
+from cloudify.workflows.workflow_context import (_AgentRoutes,
+                                                 _CeleryAppController,
+                                                 _ManagedPlugins,
+                                                 _NodeStateBatcher,
+                                                 _ResultConsumer)
+from cloudify_rest_client.exceptions import CloudifyClientError
+
+
+class _StoredResultTask(object):
+    """A celery task stub, storing its result when it is sent"""
+
+    def __init__(self, app, workflow_task, status, result):
+        self._app = app
+        self.workflow_task = workflow_task
+        self.status = status
+        self.result = result
+
+    def apply_async(self, task_id):
+        self._app.backend.store_result(task_id, self.result, self.status)
+        async_result = self._app.AsyncResult(task_id)
+        # as set by RemoteWorkflowTask.apply_async
+        self.workflow_task.async_result = tasks.RemoteWorkflowTaskResult(
+            self.workflow_task, async_result)
+        return async_result
+
+
+class _Task(tasks.WorkflowTask):
+
+    @property
+    def name(self):
+        return 'task'
+
+
+class TestCeleryAppController(testtools.TestCase):
+
+    def setUp(self):
+        super(TestCeleryAppController, self).setUp()
+        self.app = Celery(broker='memory://', backend='amqp')
+        self.controller = _CeleryAppController()
+
+    def _send(self, status, result):
+        workflow_task = _Task(workflow_context=None)
+        self.controller.send_task(
+            workflow_task,
+            _StoredResultTask(self.app, workflow_task, status, result))
+        return workflow_task
+
+    def _wait_for_terminated(self, workflow_tasks):
+        deadline = time.time() + 30
+        while not all(task.is_terminated for task in workflow_tasks):
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.05)
+
+    def test_consumed_results_set_task_state(self):
+        succeeded = self._send('SUCCESS', 42)
+        failed = self._send('FAILURE', ValueError('error'))
+        rescheduled = self._send('FAILURE', OperationRetry('retry'))
+        self._wait_for_terminated([succeeded, failed, rescheduled])
+
+        self.assertEqual(tasks.TASK_SUCCEEDED, succeeded.get_state())
+        self.assertEqual(tasks.TASK_FAILED, failed.get_state())
+        self.assertEqual(tasks.TASK_RESCHEDULED, rescheduled.get_state())
+        self.assertEqual(42, succeeded.async_result.result)
+        self.assertIsInstance(failed.async_result.result, ValueError)
+
+        stats = self.controller.stats()
+        self.assertEqual(0, stats['tasks_in_flight'])
+        self.assertEqual(3, stats['tasks_completed'])
+        self.assertGreater(stats['max_completion_latency'], 0)
+
+    def test_idle_consumer_closes_app(self):
+        with patch.object(_ResultConsumer, 'IDLE_TIMEOUT', 0):
+            self._wait_for_terminated([self._send('SUCCESS', None)])
+            deadline = time.time() + 30
+            while self.controller._consumers:
+                self.assertLess(time.time(), deadline)
+                time.sleep(0.05)
+
+    def test_failed_consumer_falls_back_to_polling(self):
+        with patch.object(_ResultConsumer, '_consume_results',
+                          side_effect=RuntimeError('connection lost')):
+            workflow_task = self._send('SUCCESS', None)
+            self._wait_for_terminated([workflow_task])
+        self.assertEqual(tasks.TASK_SUCCEEDED, workflow_task.get_state())
+
+    def test_app_closed_once_unused(self):
+        app = Mock()
+        consumer = Mock(_app=app, idle=True)
+        self.controller._consumers[app] = consumer
+        self.controller._polling[app] = set()
+        self.controller._apps['key'] = app
+        # the poller is done with the app, but a consumer still uses it
+        with self.controller._lock:
+            self.controller._stop_idle_app(app)
+        self.assertFalse(app.close.called)
+        self.assertTrue(self.controller._remove_idle_consumer(consumer))
+        app.close.assert_called_once_with()
+        self.assertEqual({}, self.controller._apps)
+
+
+class TestResultConsumerBatch(testtools.TestCase):
+    """Handling a batch of result messages received together"""
+
+    def setUp(self):
+        super(TestResultConsumerBatch, self).setUp()
+        self.consumer = _ResultConsumer(_CeleryAppController(), Mock())
+        self.backend = Mock(meta_from_decoded=lambda meta: meta)
+        self.acked = []
+
+    def _receive(self, status, result=None, workflow_task=None):
+        workflow_task = workflow_task or _Task(workflow_context=None)
+        task_id = workflow_task.id
+        self.consumer._outstanding[task_id] = (
+            workflow_task, Mock(id=task_id), time.time())
+        message = Mock()
+        message.decode.return_value = {'task_id': task_id,
+                                       'status': status,
+                                       'result': result}
+        message.ack.side_effect = lambda: self.acked.append(
+            (task_id, workflow_task.get_state()))
+        self.consumer._received.append(message)
+        return workflow_task
+
+    def _handle(self):
+        self.consumer._handle_received(Mock(), Mock(), self.backend,
+                                       multiple_ack=False)
+
+    def test_revoked_result_in_batch(self):
+        workflow_tasks = [self._receive('SUCCESS', 1),
+                          self._receive('REVOKED'),
+                          self._receive('SUCCESS', 2)]
+        self._handle()
+        expected = [tasks.TASK_SUCCEEDED, tasks.TASK_FAILED,
+                    tasks.TASK_SUCCEEDED]
+        self.assertEqual(expected,
+                         [task.get_state() for task in workflow_tasks])
+        # each message is acknowledged once its task state is set
+        self.assertEqual(zip([task.id for task in workflow_tasks], expected),
+                         self.acked)
+        self.assertEqual({}, self.consumer._outstanding)
+
+    def test_failing_state_listener(self):
+        failing = _Task(workflow_context=None)
+        failing.state_listener = Mock(side_effect=RuntimeError('listener'))
+        workflow_tasks = [self._receive('SUCCESS', 1),
+                          self._receive('SUCCESS', 2, failing),
+                          self._receive('SUCCESS', 3)]
+        self._handle()
+        self.assertTrue(all(task.is_terminated for task in workflow_tasks))
+        self.assertEqual(3, len(self.acked))
+
+    def test_batch_acknowledged_after_handling(self):
+        workflow_task = self._receive('SUCCESS', 1)
+        channel = Mock()
+        channel.basic_ack.side_effect = lambda *args, **kwargs: \
+            self.acked.append(workflow_task.get_state())
+        self.consumer._handle_received(channel, Mock(), self.backend,
+                                       multiple_ack=True)
+        self.assertEqual([tasks.TASK_SUCCEEDED], self.acked)
+
+
+class TestNodeStateBatcher(testtools.TestCase):
+
+    def setUp(self):
+        super(TestNodeStateBatcher, self).setUp()
+        self.states = {'a': 'started', 'b': 'started', 'c': 'started'}
+        self.conflicts = set()
+        self.get_started = threading.Event()
+        self.get_release = threading.Event()
+        self.get_release.set()
+        self.get_calls = []
+        self.update_calls = []
+        for name, side_effect in [('get_node_instances', self._get),
+                                  ('update_node_instances', self._update)]:
+            patcher = patch('cloudify.workflows.workflow_context.' + name,
+                            side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, node_instance_ids):
+        self.get_calls.append(sorted(node_instance_ids))
+        self.get_started.set()
+        self.get_release.wait(5)
+        return dict((instance_id, NodeInstance(instance_id, 'node',
+                                               state=self.states[instance_id],
+                                               version=1))
+                    for instance_id in node_instance_ids
+                    if instance_id in self.states)
+
+    def _update(self, node_instances):
+        self.update_calls.append(sorted(ni.id for ni in node_instances))
+        errors = {}
+        for node_instance in node_instances:
+            if node_instance.id in self.conflicts:
+                errors[node_instance.id] = CloudifyClientError(
+                    'conflict', status_code=409)
+            else:
+                self.states[node_instance.id] = node_instance.state
+        return errors
+
+    def _set_concurrently(self, batcher, changes):
+        errors = {}
+
+        def set_state(instance_id, state):
+            try:
+                batcher.set_state(instance_id, state)
+            except CloudifyClientError as e:
+                errors[instance_id] = e
+
+        threads = [threading.Thread(target=set_state, args=change)
+                   for change in changes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_changes_are_coalesced(self):
+        batcher = _NodeStateBatcher()
+        self.get_release.clear()
+        first = threading.Thread(target=batcher.set_state,
+                                 args=('a', 'stopped'))
+        first.start()
+        self.get_started.wait(5)
+
+        def release_when_pending():
+            # changes made while a batch is processed form the next batch
+            deadline = time.time() + 5
+            while len(batcher._pending) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            self.get_release.set()
+
+        releaser = threading.Thread(target=release_when_pending)
+        releaser.start()
+        errors = self._set_concurrently(
+            batcher, [('b', 'stopped'), ('c', 'stopped')])
+        first.join()
+        releaser.join()
+        self.assertEqual({}, errors)
+        self.assertEqual([['a'], ['b', 'c']], self.get_calls)
+        self.assertEqual([['a'], ['b', 'c']], self.update_calls)
+        self.assertEqual(set(['stopped']), set(self.states.values()))
+        self.assertEqual('stopped', batcher.get_state('a'))
+
+    def test_conflicts_are_reported_per_node_instance(self):
+        self.conflicts.add('b')
+        batcher = _NodeStateBatcher()
+        errors = self._set_concurrently(
+            batcher, [('a', 'stopped'), ('b', 'stopped'), ('c', 'stopped')])
+        self.assertEqual(['b'], errors.keys())
+        self.assertEqual(409, errors['b'].status_code)
+        self.assertEqual('started', self.states['b'])
+        self.assertEqual('stopped', self.states['c'])
+
+    def test_single_thread_does_not_wait(self):
+        batcher = _NodeStateBatcher()
+        start = time.time()
+        node_instance = batcher.set_state('a', 'deleted')
+        self.assertLess(time.time() - start, 0.05)
+        self.assertEqual('deleted', node_instance.state)
+
+    def test_missing_node_instance(self):
+        batcher = _NodeStateBatcher()
+        e = self.assertRaises(CloudifyClientError, batcher.get_state, 'x')
+        self.assertEqual(404, e.status_code)
+
+
+class TestManagedPlugins(testtools.TestCase):
+
+    def setUp(self):
+        super(TestManagedPlugins, self).setUp()
+        self.client = Mock()
+        self.client.plugins.list.return_value = [
+            {'package_name': 'p1', 'package_version': '1.0',
+             'visibility': 'global', 'tenant_name': 't1'},
+            {'package_name': 'p1', 'package_version': '2.0',
+             'visibility': 'tenant', 'tenant_name': 't2'},
+        ]
+        patcher = patch('cloudify.workflows.workflow_context.get_rest_client',
+                        return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_plugins_fetched_once(self):
+        plugins = _ManagedPlugins()
+        plugins.load([
+            {'package_name': 'p1', 'package_version': '2.0'},
+            {'package_name': 'p2', 'package_version': '1.0'},
+            {'package_name': None}])
+        self.assertEqual(
+            {'visibility': 'tenant', 'tenant_name': 't2'},
+            plugins.get({'package_name': 'p1', 'package_version': '2.0'}))
+        self.assertIsNone(
+            plugins.get({'package_name': 'p2', 'package_version': '1.0'}))
+        self.assertEqual(1, self.client.plugins.list.call_count)
+        self.assertEqual(['p1', 'p2'], self.client.plugins.list.call_args[1][
+            'package_name'])
+
+    def test_any_version(self):
+        plugins = _ManagedPlugins()
+        self.assertEqual(
+            {'visibility': 'global', 'tenant_name': 't1'},
+            plugins.get({'package_name': 'p1', 'package_version': None}))
+
+    def test_invalidate(self):
+        plugins = _ManagedPlugins()
+        plugin = {'package_name': 'p1', 'package_version': '1.0'}
+        plugins.get(plugin)
+        plugins.invalidate()
+        plugins.get(plugin)
+        self.assertEqual(2, self.client.plugins.list.call_count)
+
+
+class TestAgentRoutes(testtools.TestCase):
+
+    def setUp(self):
+        super(TestAgentRoutes, self).setUp()
+        self.agents = {'host_1': {'queue': 'q1', 'name': 'agent_1',
+                                  'broker_config': {}, 'user': 'u'}}
+        patcher = patch(
+            'cloudify.workflows.workflow_context.get_node_instance',
+            side_effect=lambda host_id: NodeInstance(
+                host_id, 'host', runtime_properties={
+                    'cloudify_agent': self.agents.get(host_id, {})}))
+        self.get_node_instance = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_loaded_routes_are_not_fetched(self):
+        routes = _AgentRoutes()
+        routes.add('host_1', {'queue': 'q', 'name': 'agent'})
+        routes.add('host_2', None)
+        self.assertEqual({'queue': 'q', 'name': 'agent'},
+                         routes.get('host_1'))
+        self.assertFalse(self.get_node_instance.called)
+
+    def test_missing_route_fetched_once(self):
+        routes = _AgentRoutes()
+        for _ in range(2):
+            self.assertEqual(
+                {'queue': 'q1', 'name': 'agent_1', 'broker_config': {}},
+                routes.get('host_1'))
+        self.assertEqual(1, self.get_node_instance.call_count)
+
+    def test_host_without_agent_fetched_again(self):
+        routes = _AgentRoutes()
+        self.assertEqual({}, routes.get('host_2'))
+        self.agents['host_2'] = {'queue': 'q2', 'name': 'agent_2'}
+        self.assertEqual('q2', routes.get('host_2')['queue'])
+
+    def test_invalidate(self):
+        routes = _AgentRoutes()
+        routes.get('host_1')
+        self.agents['host_1'] = {'queue': 'q3', 'name': 'agent_3'}
+        with patch.dict(tasks.RemoteWorkflowTask.cache,
+                        {'agent_1': (set(), 0)}):
+            routes.invalidate('host_1')
+            self.assertNotIn('agent_1', tasks.RemoteWorkflowTask.cache)
+        self.assertEqual('q3', routes.get('host_1')['queue'])
+
+    def test_tasks_after_host_post_start_use_new_agent(self):
+        workflow_context = Mock()
+        workflow_context.internal.agent_routes = _AgentRoutes()
+        host = Mock(id='host_1', ctx=workflow_context)
+        host.node.properties = {'agent_config': {'install_method': 'remote'}}
+        host.node.operations = {
+            'cloudify.interfaces.cloudify_agent.create': {}}
+        host.node.plugins_to_install = []
+
+        def queue():
+            task = tasks.RemoteWorkflowTask(
+                kwargs={'__cloudify_context': {}},
+                cloudify_context={'executor': 'host_agent',
+                                  'host_id': 'host_1'},
+                workflow_context=workflow_context)
+            task._set_queue_kwargs()
+            return task.kwargs['__cloudify_context']['task_queue']
+
+        self.assertEqual('q1', queue())
+        post_start = lifecycle._host_post_start(host)
+        # the refresh follows the creation of the new agent
+        _, call_kwargs = workflow_context.local_task.call_args
+        refresh = workflow_context.local_task.return_value
+        self.assertLess(post_start.index(host.execute_operation.return_value),
+                        post_start.index(refresh))
+        self.agents['host_1'] = {'queue': 'q2', 'name': 'agent_2'}
+        call_kwargs['local_task'](**call_kwargs['kwargs'])
+        self.assertEqual(['q2', 'q2'], [queue(), queue()])
+
+
+class TestVerifyWorkerAlive(testtools.TestCase):
+
+    def setUp(self):
+        super(TestVerifyWorkerAlive, self).setUp()
+        patcher = patch.dict(tasks.RemoteWorkflowTask.cache, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_registered_tasks_expire(self):
+        get_registered = Mock(return_value=set([tasks.DISPATCH_TASK]))
+        tasks.verify_worker_alive('task', 'agent', get_registered)
+        tasks.verify_worker_alive('task', 'agent', get_registered)
+        self.assertEqual(1, get_registered.call_count)
+        with patch('cloudify.workflows.tasks.time.time',
+                   return_value=time.time() +
+                   tasks.REGISTERED_TASKS_CACHE_TTL + 1):
+            tasks.verify_worker_alive('task', 'agent', get_registered)
+        self.assertEqual(2, get_registered.call_count)
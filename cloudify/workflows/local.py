@@ -58,6 +58,8 @@ class _Environment(object):
                  validate_version=True):
         self.storage = storage
         self.storage.env = self
+        self._evaluation_index = dsl_functions.RuntimeEvaluationIndex() \
+            if dsl_functions else None
 
         if load_existing:
             self.storage.load(name)
@@ -89,7 +91,9 @@ class _Environment(object):
             get_node_instances_method=self.storage.get_node_instances,
             get_node_instance_method=self.storage.get_node_instance,
             get_node_method=self.storage.get_node,
-            get_secret_method=self.storage.get_secret)
+            get_secret_method=self.storage.get_secret,
+            index=self._evaluation_index,
+            functions_index=self.plan.get('functions_index'))
 
     def evaluate_functions(self, payload, context):
         return dsl_functions.evaluate_functions(
@@ -98,7 +102,8 @@ class _Environment(object):
             get_node_instances_method=self.storage.get_node_instances,
             get_node_instance_method=self.storage.get_node_instance,
             get_node_method=self.storage.get_node,
-            get_secret_method=self.storage.get_secret)
+            get_secret_method=self.storage.get_secret,
+            index=self._evaluation_index)
 
     def execute(self,
                 workflow,
@@ -379,9 +384,8 @@ class _Storage(object):
         if not target_path:
             suffix = '-{0}'.format(os.path.basename(resource_path))
             target_path = tempfile.mktemp(suffix=suffix)
-        resource = self.get_resource(resource_path)
-        with open(target_path, 'wb') as f:
-            f.write(resource)
+        shutil.copyfile(os.path.join(self.resources_root, resource_path),
+                        target_path)
         return target_path
 
     def update_node_instance(self,
@@ -17,12 +17,12 @@ import sys
 import time
 import uuid
 import Queue
+import threading
 
 from cloudify import utils
 from cloudify import exceptions
 from cloudify.workflows import api
 from cloudify.celery.app import get_celery_app
-from cloudify.manager import get_node_instance
 from cloudify.constants import MGMTWORKER_QUEUE
 
 
@@ -43,9 +43,14 @@ TASK_FAILED = 'failed'
 
 TERMINATED_STATES = [TASK_RESCHEDULED, TASK_SUCCEEDED, TASK_FAILED]
 
+# guards creating the termination events of tasks, which are only created
+# for tasks that are waited for
+_terminated_event_lock = threading.Lock()
+
 DISPATCH_TASK = 'cloudify.dispatch.dispatch'
 
 INSPECT_TIMEOUT = 30
+REGISTERED_TASKS_CACHE_TTL = 60
 
 
 def retry_failure_handler(task):
@@ -96,11 +101,14 @@ class WorkflowTask(object):
         self.error = None
         self.total_retries = total_retries
         self.retry_interval = retry_interval
-        self.terminated = Queue.Queue(maxsize=1)
+        self._terminated_event = None
         self.is_terminated = False
         self.workflow_context = workflow_context
         self.send_task_events = send_task_events
         self.containing_subgraph = None
+        # called with this task on every state change, set by the task
+        # graph this task is added to
+        self.state_listener = None
 
         self.current_retries = 0
         # timestamp for which the task should not be executed
@@ -159,12 +167,23 @@ class WorkflowTask(object):
         self._state = state
         if state in TERMINATED_STATES:
             self.is_terminated = True
-            self.terminated.put_nowait(True)
+            terminated_event = self._terminated_event
+            if terminated_event is not None:
+                terminated_event.set()
+        if self.state_listener is not None:
+            self.state_listener(self)
 
     def wait_for_terminated(self, timeout=None):
         if self.is_terminated:
             return
-        self.terminated.get(timeout=timeout)
+        with _terminated_event_lock:
+            if self._terminated_event is None:
+                self._terminated_event = threading.Event()
+        # the task may have terminated before the event was created
+        if self.is_terminated:
+            return
+        if not self._terminated_event.wait(timeout):
+            raise Queue.Empty()
 
     def handle_task_terminated(self):
         if self.get_state() in (TASK_FAILED, TASK_RESCHEDULED):
@@ -294,7 +313,8 @@ class WorkflowTask(object):
 class RemoteWorkflowTask(WorkflowTask):
     """A WorkflowTask wrapping a celery based task"""
 
-    # cache for registered tasks queries to celery workers
+    # cache for registered tasks queries to celery workers, by worker name:
+    # (registered tasks, expiry time)
     cache = {}
 
     def __init__(self,
@@ -448,9 +468,8 @@ class RemoteWorkflowTask(WorkflowTask):
         host_id = self.cloudify_context['host_id']
         if executor == 'host_agent':
             if self._cloudify_agent is None:
-                host_node_instance = get_node_instance(host_id)
-                cloudify_agent = host_node_instance.runtime_properties.get(
-                    'cloudify_agent', {})
+                cloudify_agent = \
+                    self.workflow_context.internal.agent_routes.get(host_id)
                 if property_name not in cloudify_agent:
                     raise exceptions.NonRecoverableError(
                         'Missing cloudify_agent.{0} runtime information. '
@@ -797,10 +816,10 @@ class HandlerResult(object):
 def verify_worker_alive(name, target, get_registered):
 
     cache = RemoteWorkflowTask.cache
-    registered = cache.get(target)
-    if not registered:
+    registered, expires = cache.get(target, (None, 0))
+    if not registered or expires < time.time():
         registered = get_registered()
-        cache[target] = registered
+        cache[target] = (registered, time.time() + REGISTERED_TASKS_CACHE_TTL)
 
     if registered is None:
         raise exceptions.RecoverableError(
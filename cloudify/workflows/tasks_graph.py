@@ -17,12 +17,33 @@
 import os
 import json
 import time
-
-import networkx as nx
+import heapq
+import threading
+from array import array
 
 from cloudify.workflows import api
 from cloudify.workflows import tasks
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+
+class _TaskRecord(object):
+    """A task stored in the graph, with its edges as arrays of the integer
+    ids of the tasks on their other side"""
+
+    __slots__ = ('task', 'dependencies', 'dependents')
+
+    def __init__(self, task):
+        self.task = task
+        # the tasks this task depends on. Ids of tasks that were removed
+        # from the graph are not cleared from it, and are skipped instead
+        self.dependencies = array('l')
+        # the tasks that depend on this task
+        self.dependents = array('l')
+
 
 class TaskDependencyGraph(object):
     """
@@ -31,19 +52,49 @@ class TaskDependencyGraph(object):
     :param workflow_context: A WorkflowContext instance (used for logging)
     """
 
+    # maximal time the execution loop sleeps without a task state change,
+    # before checking for cancel and dump requests again
+    WAKEUP_INTERVAL = 0.1
+
     def __init__(self, workflow_context,
                  default_subgraph_task_config=None):
         self.ctx = workflow_context
-        self.graph = nx.DiGraph()
+        # tasks are stored by an integer id, given by the order in which
+        # they were added. The in-degree of a task is the number of tasks
+        # it still depends on, i.e. the ones that were not removed yet
+        self._ids = {}
+        self._records = []
+        self._in_degree = array('l')
         default_subgraph_task_config = default_subgraph_task_config or {}
         self._default_subgraph_task_config = default_subgraph_task_config
 
+        # scheduler state. Instead of rescanning the whole graph on every
+        # iteration, the execution loop only looks at tasks that might
+        # have changed: tasks that terminated (pushed by the task state
+        # listener, possibly from other threads), and candidates, which are
+        # tasks that were added or lost a dependency. Retried tasks waiting
+        # for their execute_after timestamp are kept in a heap.
+        self._state_changed = threading.Condition()
+        self._terminated = OrderedDict()
+        self._candidates = OrderedDict()
+        self._delayed = []
+
     def add_task(self, task):
         """Add a WorkflowTask to this graph
 
         :param task: The task
         """
-        self.graph.add_node(task.id, task=task)
+        task_int_id = self._ids.get(task.id)
+        if task_int_id is None:
+            self._ids[task.id] = len(self._records)
+            self._records.append(_TaskRecord(task))
+            self._in_degree.append(0)
+        else:
+            self._records[task_int_id].task = task
+        task.state_listener = self._task_state_changed
+        with self._state_changed:
+            self._candidates[task.id] = task
+        self._task_state_changed(task)
 
     def get_task(self, task_id):
         """Get a task instance that was inserted to this graph by its id
@@ -52,8 +103,10 @@ class TaskDependencyGraph(object):
         :return: a WorkflowTask instance for the requested task if found.
                  None, otherwise.
         """
-        data = self.graph.node.get(task_id)
-        return data['task'] if data is not None else None
+        task_int_id = self._ids.get(task_id)
+        if task_int_id is None:
+            return None
+        return self._records[task_int_id].task
 
     def remove_task(self, task):
         """Remove the provided task from the graph
@@ -63,8 +116,26 @@ class TaskDependencyGraph(object):
         if task.is_subgraph:
             for subgraph_task in task.tasks.values():
                 self.remove_task(subgraph_task)
-        if task.id in self.graph:
-            self.graph.remove_node(task.id)
+        if task.id in self._ids:
+            dependents = self._remove(task)
+            with self._state_changed:
+                self._terminated.pop(task.id, None)
+                self._candidates.pop(task.id, None)
+            self._dependencies_removed(dependents)
+
+    def _remove(self, task):
+        """Remove a task and the edges of the tasks depending on it
+
+        :return: The ids of the tasks that depended on the removed task
+        """
+        task_int_id = self._ids.pop(task.id)
+        record = self._records[task_int_id]
+        self._records[task_int_id] = None
+        dependents = [dependent for dependent in record.dependents
+                      if self._records[dependent] is not None]
+        for dependent in dependents:
+            self._in_degree[dependent] -= 1
+        return dependents
 
     # src depends on dst
     def add_dependency(self, src_task, dst_task):
@@ -77,13 +148,26 @@ class TaskDependencyGraph(object):
         :param src_task: The source task
         :param dst_task: The target task
         """
-        if not self.graph.has_node(src_task.id):
+        src = self._ids.get(src_task.id)
+        if src is None:
             raise RuntimeError('source task {0} is not in graph (task id: '
                                '{1})'.format(src_task, src_task.id))
-        if not self.graph.has_node(dst_task.id):
+        dst = self._ids.get(dst_task.id)
+        if dst is None:
             raise RuntimeError('destination task {0} is not in graph (task '
                                'id: {1})'.format(dst_task, dst_task.id))
-        self.graph.add_edge(src_task.id, dst_task.id)
+        src_record = self._records[src]
+        dst_record = self._records[dst]
+        # look for an existing edge in the shorter of the two edge arrays,
+        # so that forks and joins of many tasks are built in linear time
+        if len(src_record.dependencies) <= len(dst_record.dependents):
+            exists = dst in src_record.dependencies
+        else:
+            exists = src in dst_record.dependents
+        if not exists:
+            src_record.dependencies.append(dst)
+            dst_record.dependents.append(src)
+            self._in_degree[src] += 1
 
     def sequence(self):
         """
@@ -137,16 +221,53 @@ class TaskDependencyGraph(object):
                 self._handle_executable_task(task)
 
             # no more tasks to process, time to move on
-            if len(self.graph.node) == 0:
+            if not self._ids:
                 return
-            # sleep some and do it all over again
+            # wait for a task state change and do it all over again
             else:
-                time.sleep(0.1)
+                self._wait_for_state_change()
 
     @staticmethod
     def _is_execution_cancelled():
         return api.has_cancel_request()
 
+    def _task_state_changed(self, task):
+        """Task state listener, may be called from any thread"""
+        if task.get_state() not in tasks.TERMINATED_STATES:
+            return
+        with self._state_changed:
+            self._terminated[task.id] = task
+            self._state_changed.notify()
+
+    def _wait_for_state_change(self):
+        """Block until there is new work for the execution loop, or until
+        the next delayed task is due (or at most WAKEUP_INTERVAL seconds)
+        """
+        timeout = self.WAKEUP_INTERVAL
+        if self._delayed:
+            timeout = max(0, min(timeout, self._delayed[0][0] - time.time()))
+        with self._state_changed:
+            if not self._terminated and not self._candidates:
+                self._state_changed.wait(timeout)
+
+    def _dependencies_removed(self, task_int_ids):
+        """Mark tasks that lost a dependency as execution candidates.
+
+        Tasks contained in a subgraph are blocked by the subgraph
+        dependencies as well, so they become candidates too.
+        """
+        with self._state_changed:
+            for task_int_id in task_int_ids:
+                record = self._records[task_int_id]
+                if record is None:
+                    continue
+                to_visit = [record.task]
+                while to_visit:
+                    current = to_visit.pop()
+                    self._candidates[current.id] = current
+                    if current.is_subgraph:
+                        to_visit.extend(current.tasks.values())
+
     def _executable_tasks(self):
         """
         A task is executable if it is in pending state
@@ -154,40 +275,67 @@ class TaskDependencyGraph(object):
         already terminated) and its execution timestamp is smaller then the
         current timestamp
 
-        :return: An iterator for executable tasks
+        Only candidate tasks are checked. Candidates which are not
+        executable are dropped, they become candidates again once one of
+        their dependencies is removed. Candidates waiting for their
+        execution timestamp are delayed until it is reached.
+
+        :return: A list of executable tasks
         """
         now = time.time()
-        return (task for task in self.tasks_iter()
-                if task.get_state() == tasks.TASK_PENDING and
-                task.execute_after <= now and
-                not (task.containing_subgraph and
+        with self._state_changed:
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, task = heapq.heappop(self._delayed)
+                self._candidates[task.id] = task
+            candidates = self._candidates.values()
+            self._candidates.clear()
+
+        executable = []
+        for task in candidates:
+            if (self.get_task(task.id) is not task or
+                    task.get_state() != tasks.TASK_PENDING or
+                    (task.containing_subgraph and
                      task.containing_subgraph.get_state() ==
-                     tasks.TASK_FAILED) and
-                not self._task_has_dependencies(task))
+                     tasks.TASK_FAILED) or
+                    self._task_has_dependencies(task)):
+                continue
+            if task.execute_after > now:
+                heapq.heappush(self._delayed,
+                               (task.execute_after, task.id, task))
+                continue
+            executable.append(task)
+        return executable
 
     def _terminated_tasks(self):
         """
         A task is terminated if it is in 'succeeded' or 'failed' state
 
-        :return: An iterator for terminated tasks
+        :return: A list of tasks that terminated since the last call
         """
-        return (task for task in self.tasks_iter()
-                if task.get_state() in tasks.TERMINATED_STATES)
+        with self._state_changed:
+            terminated = self._terminated.values()
+            self._terminated.clear()
+        return [task for task in terminated
+                if self.get_task(task.id) is task]
 
     def _task_has_dependencies(self, task):
         """
         :param task: The task
         :return: Does this task have any dependencies
         """
-        return (len(self.graph.succ.get(task.id, {})) > 0 or
-                (task.containing_subgraph and self._task_has_dependencies(
-                    task.containing_subgraph)))
+        while task is not None:
+            task_int_id = self._ids.get(task.id)
+            if task_int_id is not None and self._in_degree[task_int_id] > 0:
+                return True
+            task = task.containing_subgraph
+        return False
 
     def tasks_iter(self):
         """
         An iterator on tasks added to the graph
         """
-        return (data['task'] for _, data in self.graph.nodes_iter(data=True))
+        return (record.task for record in self._records
+                if record is not None)
 
     def _handle_executable_task(self, task):
         """Handle executable task"""
@@ -206,17 +354,14 @@ class TaskDependencyGraph(object):
                 message = '{0} -> {1}'.format(message, task.error)
             raise RuntimeError(message)
 
-        dependents = self.graph.predecessors(task.id)
-        removed_edges = [(dependent, task.id)
-                         for dependent in dependents]
-        self.graph.remove_edges_from(removed_edges)
-        self.graph.remove_node(task.id)
+        dependents = self._remove(task)
         if handler_result.action == tasks.HandlerResult.HANDLER_RETRY:
             new_task = handler_result.retried_task
             self.add_task(new_task)
-            added_edges = [(dependent, new_task.id)
-                           for dependent in dependents]
-            self.graph.add_edges_from(added_edges)
+            for dependent in dependents:
+                self.add_dependency(self._records[dependent].task, new_task)
+        else:
+            self._dependencies_removed(dependents)
 
     def _check_dump_request(self):
         task_dump = os.environ.get('WORKFLOW_TASK_DUMP')
@@ -227,7 +372,10 @@ class TaskDependencyGraph(object):
         with open(task_dump_path, 'w') as f:
             f.write(json.dumps({
                 'tasks': [task.dump() for task in self.tasks_iter()],
-                'edges': [[s, t] for s, t in self.graph.edges_iter()]}))
+                'edges': [[self._records[src].task.id, record.task.id]
+                          for record in self._records if record is not None
+                          for src in record.dependents
+                          if self._records[src] is not None]}))
 
 
 class forkjoin(object):
@@ -15,18 +15,22 @@
 from __future__ import absolute_import
 
 import functools
+import logging
 import copy
 import uuid
 import threading
 import Queue
 import time
+import socket
 
 from proxy_tools import proxy
 
 from cloudify import context
 from cloudify.exceptions import OperationRetry
+from cloudify_rest_client.exceptions import CloudifyClientError
 from cloudify.manager import (get_node_instance,
-                              update_node_instance,
+                              get_node_instances,
+                              update_node_instances,
                               update_execution_status,
                               get_bootstrap_context,
                               get_rest_client,
@@ -65,6 +69,8 @@ except ImportError:
 
 DEFAULT_LOCAL_TASK_THREAD_POOL_SIZE = 1
 
+logger = logging.getLogger(__name__)
+
 
 class CloudifyWorkflowRelationshipInstance(object):
     """
@@ -424,9 +430,122 @@ class CloudifyWorkflowNode(object):
         return self._relationships.get(target_id)
 
 
+class _AgentRoutes(object):
+    """The routing details of the hosts' agents, by host id.
+
+    Tasks run by a host's agent are sent according to the host's
+    cloudify_agent runtime property. The routes are filled from the node
+    instances loaded with the workflow context, and fetched when a host's
+    route is first needed otherwise. Installing an agent changes its
+    details, so the host's route is then invalidated and fetched again.
+    """
+
+    FIELDS = ['queue', 'name', 'broker_config']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def add(self, host_id, cloudify_agent):
+        if not cloudify_agent:
+            return
+        route = dict((field, cloudify_agent[field]) for field in self.FIELDS
+                     if field in cloudify_agent)
+        with self._lock:
+            self._routes[host_id] = route
+
+    def get(self, host_id):
+        """
+        :param host_id: the host node instance id
+        :return: dict with the queue, name and broker_config of the host's
+                 agent, of those that are known
+        """
+        with self._lock:
+            route = self._routes.get(host_id)
+        if route is None:
+            host_node_instance = get_node_instance(host_id)
+            cloudify_agent = host_node_instance.runtime_properties.get(
+                'cloudify_agent', {})
+            self.add(host_id, cloudify_agent)
+            with self._lock:
+                route = self._routes.get(host_id, {})
+        return route
+
+    def invalidate(self, host_id):
+        with self._lock:
+            route = self._routes.pop(host_id, None)
+        if route and 'name' in route:
+            # the tasks registered by the previous agent
+            RemoteWorkflowTask.cache.pop(route['name'], None)
+
+
+class _ManagedPlugins(object):
+    """The manager's details of the plugins used by a workflow.
+
+    Operations only need the visibility and tenant of their plugin, so the
+    plugins are fetched once - in bulk, for all the plugins of a
+    deployment's nodes - instead of once per operation. Workflows running
+    long enough to see plugins uploaded or deleted meanwhile can invalidate
+    the fetched details.
+    """
+
+    _FIELDS = ['package_name', 'package_version', 'visibility', 'tenant_name']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plugins = {}
+
+    @staticmethod
+    def _key(plugin):
+        return plugin.get('package_name'), plugin.get('package_version')
+
+    def load(self, plugins):
+        """Fetch the details of the plugins not fetched yet, in one request
+
+        :param plugins: plugin dicts, as in a node's plugins
+        """
+        with self._lock:
+            missing = set(self._key(plugin) for plugin in plugins
+                          if plugin.get('package_name'))
+            missing.difference_update(self._plugins)
+            if not missing:
+                return
+            client = get_rest_client()
+            managed_plugins = client.plugins.list(
+                _include=self._FIELDS,
+                _get_all_results=True,
+                package_name=sorted(set(name for name, _ in missing)))
+            for key in missing:
+                self._plugins[key] = None
+            # a plugin without a version matches any version of the package.
+            # the first match is used, as with a query for a single plugin
+            for managed_plugin in managed_plugins:
+                name = managed_plugin['package_name']
+                for key in [(name, managed_plugin['package_version']),
+                            (name, None)]:
+                    if key in missing and self._plugins[key] is None:
+                        self._plugins[key] = {
+                            'visibility': managed_plugin['visibility'],
+                            'tenant_name': managed_plugin['tenant_name']
+                        }
+
+    def get(self, plugin):
+        """
+        :param plugin: a plugin dict, as in a node's plugins
+        :return: dict with the plugin's visibility and tenant_name, or None
+                 if the plugin is not managed
+        """
+        self.load([plugin])
+        return self._plugins.get(self._key(plugin))
+
+    def invalidate(self):
+        with self._lock:
+            self._plugins.clear()
+
+
 class _WorkflowContextBase(object):
 
-    def __init__(self, ctx, remote_ctx_handler_cls):
+    def __init__(self, ctx, remote_ctx_handler_cls, managed_plugins=None):
         self._context = ctx = ctx or {}
         self._local_task_thread_pool_size = ctx.get(
             'local_task_thread_pool_size',
@@ -438,6 +557,7 @@ class _WorkflowContextBase(object):
         self._subgraph_retries = ctx.get('subgraph_retries',
                                          DEFAULT_SUBGRAPH_TOTAL_RETRIES)
         self._logger = None
+        self._managed_plugins = managed_plugins or _ManagedPlugins()
 
         if self.local:
             storage = ctx.pop('storage')
@@ -509,6 +629,14 @@ class _WorkflowContextBase(object):
         """Cloudify tenant"""
         return self._context.get('tenant', {})
 
+    def invalidate_plugins_cache(self):
+        """
+        Fetch the plugins details used for operations from the manager again,
+        when next needed. For long running workflows, during which plugins
+        may be uploaded or deleted.
+        """
+        self._managed_plugins.invalidate()
+
     def _init_cloudify_logger(self):
         logger_name = self.execution_id
         logging_handler = self.internal.handler.get_context_logging_handler()
@@ -568,13 +696,10 @@ class _WorkflowContextBase(object):
             total_retries = operation_total_retries
 
         if plugin and plugin['package_name'] and not self.local:
-            client = get_rest_client()
-            filter_plugin = {'package_name': plugin.get('package_name'),
-                             'package_version': plugin.get('package_version')}
-            managed_plugins = client.plugins.list(**filter_plugin)
-            if managed_plugins:
-                plugin['visibility'] = managed_plugins[0]['visibility']
-                plugin['tenant_name'] = managed_plugins[0]['tenant_name']
+            managed_plugin = self._managed_plugins.get(plugin)
+            if managed_plugin:
+                plugin['visibility'] = managed_plugin['visibility']
+                plugin['tenant_name'] = managed_plugin['tenant_name']
 
         node_context = {
             'node_id': node_instance.id,
@@ -595,6 +720,11 @@ class _WorkflowContextBase(object):
             'host_id': node_instance._node_instance.host_id,
             'executor': operation_executor
         }
+        # the inputs are evaluated at the indexed function paths only, unless
+        # the workflow passes kwargs, which may hold functions elsewhere
+        if has_intrinsic_functions and not kwargs and \
+                op_struct.get('function_paths') is not None:
+            node_context['function_paths'] = op_struct['function_paths']
         # central deployment agents run on the management worker
         # so we pass the env to the dispatcher so it will be on a per
         # operation basis
@@ -870,9 +1000,10 @@ class CloudifyWorkflowContext(
     A context used in workflow operations
 
     :param ctx: a cloudify_context workflow dict
+    :param managed_plugins: plugins details shared with other contexts
     """
 
-    def __init__(self, ctx):
+    def __init__(self, ctx, managed_plugins=None):
         with current_workflow_ctx.push(self):
             # Not using super() here, because
             # WorkflowNodesAndInstancesContainer's __init__() needs some data
@@ -880,7 +1011,8 @@ class CloudifyWorkflowContext(
             # overcome this by using kwargs + super(...).__init__() in
             # _WorkflowContextBase, but the way it is now is self-explanatory.
             _WorkflowContextBase.__init__(self, ctx,
-                                          RemoteCloudifyWorkflowContextHandler)
+                                          RemoteCloudifyWorkflowContextHandler,
+                                          managed_plugins)
             self.blueprint = context.BlueprintContext(self._context)
             self.deployment = WorkflowDeploymentContext(self._context, self)
 
@@ -896,6 +1028,14 @@ class CloudifyWorkflowContext(
 
             WorkflowNodesAndInstancesContainer.__init__(self, self, raw_nodes,
                                                         raw_node_instances)
+            if not self.local:
+                self._managed_plugins.load(
+                    plugin for node in raw_nodes
+                    for plugin in node.get('plugins') or [])
+                for instance in raw_node_instances:
+                    self.internal.agent_routes.add(
+                        instance.id,
+                        instance.runtime_properties.get('cloudify_agent'))
 
     def _build_cloudify_context(self, *args):
         context = super(
@@ -950,7 +1090,8 @@ class CloudifySystemWideWorkflowContext(_WorkflowContextBase):
                     def lazy_ctx():
                         if not hasattr(lazy_ctx, '_cached_ctx'):
                             lazy_ctx._cached_ctx = \
-                                self._ManagedCloudifyWorkflowContext(dep_ctx)
+                                self._ManagedCloudifyWorkflowContext(
+                                    dep_ctx, self._managed_plugins)
                         return lazy_ctx._cached_ctx
 
                     return proxy(lazy_ctx)
@@ -966,6 +1107,7 @@ class CloudifyWorkflowContextInternal(object):
         self.handler = handler
         self._bootstrap_context = None
         self._graph_mode = False
+        self.agent_routes = _AgentRoutes()
         # the graph is always created internally for events to work properly
         # when graph mode is turned on this instance is returned to the user.
         subgraph_task_config = self.get_subgraph_task_configuration()
@@ -1177,13 +1319,197 @@ class CloudifyWorkflowContextHandler(object):
         raise NotImplementedError('Implemented by subclasses')
 
 
+class _ResultConsumer(object):
+    """Consume the results of the tasks sent using a single celery app.
+
+    Instead of polling each task's AsyncResult, a single consumer on a
+    dedicated connection subscribes to the result queues of all the
+    outstanding tasks, and sets the state of each workflow task as soon as
+    its result is delivered. Deliveries received in the same drain are
+    acknowledged together, once the states of their tasks are set.
+
+    Only the consumer thread uses the connection, other threads hand
+    tasks to it using `add`.
+    """
+
+    DRAIN_TIMEOUT = 0.1
+
+    # after a delivery, keep draining the ones already available (up to
+    # MAX_BATCH) for a single batch acknowledgement
+    BATCH_DRAIN_TIMEOUT = 0.01
+    MAX_BATCH = 100
+
+    # how long a consumer with no outstanding tasks waits for new ones,
+    # before its app is closed
+    IDLE_TIMEOUT = 0.5
+
+    def __init__(self, controller, app):
+        self._controller = controller
+        self._app = app
+        self._added = Queue.Queue()
+        # task id -> (workflow task, async result, send time)
+        self._outstanding = {}
+        self._received = []
+        self._thread = threading.Thread(target=self._consume,
+                                        name='Result-Consumer')
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def add(self, workflow_task, async_result):
+        self._added.put((workflow_task, async_result, time.time()))
+
+    @property
+    def idle(self):
+        return not self._outstanding and self._added.empty()
+
+    def _consume(self):
+        try:
+            self._consume_results()
+        except Exception:
+            # hand the outstanding tasks over, so that they still complete
+            self._controller._consumer_failed(self)
+
+    def _consume_results(self):
+        # Import here because this only applies to remote tasks execution
+        # environment
+        from kombu import Consumer
+
+        backend = self._app.backend
+        with self._app.connection() as connection:
+            channel = connection.channel()
+            # virtual transports can't acknowledge multiple deliveries
+            multiple_ack = connection.transport.driver_type == 'amqp'
+            consumer = Consumer(channel, [],
+                                on_message=self._on_message,
+                                accept=backend.accept,
+                                no_ack=False)
+            idle_since = None
+            while True:
+                self._bind_added(backend, consumer)
+                if self._outstanding:
+                    idle_since = None
+                    self._drain(connection)
+                    self._handle_received(channel, consumer, backend,
+                                          multiple_ack)
+                    continue
+                if idle_since is None:
+                    idle_since = time.time()
+                elif time.time() - idle_since > self.IDLE_TIMEOUT:
+                    if self._controller._remove_idle_consumer(self):
+                        break
+                    idle_since = None
+                time.sleep(self.DRAIN_TIMEOUT)
+            consumer.cancel()
+
+    def _take_all(self):
+        """Remove and return all the tasks of this consumer"""
+        tasks = self._outstanding.values()
+        self._outstanding = {}
+        while True:
+            try:
+                tasks.append(self._added.get_nowait())
+            except Queue.Empty:
+                return tasks
+
+    def _bind_added(self, backend, consumer):
+        added = False
+        while True:
+            try:
+                workflow_task, async_result, sent_at = \
+                    self._added.get_nowait()
+            except Queue.Empty:
+                break
+            self._outstanding[async_result.id] = (
+                workflow_task, async_result, sent_at)
+            consumer.add_queue(self._result_queue(backend, async_result.id))
+            added = True
+        if added:
+            consumer.consume()
+
+    @staticmethod
+    def _result_queue(backend, task_id):
+        """The queue the amqp backend sends the result of a task to"""
+        name = backend.rkey(task_id)
+        return backend.Queue(name=name,
+                             exchange=backend.exchange,
+                             routing_key=name,
+                             durable=backend.persistent,
+                             auto_delete=backend.auto_delete,
+                             queue_arguments=backend.queue_arguments)
+
+    def _drain(self, connection):
+        """Wait for a delivery, then take all the ones already available"""
+        timeout = self.DRAIN_TIMEOUT
+        while len(self._received) < self.MAX_BATCH:
+            try:
+                connection.drain_events(timeout=timeout)
+            except socket.timeout:
+                return
+            timeout = self.BATCH_DRAIN_TIMEOUT
+
+    def _on_message(self, message):
+        self._received.append(message)
+
+    def _handle_received(self, channel, consumer, backend, multiple_ack):
+        if not self._received:
+            return
+        received, self._received = self._received, []
+        for message in received:
+            try:
+                self._handle_result(consumer, backend, message)
+            except Exception:
+                # a failing consumer hands its tasks over to polling, which
+                # can't get the results it already consumed, so a bad result
+                # must not stop it
+                logger.exception('Failed handling a task result')
+            if not multiple_ack:
+                message.ack()
+        if multiple_ack:
+            channel.basic_ack(received[-1].delivery_tag, multiple=True)
+
+    def _handle_result(self, consumer, backend, message):
+        from celery import states
+        from celery.result import EagerResult
+
+        meta = backend.meta_from_decoded(message.decode())
+        task_id = meta['task_id']
+        if meta['status'] not in states.READY_STATES or \
+                task_id not in self._outstanding:
+            return
+        workflow_task, async_result, sent_at = self._outstanding.pop(task_id)
+        consumer.cancel_by_queue(backend.rkey(task_id))
+        # the result message is consumed, so the backend can not
+        # fetch it again: the task result is replaced by a fetched one
+        async_result = EagerResult(task_id, meta['result'],
+                                   meta['status'], meta.get('traceback'))
+        task_result = workflow_task.async_result
+        if task_result is not None:
+            task_result.async_result = async_result
+        self._controller._task_completed(sent_at)
+        try:
+            self._controller._set_task_state(
+                workflow_task, meta['status'], meta['result'],
+                async_result)
+        except Exception:
+            # the task is not outstanding anymore, so it must terminate
+            if not workflow_task.is_terminated:
+                workflow_task.set_state(TASK_FAILED)
+            raise
+
+
 class _CeleryAppController(object):
-    """Create celery apps, and poll results of their tasks.
+    """Create celery apps, and collect results of their tasks.
 
-    Tasks that are sent using the `send_task` method will be polled
+    Tasks that are sent using the `send_task` method will be monitored
     for completion, and when they are done, their status will be set
     to either TASK_SUCCEEDED or TASK_FAILED.
 
+    With the amqp result backend, results are pushed to a
+    `_ResultConsumer` of the app. With other backends, results are polled.
+    An app is closed once neither its consumer nor the poller use it.
+
     Note: public methods are thread-safe
     """
 
@@ -1194,7 +1520,11 @@ class _CeleryAppController(object):
         self._poller = None
         self._lock = threading.Lock()
         self._polling = {}
+        self._consumers = {}
         self._apps = {}
+        self._completed = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
 
     def make_subtask(self, tenant, target, *args, **kwargs):
         # Import here because this only applies to remote tasks execution
@@ -1217,11 +1547,87 @@ class _CeleryAppController(object):
     def send_task(self, workflow_task, task):
         with self._lock:
             async_result = task.apply_async(task_id=workflow_task.id)
-        self._add_polling(task._app, workflow_task, async_result)
+            consume = self._supports_consuming(task._app)
+            if consume:
+                self._add_consuming(task._app, workflow_task, async_result)
+        if not consume:
+            self._add_polling(task._app, workflow_task, async_result)
         return async_result
 
-    def _add_polling(self, app, workflow_task, result):
-        self._polling.setdefault(app, set()).add((workflow_task, result))
+    def stats(self):
+        """Result collection counters.
+
+        :return: a dict with the number of tasks in flight and completed,
+                 and the average and maximal time in seconds between
+                 sending a task and setting its terminal state
+        """
+        with self._lock:
+            in_flight = sum(len(results)
+                            for results in self._polling.values())
+            in_flight += sum(len(consumer._outstanding) +
+                             consumer._added.qsize()
+                             for consumer in self._consumers.values())
+            completed = self._completed
+            return {
+                'tasks_in_flight': in_flight,
+                'tasks_completed': completed,
+                'average_completion_latency':
+                    self._total_latency / completed if completed else 0,
+                'max_completion_latency': self._max_latency
+            }
+
+    @staticmethod
+    def _supports_consuming(app):
+        from celery.backends.amqp import AMQPBackend
+        return isinstance(app.backend, AMQPBackend)
+
+    def _add_consuming(self, app, workflow_task, result):
+        consumer = self._consumers.get(app)
+        if consumer is None:
+            consumer = self._consumers[app] = _ResultConsumer(self, app)
+            consumer.add(workflow_task, result)
+            consumer.start()
+        else:
+            consumer.add(workflow_task, result)
+
+    def _remove_idle_consumer(self, consumer):
+        """Called by an idle consumer before it stops.
+
+        :return: whether the consumer may stop, it may not if tasks were
+                 added to it concurrently
+        """
+        with self._lock:
+            if not consumer.idle:
+                return False
+            app = consumer._app
+            self._consumers.pop(app, None)
+            self._release_app(app)
+            return True
+
+    def _consumer_failed(self, consumer):
+        """Poll for the results of the tasks of a failed consumer"""
+        with self._lock:
+            if self._consumers.get(consumer._app) is consumer:
+                self._consumers.pop(consumer._app)
+            for workflow_task, async_result, sent_at in \
+                    consumer._take_all():
+                self._add_polling(consumer._app, workflow_task,
+                                  async_result, sent_at)
+            self._release_app(consumer._app)
+
+    def _task_completed(self, sent_at):
+        with self._lock:
+            self._record_completion(sent_at)
+
+    def _record_completion(self, sent_at):
+        latency = time.time() - sent_at
+        self._completed += 1
+        self._total_latency += latency
+        self._max_latency = max(self._max_latency, latency)
+
+    def _add_polling(self, app, workflow_task, result, sent_at=None):
+        self._polling.setdefault(app, set()).add(
+            (workflow_task, result, sent_at or time.time()))
         if not self._started:
             self._poller = threading.Thread(target=self._poll)
             self._poller.daemon = True
@@ -1252,37 +1658,51 @@ class _CeleryAppController(object):
     def _remove_finished_tasks(self, results):
         """Remove tasks that are finished from `results`"""
         for item in list(results):
-            workflow_task, async_result = item
+            workflow_task, async_result, sent_at = item
             if async_result.ready():
                 results.remove(item)
+                self._record_completion(sent_at)
                 self._update_task_state(async_result, workflow_task)
 
     def _update_task_state(self, async_result, workflow_task):
+        self._set_task_state(workflow_task, async_result.state,
+                             async_result.result, async_result)
+
+    @staticmethod
+    def _set_task_state(workflow_task, status, result, async_result):
+        from celery import states
+
         if workflow_task.is_terminated:
             return
-        if async_result.successful():
+        if status == states.SUCCESS:
             state = TASK_SUCCEEDED
-        elif async_result.failed():
-            if isinstance(async_result.result, OperationRetry):
+        elif status == states.FAILURE:
+            if isinstance(result, OperationRetry):
                 state = TASK_RESCHEDULED
             else:
                 state = TASK_FAILED
+        elif status in states.READY_STATES:
+            # e.g. revoked
+            state = TASK_FAILED
         else:
             raise ValueError(
                 'Unknown result {0} state: {1} (for task {2})'
-                .format(async_result, async_result.state,
-                        workflow_task))
-        try:
-            workflow_task.set_state(state)
-        except Queue.Full:
-            # the task must have already concurrently been updated by
-            # the events monitor
-            pass
+                .format(async_result, status, workflow_task))
+        workflow_task.set_state(state)
 
     def _stop_idle_app(self, app):
-        """Close the app, and remove it from local cache"""
-        app.close()
+        """Stop polling for the app, and close it unless consumed"""
         self._polling.pop(app)
+        self._release_app(app)
+
+    def _release_app(self, app):
+        """Close the app unless used by a consumer or the poller.
+
+        Must be called under self._lock.
+        """
+        if app in self._consumers or self._polling.get(app):
+            return
+        app.close()
         # remove from self._apps - the app is a value in that dict
         for key in self._apps:
             if app is self._apps[key]:
@@ -1290,10 +1710,109 @@ class _CeleryAppController(object):
                 break
 
 
+class _NodeStateRequest(object):
+    """A pending read or update of a node instance state"""
+
+    def __init__(self, node_instance_id, state=None):
+        self.node_instance_id = node_instance_id
+        self.state = state
+        self.done = threading.Event()
+        self.node_instance = None
+        self.error = None
+
+
+class _NodeStateBatcher(object):
+    """Coalesces the node instance state reads and updates made by
+    concurrent local tasks into bulk storage requests.
+
+    A request is processed right away when no batch is being processed.
+    Otherwise it waits for the current batch, and is then processed along
+    with all the other requests that arrived meanwhile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._pending = []
+        self._flushing = False
+
+    def get_state(self, node_instance_id):
+        request = self._submit(_NodeStateRequest(node_instance_id))
+        return request.node_instance.state
+
+    def set_state(self, node_instance_id, state):
+        request = self._submit(_NodeStateRequest(node_instance_id, state))
+        return request.node_instance
+
+    def _submit(self, request):
+        with self._lock:
+            self._pending.append(request)
+            while self._flushing and not request.done.is_set():
+                self._lock.wait()
+            leader = not request.done.is_set()
+            if leader:
+                self._flushing = True
+                batch, self._pending = self._pending, []
+        if leader:
+            try:
+                self._flush(batch)
+            finally:
+                with self._lock:
+                    self._flushing = False
+                    self._lock.notify_all()
+        if request.error is not None:
+            raise request.error
+        return request
+
+    def _flush(self, batch):
+        try:
+            while batch:
+                # a node instance is handled once per round, so that
+                # several state changes of it are applied in order
+                handled = set()
+                current = []
+                deferred = []
+                for request in batch:
+                    if request.node_instance_id in handled:
+                        deferred.append(request)
+                    else:
+                        handled.add(request.node_instance_id)
+                        current.append(request)
+                self._process(current)
+                batch = deferred
+        except Exception as e:
+            for request in batch:
+                if not request.done.is_set():
+                    request.error = e
+                    request.done.set()
+
+    @staticmethod
+    def _process(requests):
+        node_instances = get_node_instances(
+            [request.node_instance_id for request in requests])
+        updated = []
+        for request in requests:
+            node_instance = node_instances.get(request.node_instance_id)
+            if node_instance is None:
+                request.error = CloudifyClientError(
+                    'Node instance {0} not found'
+                    .format(request.node_instance_id), status_code=404)
+                continue
+            request.node_instance = node_instance
+            if request.state is not None:
+                node_instance.state = request.state
+                updated.append(node_instance)
+        errors = update_node_instances(updated) if updated else {}
+        for request in requests:
+            if request.error is None:
+                request.error = errors.get(request.node_instance_id)
+            request.done.set()
+
+
 class RemoteContextHandler(CloudifyWorkflowContextHandler):
     def __init__(self, *args, **kwargs):
         super(RemoteContextHandler, self).__init__(*args, **kwargs)
         self._celery_apps = _CeleryAppController()
+        self._node_states = _NodeStateBatcher()
 
     @property
     def bootstrap_context(self):
@@ -1340,16 +1859,14 @@ class RemoteContextHandler(CloudifyWorkflowContextHandler):
                            state):
         @task_config(send_task_events=False)
         def set_state_task():
-            node_state = get_node_instance(workflow_node_instance.id)
-            node_state.state = state
-            update_node_instance(node_state)
-            return node_state
+            return self._node_states.set_state(workflow_node_instance.id,
+                                               state)
         return set_state_task
 
     def get_get_state_task(self, workflow_node_instance):
         @task_config(send_task_events=False)
         def get_state_task():
-            return get_node_instance(workflow_node_instance.id).state
+            return self._node_states.get_state(workflow_node_instance.id)
         return get_state_task
 
     def download_deployment_resource(self,
@@ -15,10 +15,14 @@
 
 import json
 import logging
+import threading
+from cookielib import DefaultCookiePolicy
 
 import requests
 from base64 import urlsafe_b64encode
+from requests.adapters import HTTPAdapter
 from requests.packages import urllib3
+from requests.packages.urllib3.util.retry import Retry
 
 from cloudify_rest_client import exceptions
 from cloudify_rest_client.blueprints import BlueprintsClient
@@ -54,9 +58,93 @@ BASIC_AUTH_PREFIX = 'Basic'
 CLOUDIFY_TENANT_HEADER = 'Tenant'
 CLOUDIFY_AUTHENTICATION_HEADER = 'Authorization'
 CLOUDIFY_TOKEN_AUTHENTICATION_HEADER = 'Authentication-Token'
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_CONNECT_RETRIES = 0
 
 urllib3.disable_warnings(urllib3.exceptions.InsecurePlatformWarning)
 
+# sessions are shared between all the clients created with the same pool
+# and verification settings, so that short lived clients (e.g. the one
+# created for every call of `cloudify.manager.get_node_instance`) reuse the
+# open connections. The pools of a session are keyed by host only, so
+# clients verifying the server certificate differently must not share a
+# session: a connection opened unverified would be reused as verified.
+_sessions = {}
+_sessions_lock = threading.Lock()
+_connection_stats = {'requests': 0, 'connections_opened': 0}
+
+
+class _CountingPoolMixin(object):
+    """Counts the requests sent through a pool, and the connections opened
+    for them (a connection without a socket is connected on use)"""
+
+    def _make_request(self, conn, *args, **kwargs):
+        opening = getattr(conn, 'sock', None) is None
+        with _sessions_lock:
+            _connection_stats['requests'] += 1
+            if opening:
+                _connection_stats['connections_opened'] += 1
+        return super(_CountingPoolMixin, self)._make_request(
+            conn, *args, **kwargs)
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin,
+                                  urllib3.HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin,
+                                   urllib3.HTTPSConnectionPool):
+    pass
+
+
+class _PoolingAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_PoolingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+
+def _get_session(pool_maxsize, connect_retries, verify):
+    key = (pool_maxsize, connect_retries, verify)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            # requests done through the module level functions never carried
+            # cookies over, and a shared session must not either
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            if connect_retries:
+                # only connecting is retried: the request was not sent yet,
+                # so this is safe for any method
+                max_retries = Retry(total=connect_retries,
+                                    connect=connect_retries, read=0,
+                                    backoff_factor=0.2)
+            else:
+                max_retries = 0
+            for prefix in ('http://', 'https://'):
+                session.mount(prefix, _PoolingAdapter(
+                    pool_maxsize=pool_maxsize, max_retries=max_retries))
+            _sessions[key] = session
+        return session
+
+
+def connection_stats():
+    """Connection reuse counters of all the REST clients of this process.
+
+    :return: dict with the number of requests sent, the number of
+             connections opened for them, and the number of requests that
+             reused an already open connection.
+    """
+    with _sessions_lock:
+        stats = dict(_connection_stats)
+    stats['connections_reused'] = \
+        stats['requests'] - stats['connections_opened']
+    return stats
+
 
 class HTTPClient(object):
     default_timeout_sec = None
@@ -64,7 +152,9 @@ class HTTPClient(object):
     def __init__(self, host, port=DEFAULT_PORT,
                  protocol=DEFAULT_PROTOCOL, api_version=DEFAULT_API_VERSION,
                  headers=None, query_params=None, cert=None, trust_all=False,
-                 username=None, password=None, token=None, tenant=None):
+                 username=None, password=None, token=None, tenant=None,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True,
+                 connect_retries=DEFAULT_CONNECT_RETRIES):
         self.port = port
         self.host = host
         self.protocol = protocol
@@ -82,6 +172,16 @@ class HTTPClient(object):
                          log_value=False)
         self._set_header(CLOUDIFY_TOKEN_AUTHENTICATION_HEADER, token)
         self._set_header(CLOUDIFY_TENANT_HEADER, tenant)
+        if not keep_alive:
+            self.headers['Connection'] = 'close'
+        self.pool_maxsize = pool_maxsize
+        self.connect_retries = connect_retries
+
+    @property
+    def _session(self):
+        # looked up on each request, as cert and trust_all may be changed
+        return _get_session(self.pool_maxsize, self.connect_retries,
+                            self.get_request_verify())
 
     @property
     def url(self):
@@ -240,7 +340,7 @@ class HTTPClient(object):
             if not params:
                 params = {}
             params['_include'] = fields
-        return self.do_request(requests.get,
+        return self.do_request(self._session.get,
                                uri,
                                data=data,
                                params=params,
@@ -252,7 +352,7 @@ class HTTPClient(object):
 
     def put(self, uri, data=None, params=None, headers=None,
             expected_status_code=200, stream=False, timeout=None):
-        return self.do_request(requests.put,
+        return self.do_request(self._session.put,
                                uri,
                                data=data,
                                params=params,
@@ -263,7 +363,7 @@ class HTTPClient(object):
 
     def patch(self, uri, data=None, params=None, headers=None,
               expected_status_code=200, stream=False, timeout=None):
-        return self.do_request(requests.patch,
+        return self.do_request(self._session.patch,
                                uri,
                                data=data,
                                params=params,
@@ -274,7 +374,7 @@ class HTTPClient(object):
 
     def post(self, uri, data=None, params=None, headers=None,
              expected_status_code=200, stream=False, timeout=None):
-        return self.do_request(requests.post,
+        return self.do_request(self._session.post,
                                uri,
                                data=data,
                                params=params,
@@ -285,7 +385,7 @@ class HTTPClient(object):
 
     def delete(self, uri, data=None, params=None, headers=None,
                expected_status_code=200, stream=False, timeout=None):
-        return self.do_request(requests.delete,
+        return self.do_request(self._session.delete,
                                uri,
                                data=data,
                                params=params,
@@ -335,7 +435,9 @@ class CloudifyClient(object):
     def __init__(self, host='localhost', port=None, protocol=DEFAULT_PROTOCOL,
                  api_version=DEFAULT_API_VERSION, headers=None,
                  query_params=None, cert=None, trust_all=False,
-                 username=None, password=None, token=None, tenant=None):
+                 username=None, password=None, token=None, tenant=None,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True,
+                 connect_retries=DEFAULT_CONNECT_RETRIES):
         """
         Creates a Cloudify client with the provided host and optional port.
 
@@ -353,6 +455,13 @@ class CloudifyClient(object):
         :param password: Cloudify User password.
         :param token: Cloudify User token.
         :param tenant: Cloudify Tenant name.
+        :param pool_maxsize: Maximum number of connections kept open to the
+                             REST service, per thread-shared session.
+        :param keep_alive: Whether connections are kept open between
+                           requests.
+        :param connect_retries: Number of times establishing a connection
+                                is retried before giving up, not retried
+                                by default.
         :return: Cloudify client instance.
         """
 
@@ -367,7 +476,10 @@ class CloudifyClient(object):
         self._client = self.client_class(host, port, protocol, api_version,
                                          headers, query_params, cert,
                                          trust_all, username, password,
-                                         token, tenant)
+                                         token, tenant,
+                                         pool_maxsize=pool_maxsize,
+                                         keep_alive=keep_alive,
+                                         connect_retries=connect_retries)
         self.blueprints = BlueprintsClient(self._client)
         self.snapshots = SnapshotsClient(self._client)
         self.deployments = DeploymentsClient(self._client)
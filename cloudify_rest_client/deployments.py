@@ -13,7 +13,9 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client.responses import (ListResponse,
+                                            DEFAULT_PAGE_SIZE,
+                                            iterate_pages)
 from cloudify_rest_client.constants import VisibilityState
 
 
@@ -169,6 +171,16 @@ class DeploymentsClient(object):
         return ListResponse([Deployment(item) for item in response['items']],
                             response['metadata'])
 
+    def list_iter(self, page_size=DEFAULT_PAGE_SIZE, prefetch=False,
+                  **kwargs):
+        """
+        Lazily iterates over all deployments, see `iterate_pages`.
+
+        :param kwargs: Any of the arguments accepted by `list`.
+        """
+        return iterate_pages(self.list, page_size=page_size,
+                             prefetch=prefetch, **kwargs)
+
     def get(self, deployment_id, _include=None):
         """
         Returns a deployment by its id.
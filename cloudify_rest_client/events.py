@@ -16,7 +16,9 @@
 import warnings
 from datetime import datetime
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client.responses import (ListResponse,
+                                            DEFAULT_PAGE_SIZE,
+                                            iterate_pages)
 
 
 class EventsClient(object):
@@ -77,6 +79,16 @@ class EventsClient(object):
         response = self.api.get(uri, _include=_include, params=params)
         return ListResponse(response['items'], response['metadata'])
 
+    def list_iter(self, page_size=DEFAULT_PAGE_SIZE, prefetch=False,
+                  **kwargs):
+        """
+        Lazily iterates over all events, see `iterate_pages`.
+
+        :param kwargs: Any of the arguments accepted by `list`.
+        """
+        return iterate_pages(self.list, page_size=page_size,
+                             prefetch=prefetch, **kwargs)
+
     def delete(self, deployment_id, include_logs=False, message=None,
                from_datetime=None, to_datetime=None, sort=None, **kwargs):
         """Delete events connected to a Deployment ID
@@ -13,7 +13,9 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client.responses import (ListResponse,
+                                            DEFAULT_PAGE_SIZE,
+                                            iterate_pages)
 
 
 class Execution(dict):
@@ -151,6 +153,16 @@ class ExecutionsClient(object):
             response['metadata']
         )
 
+    def list_iter(self, page_size=DEFAULT_PAGE_SIZE, prefetch=False,
+                  **kwargs):
+        """
+        Lazily iterates over all executions, see `iterate_pages`.
+
+        :param kwargs: Any of the arguments accepted by `list`.
+        """
+        return iterate_pages(self.list, page_size=page_size,
+                             prefetch=prefetch, **kwargs)
+
     def get(self, execution_id, _include=None):
         """Get execution by its id.
 
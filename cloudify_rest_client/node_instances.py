@@ -13,8 +13,12 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 import warnings
+from multiprocessing.pool import ThreadPool
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client.exceptions import CloudifyClientError
+from cloudify_rest_client.responses import (ListResponse,
+                                            DEFAULT_PAGE_SIZE,
+                                            iterate_pages)
 
 
 class NodeInstance(dict):
@@ -94,6 +98,13 @@ class NodeInstance(dict):
         return self.get('scaling_groups', [])
 
 
+# number of node instance ids fetched per request by get_many, keeping the
+# query string well below common url length limits
+GET_MANY_CHUNK_SIZE = 100
+# Maximal number of concurrent requests sent by update_many
+UPDATE_MANY_CONCURRENCY = 10
+
+
 class NodeInstancesClient(object):
 
     def __init__(self, api):
@@ -141,6 +152,73 @@ class NodeInstancesClient(object):
         response = self.api.patch(uri, data=data)
         return NodeInstance(response)
 
+    def get_many(self, node_instance_ids, _include=None):
+        """
+        Returns the node instances for the provided node instance ids,
+        using a single list request per chunk of ids.
+
+        :param node_instance_ids: The identifiers of the node instances
+                                  to get.
+        :param _include: List of fields to include in response (the id
+                         field is always included).
+        :return: dict of the retrieved node instances by their id. Ids of
+                 node instances that do not exist are missing from it.
+        """
+        if _include and 'id' not in _include:
+            _include = list(_include) + ['id']
+        ids = list(set(node_instance_ids))
+        instances = {}
+        for start in range(0, len(ids), GET_MANY_CHUNK_SIZE):
+            chunk = ids[start:start + GET_MANY_CHUNK_SIZE]
+            response = self.api.get(
+                '/{self._uri_prefix}'.format(self=self),
+                params={'id': chunk, '_size': len(chunk)},
+                _include=_include)
+            for item in response['items']:
+                instances[item['id']] = self._wrapper_cls(item)
+        return instances
+
+    def update_many(self, updates):
+        """
+        Update several node instances, each checked against its own version.
+
+        A failed update (e.g. a version conflict, reported with status code
+        409) does not stop the updates of the other node instances.
+
+        :param updates: Iterable of dicts holding the arguments of `update`
+                        for each node instance: `node_instance_id`, and
+                        optionally `state`, `runtime_properties` and
+                        `version`.
+        :return: A tuple of a dict of the updated node instances by their id,
+                 and a dict of the errors of the failed updates by node
+                 instance id.
+
+        There is no bulk update endpoint, so the updates are sent as
+        concurrent requests, at most UPDATE_MANY_CONCURRENCY at a time.
+        """
+        updates = list(updates)
+        updated = {}
+        errors = {}
+
+        def update(kwargs):
+            node_instance_id = kwargs['node_instance_id']
+            try:
+                updated[node_instance_id] = self.update(**kwargs)
+            except CloudifyClientError as e:
+                errors[node_instance_id] = e
+
+        if len(updates) > 1:
+            pool = ThreadPool(min(len(updates), UPDATE_MANY_CONCURRENCY))
+            try:
+                pool.map(update, updates)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for kwargs in updates:
+                update(kwargs)
+        return updated, errors
+
     def _create_filters(
             self,
             sort=None,
@@ -197,3 +275,13 @@ class NodeInstancesClient(object):
             [self._wrapper_cls(item) for item in response['items']],
             response['metadata']
         )
+
+    def list_iter(self, page_size=DEFAULT_PAGE_SIZE, prefetch=False,
+                  **kwargs):
+        """
+        Lazily iterates over all node instances, see `iterate_pages`.
+
+        :param kwargs: Any of the arguments accepted by `list`.
+        """
+        return iterate_pages(self.list, page_size=page_size,
+                             prefetch=prefetch, **kwargs)
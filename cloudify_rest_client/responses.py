@@ -13,6 +13,13 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import sys
+import threading
+
+
+# the number of items requested per page when iterating over a list
+DEFAULT_PAGE_SIZE = 1000
+
 
 class Metadata(dict):
     """
@@ -74,3 +81,91 @@ class ListResponse(object):
 
     def sort(self, cmp=None, key=None, reverse=False):
         return self.items.sort(cmp, key, reverse)
+
+
+class _PageFetcher(threading.Thread):
+    """Fetches a single page in the background, keeping its outcome"""
+
+    def __init__(self, list_method, kwargs):
+        super(_PageFetcher, self).__init__(name='Page-Fetcher')
+        self.daemon = True
+        self._list_method = list_method
+        self._kwargs = kwargs
+        self._response = None
+        self._error = None
+
+    def run(self):
+        try:
+            self._response = self._list_method(**self._kwargs)
+        except Exception:
+            self._error = sys.exc_info()
+
+    def result(self):
+        self.join()
+        if self._error:
+            raise self._error[0], self._error[1], self._error[2]
+        return self._response
+
+
+def iterate_pages(list_method, page_size=DEFAULT_PAGE_SIZE, prefetch=False,
+                  **kwargs):
+    """
+    Lazily iterate over all the items of a paginated list operation.
+
+    Pages are requested one at a time using ``_offset`` and ``_size``, so
+    only a single page (two, when prefetching) is held in memory, regardless
+    of the total number of items. Pages are only requested as the items are
+    consumed: once the caller stops iterating, no more pages are requested,
+    apart from the one being prefetched.
+
+    Paging is by offset, and the total reported with each page is used to
+    decide whether to request the next one. Items added while iterating
+    are therefore listed if they sort after the current offset. Items
+    removed while iterating shift the later items back, and as many of
+    them are skipped.
+
+    :param list_method: A client ``list`` method, accepting ``_offset`` and
+                        ``_size`` and returning a ``ListResponse``.
+    :param page_size: Number of items to request per page.
+    :param prefetch: Fetch the next page on a background thread while the
+                     items of the current page are being consumed.
+    :param kwargs: Additional arguments passed on to ``list_method``.
+    :return: A generator of the listed items.
+    """
+    if page_size < 1:
+        raise ValueError('page_size must be a positive integer, got {0}'
+                         .format(page_size))
+    offset = kwargs.pop('_offset', 0)
+
+    def fetch(page_offset):
+        page_kwargs = dict(kwargs, _offset=page_offset, _size=page_size)
+        if prefetch:
+            fetcher = _PageFetcher(list_method, page_kwargs)
+            fetcher.start()
+            return fetcher
+        return list_method(**page_kwargs)
+
+    def result(page):
+        return page.result() if prefetch else page
+
+    page = fetch(offset)
+    while page is not None:
+        response = result(page)
+        offset += len(response.items)
+        has_more = response.items and offset < _total(response, offset)
+        page = fetch(offset) if has_more and prefetch else None
+        for item in response.items:
+            yield item
+        if has_more and not prefetch:
+            page = fetch(offset)
+        # allow the consumed page to be collected before the next one arrives
+        response = None
+
+
+def _total(response, offset):
+    """The total number of items of a list operation, if it was reported"""
+    try:
+        return response.metadata.pagination.total
+    except (TypeError, ValueError):
+        # no pagination metadata, keep paging until an empty page
+        return offset + 1
@@ -0,0 +1,242 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import copy
+import errno
+import hashlib
+import tempfile
+import threading
+import cPickle as pickle
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import pkg_resources
+
+from dsl_parser import utils
+from dsl_parser.holder import Holder
+
+
+DEFAULT_MAX_DOCUMENTS = 256
+DEFAULT_MAX_PLANS = 64
+
+
+def _parser_version():
+    try:
+        return pkg_resources.get_distribution('cloudify-common').version
+    except pkg_resources.DistributionNotFound:
+        return 'unknown'
+
+
+class _LRUCache(object):
+    """A thread safe mapping, evicting its least recently used entries"""
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self._max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class BlueprintCache(object):
+    """Caches the results of parsing blueprints, on two levels.
+
+    Loaded YAML documents (the main blueprint and each of its imports) are
+    kept by their location and the hash of their content, so a document is
+    only loaded again once it changes. Deployment plans are kept by the
+    hashes of the main blueprint and all of its transitive imports, the
+    parse arguments and the parser version.
+
+    Resources the blueprint refers to, such as operation scripts, are not
+    part of the plan key: a cached plan is not validated against them again.
+
+    Imports are still fetched when a plan is found in the cache. An import
+    url may serve different content over time, and the plan key holds the
+    digests of the fetched imports, so a cached plan can only be trusted
+    once every import was fetched. A hit skips loading the fetched
+    documents, which are cached themselves, and parsing the plan.
+
+    Entries are kept in memory, evicting the least recently used ones, and
+    when a directory is given, also on disk so they survive restarts. Disk
+    entries are pickled, so the directory must only be writable by trusted
+    users.
+
+    Returned documents and plans are copies, and may be changed freely.
+    """
+
+    def __init__(self,
+                 max_documents=DEFAULT_MAX_DOCUMENTS,
+                 max_plans=DEFAULT_MAX_PLANS,
+                 directory=None):
+        self._documents = _LRUCache(max_documents)
+        self._plans = _LRUCache(max_plans)
+        self._directory = directory
+        self._parser_version = _parser_version()
+        self._lock = threading.Lock()
+        self._disk_hits = 0
+
+    @staticmethod
+    def digest(content):
+        return hashlib.sha1(content).hexdigest()
+
+    def load_yaml(self, raw_yaml, error_message, filename, location, digest):
+        """Load a YAML document, unless its content was already loaded.
+
+        :param raw_yaml: The document content.
+        :param error_message: Prefix of the error raised for illegal YAML.
+        :param filename: The file name marked on the loaded holders.
+        :param location: The url the document was fetched from.
+        :param digest: The digest of the document content.
+        :return: The loaded document holder.
+        """
+        key = self.digest(repr((location, filename, digest)))
+        holder = self._get(self._documents, 'documents', key)
+        if holder is None:
+            holder = utils.load_yaml(raw_yaml=raw_yaml,
+                                     error_message=error_message,
+                                     filename=filename)
+            self._put(self._documents, 'documents', key, holder)
+        return _copy_holder(holder)
+
+    def plan_key(self, **parse_arguments):
+        """Key a deployment plan by all the arguments that affect it.
+
+        :param parse_arguments: The parse arguments, including the digests
+                                of the main blueprint and of its imports.
+        """
+        return self.digest(repr((self._parser_version,
+                                 sorted(parse_arguments.items()))))
+
+    def get_plan(self, key):
+        plan = self._get(self._plans, 'plans', key)
+        return copy.deepcopy(plan) if plan is not None else None
+
+    def put_plan(self, key, plan):
+        self._put(self._plans, 'plans', key, copy.deepcopy(plan))
+
+    def clear(self):
+        """Clear the in-memory entries (entries on disk are kept)"""
+        self._documents.clear()
+        self._plans.clear()
+
+    def stats(self):
+        """
+        :return: dict with the size and hit/miss counters of the documents
+                 and plans caches, and the number of misses that were
+                 found on disk.
+        """
+        with self._lock:
+            disk_hits = self._disk_hits
+        return {
+            'documents': self._documents.stats(),
+            'plans': self._plans.stats(),
+            'disk_hits': disk_hits
+        }
+
+    def _get(self, entries, kind, key):
+        value = entries.get(key)
+        if value is None and self._directory:
+            value = self._read(kind, key)
+            if value is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                entries.put(key, value)
+        return value
+
+    def _put(self, entries, kind, key, value):
+        entries.put(key, value)
+        if self._directory:
+            self._write(kind, key, value)
+
+    def _path(self, kind, key):
+        return os.path.join(self._directory, kind, '{0}.pickle'.format(key))
+
+    def _read(self, kind, key):
+        path = self._path(kind, key)
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        except Exception:
+            # a corrupted entry is a miss, and is replaced on the next put
+            return None
+
+    def _write(self, kind, key, value):
+        directory = os.path.dirname(self._path(kind, key))
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        # renaming is atomic, concurrent readers see a complete entry or none
+        os.rename(temp_path, self._path(kind, key))
+
+
+def _copy_holder(holder):
+    value = holder.value
+    if isinstance(value, dict):
+        value = dict((_copy_holder(k), _copy_holder(v))
+                     for k, v in value.iteritems())
+    elif isinstance(value, list):
+        value = [_copy_holder(item) for item in value]
+    elif isinstance(value, set):
+        value = set(_copy_holder(item) for item in value)
+    return Holder(value=value,
+                  start_line=holder.start_line,
+                  start_column=holder.start_column,
+                  end_line=holder.end_line,
+                  end_column=holder.end_column,
+                  filename=holder.filename)
@@ -68,6 +68,7 @@ SCRIPT_PLUGIN_EXECUTE_WORKFLOW_TASK = 'script_runner.tasks.execute_workflow'
 SCRIPT_PATH_PROPERTY = 'script_path'
 
 FUNCTION_NAME_PATH_SEPARATOR = '__sep__'
+FUNCTIONS_INDEX = 'functions_index'
 
 NODES = 'nodes'
 NODE_INSTANCES = 'node_instances'
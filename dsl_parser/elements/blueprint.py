@@ -54,13 +54,14 @@ class BlueprintImporter(Element):
         'imports': imports.ImportsLoader,
     }
     requires = {
-        imports.ImportsLoader: ['resource_base']
+        imports.ImportsLoader: ['resource_base', 'imports_digests']
     }
 
-    def parse(self, resource_base):
+    def parse(self, resource_base, imports_digests):
         return {
             'merged_blueprint': self.child(imports.ImportsLoader).value,
-            'resource_base': resource_base
+            'resource_base': resource_base,
+            'imports_digests': imports_digests
         }
 
 
@@ -26,6 +26,7 @@ from dsl_parser.framework.elements import (
 from dsl_parser.framework.requirements import (
     Value,
     Requirement,
+    keyed_predicate,
     sibling_predicate)
 
 
@@ -143,6 +144,11 @@ class DataTypeVersion(Element):
     schema = Leaf(type=str)
 
 
+@keyed_predicate(lambda source: source.direct_component_types)
+def _direct_component_type_predicate(source, target):
+    return target.name in source.direct_component_types
+
+
 class DataType(types.Type):
 
     schema = {
@@ -157,8 +163,7 @@ class DataType(types.Type):
             Requirement('component_types',
                         multiple_results=True,
                         required=False,
-                        predicate=lambda source, target:
-                            target.name in source.direct_component_types),
+                        predicate=_direct_component_type_predicate),
             Value('super_type',
                   predicate=types.derived_from_predicate,
                   required=False)
@@ -228,6 +233,7 @@ class DataTypes(types.Types):
 
 # source: element describing data_type name
 # target: data_type
+@keyed_predicate(lambda source: [source.initial_value])
 def _has_type(source, target):
     return source.initial_value == target.name
 
@@ -14,7 +14,10 @@
 #    * limitations under the License.
 
 import os
+import sys
+import threading
 import urllib
+from multiprocessing.pool import ThreadPool
 
 import networkx as nx
 
@@ -25,6 +28,7 @@ from dsl_parser import (exceptions,
 from dsl_parser.framework.elements import (Element,
                                            Leaf,
                                            List)
+from dsl_parser.framework.requirements import Requirement
 
 
 MERGE_NO_OVERRIDE = set([
@@ -51,6 +55,9 @@ IGNORE = set([
     _version.VERSION
 ])
 
+# Maximal number of imports fetched and loaded at the same time
+MAX_CONCURRENT_IMPORTS = 8
+
 
 class Import(Element):
 
@@ -70,17 +77,19 @@ class ImportLoader(Element):
 class ImportsLoader(Element):
 
     schema = List(type=ImportLoader)
-    provides = ['resource_base']
+    provides = ['resource_base', 'imports_digests']
     requires = {
         'inputs': ['main_blueprint_holder',
                    'resources_base_path',
                    'blueprint_location',
                    'version',
                    'resolver',
-                   'validate_version']
+                   'validate_version',
+                   Requirement('cache', required=False)]
     }
 
     resource_base = None
+    imports_digests = None
 
     def validate(self, **kwargs):
         imports = [i.value for i in self.children()]
@@ -97,23 +106,28 @@ class ImportsLoader(Element):
               blueprint_location,
               version,
               resolver,
-              validate_version):
+              validate_version,
+              cache):
         if blueprint_location:
             blueprint_location = _dsl_location_to_url(
                 dsl_location=blueprint_location,
                 resources_base_path=resources_base_path)
             slash_index = blueprint_location.rfind('/')
             self.resource_base = blueprint_location[:slash_index]
+        self.imports_digests = []
         return _combine_imports(parsed_dsl_holder=main_blueprint_holder,
                                 dsl_location=blueprint_location,
                                 resources_base_path=resources_base_path,
                                 version=version,
                                 resolver=resolver,
-                                validate_version=validate_version)
+                                validate_version=validate_version,
+                                cache=cache,
+                                imports_digests=self.imports_digests)
 
     def calculate_provided(self, **kwargs):
         return {
-            'resource_base': self.resource_base
+            'resource_base': self.resource_base,
+            'imports_digests': self.imports_digests
         }
 
 
@@ -160,11 +174,13 @@ def _get_resource_location(resource_name,
 
 def _combine_imports(parsed_dsl_holder, dsl_location,
                      resources_base_path, version, resolver,
-                     validate_version):
+                     validate_version, cache=None, imports_digests=None):
     ordered_imports = _build_ordered_imports(parsed_dsl_holder,
                                              dsl_location,
                                              resources_base_path,
-                                             resolver)
+                                             resolver,
+                                             cache,
+                                             imports_digests)
     holder_result = parsed_dsl_holder.copy()
     version_key_holder, version_value_holder = parsed_dsl_holder.get_item(
         _version.VERSION)
@@ -184,11 +200,30 @@ def _combine_imports(parsed_dsl_holder, dsl_location,
 def _build_ordered_imports(parsed_dsl_holder,
                            dsl_location,
                            resources_base_path,
-                           resolver):
+                           resolver,
+                           cache=None,
+                           imports_digests=None):
 
     def location(value):
         return value or 'root'
 
+    resource_locations = {}
+
+    def resource_location(another_import, current_import):
+        key = (another_import, current_import)
+        if key not in resource_locations:
+            resource_locations[key] = _get_resource_location(
+                another_import, resources_base_path, current_import)
+        return resource_locations[key]
+
+    prefetched_imports = {}
+    if getattr(resolver, 'concurrent_fetch', False):
+        prefetched_imports = _prefetch_imports(parsed_dsl_holder,
+                                               dsl_location,
+                                               resolver,
+                                               cache,
+                                               resource_location)
+
     imports_graph = ImportsGraph()
     imports_graph.add(location(dsl_location), parsed_dsl_holder)
 
@@ -200,9 +235,7 @@ def _build_ordered_imports(parsed_dsl_holder,
             return
 
         for another_import in imports_value_holder.restore():
-            import_url = _get_resource_location(another_import,
-                                                resources_base_path,
-                                                _current_import)
+            import_url = resource_location(another_import, _current_import)
             if import_url is None:
                 ex = exceptions.DSLParsingLogicException(
                     13, "Import failed: no suitable location found for "
@@ -213,12 +246,12 @@ def _build_ordered_imports(parsed_dsl_holder,
                 imports_graph.add_graph_dependency(import_url,
                                                    location(_current_import))
             else:
-                raw_imported_dsl = resolver.fetch_import(import_url)
-                imported_dsl_holder = utils.load_yaml(
-                    raw_yaml=raw_imported_dsl,
-                    error_message="Failed to parse import '{0}' (via '{1}')"
-                                  .format(another_import, import_url),
-                    filename=another_import)
+                prefetched = prefetched_imports.get(import_url)
+                if prefetched is None:
+                    prefetched = _PrefetchedImport(
+                        resolver.fetch_import(import_url))
+                imported_dsl_holder = prefetched.holder(
+                    another_import, import_url, cache, imports_digests)
                 imports_graph.add(import_url, imported_dsl_holder,
                                   location(_current_import))
                 _build_ordered_imports_recursive(imported_dsl_holder,
@@ -227,6 +260,121 @@ def _build_ordered_imports(parsed_dsl_holder,
     return imports_graph.topological_sort()
 
 
+class _PrefetchedImport(object):
+    """An import fetched, and loaded unless fetching it failed."""
+
+    def __init__(self, raw=None, exc_info=None):
+        self.raw = raw
+        self.exc_info = exc_info
+        self.loaded = None
+
+    def load(self, another_import, import_url, cache):
+        try:
+            self.loaded = (another_import, _load_import(
+                self.raw, another_import, import_url, cache, []))
+        except Exception:
+            # loaded again, raising the error, when the import is merged
+            pass
+
+    def holder(self, another_import, import_url, cache, imports_digests):
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        if self.loaded and self.loaded[0] == another_import:
+            if cache is not None:
+                imports_digests.append((import_url,
+                                        cache.digest(self.raw)))
+            return self.loaded[1]
+        # not loaded yet or marked with another file name
+        return _load_import(self.raw, another_import, import_url, cache,
+                            imports_digests)
+
+
+def _prefetch_imports(parsed_dsl_holder,
+                      dsl_location,
+                      resolver,
+                      cache,
+                      resource_location):
+    """Fetch and load the imports of a blueprint, breadth first.
+
+    Only used with resolvers that set ``concurrent_fetch``. The imports of
+    each level of the imports tree are fetched and loaded concurrently, at
+    most MAX_CONCURRENT_IMPORTS at a time. Errors are kept and raised when
+    the import is merged, so they are raised in the same order as when
+    fetching the imports one by one. Once an import fails, fetches not
+    started yet are skipped, and left to be fetched when merging.
+
+    :return: A dict of import urls to _PrefetchedImport, or to None for
+             skipped imports.
+    """
+    prefetched_imports = {}
+    failed = threading.Event()
+
+    def prefetch(import_to_fetch):
+        if failed.is_set():
+            return None
+        another_import, import_url = import_to_fetch
+        try:
+            prefetched = _PrefetchedImport(resolver.fetch_import(import_url))
+        except Exception:
+            failed.set()
+            return _PrefetchedImport(exc_info=sys.exc_info())
+        prefetched.load(another_import, import_url, cache)
+        if not prefetched.loaded:
+            failed.set()
+        return prefetched
+
+    pool = None
+    level = [(parsed_dsl_holder, dsl_location)]
+    try:
+        while level and not failed.is_set():
+            to_fetch = []
+            for dsl_holder, current_import in level:
+                _, imports_value_holder = dsl_holder.get_item(
+                    constants.IMPORTS)
+                if not imports_value_holder or \
+                        not isinstance(imports_value_holder.value, list):
+                    continue
+                for another_import in imports_value_holder.restore():
+                    import_url = resource_location(another_import,
+                                                   current_import)
+                    if import_url is None or \
+                            import_url in prefetched_imports:
+                        continue
+                    prefetched_imports[import_url] = None
+                    to_fetch.append((another_import, import_url))
+            if len(to_fetch) > 1 and pool is None:
+                pool = ThreadPool(MAX_CONCURRENT_IMPORTS)
+            results = pool.map(prefetch, to_fetch) if pool \
+                else map(prefetch, to_fetch)
+            level = []
+            for (_, import_url), prefetched in zip(to_fetch, results):
+                prefetched_imports[import_url] = prefetched
+                if prefetched and prefetched.loaded:
+                    level.append((prefetched.loaded[1], import_url))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return prefetched_imports
+
+
+def _load_import(raw_imported_dsl, another_import, import_url,
+                 cache, imports_digests):
+    error_message = "Failed to parse import '{0}' (via '{1}')".format(
+        another_import, import_url)
+    if cache is None:
+        return utils.load_yaml(raw_yaml=raw_imported_dsl,
+                               error_message=error_message,
+                               filename=another_import)
+    digest = cache.digest(raw_imported_dsl)
+    imports_digests.append((import_url, digest))
+    return cache.load_yaml(raw_yaml=raw_imported_dsl,
+                           error_message=error_message,
+                           filename=another_import,
+                           location=import_url,
+                           digest=digest)
+
+
 def _validate_version(dsl_version,
                       import_url,
                       parsed_imported_dsl_holder):
@@ -26,7 +26,9 @@ from dsl_parser.elements import (node_types as _node_types,
                                  data_types as _data_types,
                                  scalable,
                                  version as _version)
-from dsl_parser.framework.requirements import Value, Requirement
+from dsl_parser.framework.requirements import (Value,
+                                               Requirement,
+                                               keyed_predicate)
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf,
@@ -182,6 +184,12 @@ class NodeTemplateCapabilitiesScalable(DictElement):
             }
 
 
+def _node_template(element):
+    return element.ancestor(NodeTemplate)
+
+
+@keyed_predicate(lambda source: [_node_template(source)],
+                 target_key=_node_template)
 def _instances_predicate(source, target):
     return source.ancestor(NodeTemplate) is target.ancestor(NodeTemplate)
 
@@ -227,6 +235,16 @@ class NodeTemplateCapabilities(DictElement):
             }
 
 
+def _child_value(element_type):
+    def source_keys(source):
+        try:
+            return [source.child(element_type).initial_value]
+        except exceptions.DSLParsingElementMatchException:
+            return []
+    return source_keys
+
+
+@keyed_predicate(_child_value(NodeTemplateRelationshipType))
 def _node_template_relationship_type_predicate(source, target):
     try:
         return (source.child(NodeTemplateRelationshipType).initial_value ==
@@ -313,6 +331,9 @@ class NodeTemplateRelationships(Element):
         }
 
 
+@keyed_predicate(lambda source: [
+    e.initial_value
+    for e in source.descendants(NodeTemplateRelationshipTarget)])
 def _node_template_related_nodes_predicate(source, target):
     if source.name == target.name:
         return False
@@ -321,6 +342,7 @@ def _node_template_related_nodes_predicate(source, target):
     return target.name in relationship_targets
 
 
+@keyed_predicate(_child_value(NodeTemplateType))
 def _node_template_node_type_predicate(source, target):
     try:
         return (source.child(NodeTemplateType).initial_value ==
@@ -14,6 +14,7 @@
 #    * limitations under the License.
 
 from dsl_parser import exceptions
+from dsl_parser.framework.requirements import keyed_predicate
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf)
@@ -73,6 +74,14 @@ class DataTypeDerivedFrom(DerivedFrom):
     descriptor = 'data type'
 
 
+def _derived_from(source):
+    try:
+        return [source.child(DerivedFrom).initial_value]
+    except exceptions.DSLParsingElementMatchException:
+        return []
+
+
+@keyed_predicate(_derived_from)
 def derived_from_predicate(source, target):
     try:
         derived_from = source.child(DerivedFrom).initial_value
@@ -128,6 +128,13 @@ class Element(object):
     def provided(self, value):
         self._provided = value
 
+    def provides_value(self, name):
+        return name in self._provided
+
+    def provided_value(self, name):
+        """A single provided value, without copying the other values."""
+        return copy.deepcopy(self._provided[name])
+
     @property
     def path(self):
         elements = [str(e.name) for e in self.context.ancestors_iter(self)]
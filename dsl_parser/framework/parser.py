@@ -13,6 +13,9 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import weakref
+import functools
+
 import networkx as nx
 
 from dsl_parser import exceptions
@@ -22,8 +25,14 @@ from dsl_parser.framework.requirements import Requirement
 
 class SchemaAPIValidator(object):
 
+    def __init__(self):
+        self._validated = weakref.WeakKeyDictionary()
+
     def validate(self, element_cls):
+        if element_cls in self._validated:
+            return
         self._traverse_element_cls(element_cls)
+        self._validated[element_cls] = True
 
     def _traverse_element_cls(self, element_cls):
         try:
@@ -76,6 +85,7 @@ class Context(object):
                  inputs):
         self.inputs = inputs or {}
         self.element_type_to_elements = {}
+        self._element_indexes = {}
         self._root_element = None
         self._element_tree = nx.DiGraph()
         self._element_graph = nx.DiGraph()
@@ -204,24 +214,65 @@ class Context(object):
             self._traverse_schema(schema=schema_item,
                                   parent_element=parent_element)
 
+    def matching_elements(self, element, element_type, predicates):
+        """The elements of a type matching all the predicates for element.
+
+        The elements are returned in the order they were added. Candidates
+        are looked up by the first keyed predicate whose keys can be
+        computed, see requirements.keyed_predicate.
+        """
+        candidates = None
+        for predicate in predicates:
+            source_keys = getattr(predicate, 'source_keys', None)
+            if source_keys is None:
+                continue
+            index = self._element_index(element_type, predicate.target_key)
+            if index is None:
+                continue
+            try:
+                keys = set(source_keys(element))
+            except (TypeError, exceptions.DSLParsingElementMatchException):
+                continue
+            if len(keys) == 1:
+                candidates = [e for _, e in index.get(keys.pop(), [])]
+            else:
+                candidates = [e for _, e in sorted(
+                    entry for key in keys for entry in index.get(key, []))]
+            break
+        if candidates is None:
+            candidates = self.element_type_to_elements.get(element_type, [])
+        return [candidate for candidate in candidates
+                if all(predicate(element, candidate)
+                       for predicate in predicates)]
+
+    def _element_index(self, element_type, target_key):
+        index_key = (element_type, target_key)
+        if index_key not in self._element_indexes:
+            index = {}
+            try:
+                for position, element in enumerate(
+                        self.element_type_to_elements.get(element_type, [])):
+                    index.setdefault(target_key(element), []).append(
+                        (position, element))
+            except (TypeError, exceptions.DSLParsingElementMatchException):
+                # unhashable or missing keys, elements are scanned instead
+                index = None
+            self._element_indexes[index_key] = index
+        return self._element_indexes[index_key]
+
     def _calculate_element_graph(self):
         self.element_graph = nx.DiGraph(self._element_tree)
         for element_type, _elements in self.element_type_to_elements.items():
-            requires = element_type.requires
-            for requirement, requirement_values in requires.items():
-                requirement_values = [
-                    Requirement(r) if isinstance(r, basestring)
-                    else r for r in requirement_values]
+            for requirement, requirement_values in \
+                    _element_plan(element_type).requirements:
                 if requirement == 'inputs':
                     continue
-                if requirement == 'self':
-                    requirement = element_type
-                dependencies = self.element_type_to_elements.get(
-                    requirement, [])
                 predicates = [r.predicate for r in requirement_values
                               if r.predicate is not None]
 
                 if not predicates:
+                    dependencies = self.element_type_to_elements.get(
+                        requirement, [])
                     dep = _BatchDependency(element_type, requirement)
                     for dependency in dependencies:
                         self.element_graph.add_edge(dep, dependency)
@@ -229,13 +280,10 @@ class Context(object):
                         self.element_graph.add_edge(element, dep)
                     continue
 
-                for dependency in dependencies:
-                    for element in _elements:
-                        add_dependency = all([
-                            predicate(element, dependency)
-                            for predicate in predicates])
-                        if add_dependency:
-                            self.element_graph.add_edge(element, dependency)
+                for element in _elements:
+                    for dependency in self.matching_elements(
+                            element, requirement, predicates):
+                        self.element_graph.add_edge(element, dependency)
         # we reverse the graph because only netorkx 1.9.1 has the reverse
         # flag in the topological sort function, it is only used by it
         # so this should be good
@@ -270,6 +318,74 @@ class _BatchDependency(object):
         self._dependency_type = dependency_type
 
 
+class _ElementPlan(object):
+    """The schema validators and requirements of an element class.
+
+    Compiled once per element class, see _element_plan.
+    """
+
+    def __init__(self, element_cls):
+        schema = element_cls.schema
+        schema_items = schema if isinstance(schema, list) else [schema]
+        self.validators = [_compile_schema_validator(schema_item)
+                           for schema_item in schema_items]
+        self.requirements = []
+        for required_type, requirements in element_cls.requires.items():
+            if required_type == 'self':
+                required_type = element_cls
+            self.requirements.append((required_type, [
+                Requirement(r) if isinstance(r, basestring) else r
+                for r in requirements]))
+
+
+_element_plans = weakref.WeakKeyDictionary()
+
+
+def _element_plan(element_cls):
+    plan = _element_plans.get(element_cls)
+    if plan is None:
+        plan = _element_plans[element_cls] = _ElementPlan(element_cls)
+    return plan
+
+
+def _compile_schema_validator(schema):
+    """Compile a schema to a function validating element values.
+
+    The function returns None for valid values and otherwise a function
+    creating the validation error, so that the errors of schema
+    alternatives that are not raised are not formatted.
+    """
+    if isinstance(schema, (dict, elements.Dict)):
+        strict_keys = schema if isinstance(schema, dict) else None
+
+        def validate(element, value, strict):
+            if not isinstance(value, dict):
+                return functools.partial(_expected_type_error, value, dict)
+            for key in value:
+                if not isinstance(key, basestring):
+                    return functools.partial(_dict_key_error, key)
+            if strict and strict_keys is not None:
+                for key in value:
+                    if key not in strict_keys:
+                        return functools.partial(_not_in_schema_error,
+                                                 element, key, strict_keys)
+    elif isinstance(schema, elements.List):
+        def validate(element, value, strict):
+            if not isinstance(value, list):
+                return functools.partial(_expected_type_error, value, list)
+    elif isinstance(schema, elements.Leaf):
+        leaf_type = schema.type
+
+        def validate(element, value, strict):
+            if not isinstance(value, leaf_type):
+                return functools.partial(_expected_type_error,
+                                         value, leaf_type)
+    else:
+        def validate(element, value, strict):
+            pass
+    return validate
+
+
 class Parser(object):
 
     def parse(self,
@@ -299,66 +415,22 @@ class Parser(object):
 
     @staticmethod
     def _validate_element_schema(element, strict):
-        value = element.initial_value
+        value = element._initial_value
         if element.required and value is None:
             raise exceptions.DSLParsingFormatException(
                 1, "'{0}' key is required but it is currently missing"
                    .format(element.name))
-
-        def validate_schema(schema):
-            if isinstance(schema, (dict, elements.Dict)):
-                if not isinstance(value, dict):
-                    raise exceptions.DSLParsingFormatException(
-                        1, _expected_type_message(value, dict))
-                for key in value.keys():
-                    if not isinstance(key, basestring):
-                        raise exceptions.DSLParsingFormatException(
-                            1, "Dict keys must be strings but"
-                               " found '{0}' of type '{1}'"
-                               .format(key, _py_type_to_user_type(type(key))))
-
-            if strict and isinstance(schema, dict):
-                for key in value.keys():
-                    if key not in schema:
-                        ex = exceptions.DSLParsingFormatException(
-                            1, "'{0}' is not in schema. "
-                               "Valid schema values: {1}"
-                               .format(key, schema.keys()))
-                        for child_element in element.children():
-                            if child_element.name == key:
-                                ex.element = child_element
-                                break
-                        raise ex
-
-            if (isinstance(schema, elements.List) and
-                    not isinstance(value, list)):
-                raise exceptions.DSLParsingFormatException(
-                    1, _expected_type_message(value, list))
-
-            if (isinstance(schema, elements.Leaf) and
-                    not isinstance(value, schema.type)):
-                raise exceptions.DSLParsingFormatException(
-                    1, _expected_type_message(value, schema.type))
-        if value is not None:
-            if isinstance(element.schema, list):
-                validated = False
-                last_error = None
-                for schema_item in element.schema:
-                    try:
-                        validate_schema(schema_item)
-                    except exceptions.DSLParsingFormatException as e:
-                        last_error = e
-                    else:
-                        validated = True
-                        break
-                if not validated:
-                    if not last_error:
-                        raise ValueError('Illegal state should have been '
-                                         'identified by schema API validation')
-                    else:
-                        raise last_error
-            else:
-                validate_schema(element.schema)
+        if value is None:
+            return
+        last_error = None
+        for validate in _element_plan(type(element)).validators:
+            last_error = validate(element, value, strict)
+            if last_error is None:
+                return
+        if not last_error:
+            raise ValueError('Illegal state should have been '
+                             'identified by schema API validation')
+        raise last_error()
 
     def _process_element(self, element):
         required_args = self._extract_element_requirements(element)
@@ -370,9 +442,8 @@ class Parser(object):
     def _extract_element_requirements(element):
         context = element.context
         required_args = {}
-        for required_type, requirements in element.requires.items():
-            requirements = [Requirement(r) if isinstance(r, basestring)
-                            else r for r in requirements]
+        for required_type, requirements in \
+                _element_plan(type(element)).requirements:
             if not requirements:
                 # only set required type as a logical dependency
                 pass
@@ -385,21 +456,17 @@ class Parser(object):
                                .format(input.name, context.inputs.keys()))
                     required_args[input.name] = context.inputs.get(input.name)
             else:
-                if required_type == 'self':
-                    required_type = type(element)
-                required_type_elements = context.element_type_to_elements.get(
-                    required_type, [])
                 for requirement in requirements:
                     result = []
-                    for required_element in required_type_elements:
-                        if requirement.predicate and not requirement.predicate(
-                                element, required_element):
-                            continue
+                    for required_element in context.matching_elements(
+                            element, required_type,
+                            [requirement.predicate]
+                            if requirement.predicate else []):
                         if requirement.parsed:
                             result.append(required_element.value)
                         else:
-                            if (requirement.name not in
-                                    required_element.provided):
+                            if not required_element.provides_value(
+                                    requirement.name):
                                 provided = required_element.provided.keys()
                                 if requirement.required:
                                     raise exceptions.DSLParsingFormatException(
@@ -412,8 +479,8 @@ class Parser(object):
                                                 provided))
                                 else:
                                     continue
-                            result.append(required_element.provided[
-                                requirement.name])
+                            result.append(required_element.provided_value(
+                                requirement.name))
 
                     if len(result) != 1 and not requirement.multiple_results:
                         if requirement.required:
@@ -454,6 +521,28 @@ def parse(value,
                          strict=strict)
 
 
+def _expected_type_error(value, expected_type):
+    return exceptions.DSLParsingFormatException(
+        1, _expected_type_message(value, expected_type))
+
+
+def _dict_key_error(key):
+    return exceptions.DSLParsingFormatException(
+        1, "Dict keys must be strings but found '{0}' of type '{1}'"
+           .format(key, _py_type_to_user_type(type(key))))
+
+
+def _not_in_schema_error(element, key, schema):
+    ex = exceptions.DSLParsingFormatException(
+        1, "'{0}' is not in schema. Valid schema values: {1}"
+           .format(key, schema.keys()))
+    for child_element in element.children():
+        if child_element.name == key:
+            ex.element = child_element
+            break
+    return ex
+
+
 def _expected_type_message(value, expected_type):
     return ("Expected '{0}' type but found '{1}' type"
             .format(_py_type_to_user_type(expected_type),
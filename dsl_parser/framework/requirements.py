@@ -43,5 +43,30 @@ class Value(Requirement):
                                     predicate=predicate)
 
 
+def _name(element):
+    return element.name
+
+
+def _parent(element):
+    return element.parent()
+
+
+def keyed_predicate(source_keys, target_key=_name):
+    """Declare the only targets a requirement predicate may match.
+
+    A predicate decorated with this decorator may only match targets whose
+    key, the target name by default, is one of the keys returned by
+    ``source_keys(source)``. The parser uses it to look up the candidate
+    targets of an element in an index, instead of evaluating the predicate
+    for all the elements of the required type.
+    """
+    def decorator(predicate):
+        predicate.source_keys = source_keys
+        predicate.target_key = target_key
+        return predicate
+    return decorator
+
+
+@keyed_predicate(lambda source: [source.parent()], target_key=_parent)
 def sibling_predicate(source, target):
     return source.parent() == target.parent()
@@ -49,7 +49,7 @@ def _register_entry_point_functions():
         register(fn=entry_point.load(), name=entry_point.name)
 
 
-def _is_function(value):
+def is_function(value):
     """Does the value represent a template function call?"""
     # functions use the syntax {function_name: args}, so let's look for
     # dicts of length 1 where the only key was registered as a function
@@ -60,22 +60,55 @@ def _is_function(value):
 _register_entry_point_functions()
 
 
+class RuntimeEvaluationIndex(object):
+    """Containment ancestry of node instances, kept across evaluations.
+
+    For every node instance indexed, holds its version, the id of the
+    instance containing it and the ids of the scaling group instances it is
+    a member of. None of these change during the life of a node instance
+    unless its version does, so an index can be reused by all the
+    evaluations made against a deployment. The instance is still fetched by
+    every evaluation using its entry, and the entry is rebuilt whenever the
+    fetched version is not the indexed one, so reusing an index saves
+    fetching the nodes of the instances.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, node_instance_id):
+        return self._entries.get(node_instance_id)
+
+    def set(self, node_instance_id, entry):
+        self._entries[node_instance_id] = entry
+
+    def invalidate(self, node_instance_id=None):
+        if node_instance_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(node_instance_id, None)
+
+
 class RuntimeEvaluationStorage(object):
 
     def __init__(self,
                  get_node_instances_method,
                  get_node_instance_method,
                  get_node_method,
-                 get_secret_method):
+                 get_secret_method,
+                 index=None):
         self._get_node_instances_method = get_node_instances_method
         self._get_node_instance_method = get_node_instance_method
         self._get_node_method = get_node_method
         self._get_secret_method = get_secret_method
+        self._index = index if index is not None else \
+            RuntimeEvaluationIndex()
 
         self._node_to_node_instances = {}
         self._node_instances = {}
         self._nodes = {}
         self._secrets = {}
+        self._scaling_group_ancestry = {}
 
     def get_node_instances(self, node_id):
         if node_id not in self._node_to_node_instances:
@@ -103,6 +136,46 @@ class RuntimeEvaluationStorage(object):
             self._secrets[secret_key] = secret.value
         return self._secrets[secret_key]
 
+    def get_scaling_group_ancestry(self, node_instance_id):
+        """Scaling group instances containing a node instance.
+
+        :return: (group name, group instance id) pairs of the groups the
+                 node instance is a member of, followed by those of the
+                 instances containing it, innermost first.
+        """
+        if node_instance_id not in self._scaling_group_ancestry:
+            _, parent_id, scaling_groups = self._index_entry(node_instance_id)
+            ancestry = list(scaling_groups)
+            if parent_id:
+                ancestry += self.get_scaling_group_ancestry(parent_id)
+            self._scaling_group_ancestry[node_instance_id] = ancestry
+        return self._scaling_group_ancestry[node_instance_id]
+
+    def _index_entry(self, node_instance_id):
+        # the instance may have been scaled or modified since it was
+        # indexed, so the entry is only used if its version is current
+        node_instance = self.get_node_instance(node_instance_id)
+        version = getattr(node_instance, 'version', None)
+        entry = self._index.get(node_instance_id)
+        if entry is not None and version is not None and entry[0] == version:
+            return entry
+        entry = (version,
+                 self._parent_instance_id(node_instance),
+                 tuple((g['name'], g['id'])
+                       for g in node_instance.scaling_groups or []))
+        self._index.set(node_instance_id, entry)
+        return entry
+
+    def _parent_instance_id(self, node_instance):
+        node = self.get_node(node_instance.node_id)
+        for relationship in node.relationships or []:
+            if (constants.CONTAINED_IN_REL_TYPE in
+                    relationship['type_hierarchy']):
+                target_name = relationship['target_id']
+                return [r['target_id'] for r in node_instance.relationships
+                        if r['target_name'] == target_name][0]
+        return None
+
 
 class Function(object):
 
@@ -364,24 +437,9 @@ class GetAttribute(Function):
             storage,
             node_instances):
 
-        def _parent_instance(_instance):
-            _node = storage.get_node(_instance.node_id)
-            for relationship in _node.relationships or []:
-                if (constants.CONTAINED_IN_REL_TYPE in
-                        relationship['type_hierarchy']):
-                    target_name = relationship['target_id']
-                    target_id = [
-                        r['target_id'] for r in _instance.relationships
-                        if r['target_name'] == target_name][0]
-                    return storage.get_node_instance(target_id)
-            return None
-
         def _containing_groups(_instance):
-            result = [g['name'] for g in _instance.scaling_groups or []]
-            parent_instance = _parent_instance(_instance)
-            if parent_instance:
-                result += _containing_groups(parent_instance)
-            return result
+            return [name for name, _ in
+                    storage.get_scaling_group_ancestry(_instance.id)]
 
         def _minimal_shared_group(instance_a, instance_b):
             a_containing_groups = _containing_groups(instance_a)
@@ -396,13 +454,11 @@ class GetAttribute(Function):
                 raise RuntimeError('Illegal state')
 
         def _group_instance(node_instance, group_name):
-            for scaling_group in (node_instance.scaling_groups or []):
-                if scaling_group['name'] == group_name:
-                    return scaling_group['id']
-            parent_instance = _parent_instance(node_instance)
-            if not parent_instance:
-                raise RuntimeError('Illegal state')
-            return _group_instance(parent_instance, group_name)
+            for name, group_instance_id in \
+                    storage.get_scaling_group_ancestry(node_instance.id):
+                if name == group_name:
+                    return group_instance_id
+            raise RuntimeError('Illegal state')
 
         def _resolve_node_instance(context_instance_id):
             context_instance = storage.get_node_instance(context_instance_id)
@@ -534,7 +590,7 @@ def _get_property_value(node_name,
 
     value = properties
     for p in property_path:
-        if _is_function(value):
+        if is_function(value):
             value = [value, p]
         elif isinstance(value, dict):
             if p not in value:
@@ -580,7 +636,7 @@ def _get_property_value(node_name,
 
 
 def parse(raw_function, scope=None, context=None, path=None):
-    if _is_function(raw_function):
+    if is_function(raw_function):
         func_name, func_args = raw_function.items()[0]
         return TEMPLATE_FUNCTIONS[func_name](func_args,
                                              scope=scope,
@@ -594,7 +650,9 @@ def evaluate_functions(payload, context,
                        get_node_instances_method,
                        get_node_instance_method,
                        get_node_method,
-                       get_secret_method):
+                       get_secret_method,
+                       index=None,
+                       paths=None):
     """Evaluate functions in payload.
 
     :param payload: The payload to evaluate.
@@ -603,18 +661,36 @@ def evaluate_functions(payload, context,
     :param get_node_instance_method: A method for getting a node instance.
     :param get_node_method: A method for getting a node.
     :param get_secret_method: A method for getting a secret.
+    :param index: A RuntimeEvaluationIndex of the deployment, reused
+                  between evaluations (optional).
+    :param paths: The paths of the functions in payload, as found by
+                  find_function_paths (optional). When given, only these
+                  are evaluated.
     :return: payload.
     """
+    if paths is not None and not paths:
+        return payload
     handler = runtime_evaluation_handler(get_node_instances_method,
                                          get_node_instance_method,
                                          get_node_method,
-                                         get_secret_method)
-    scan.scan_properties(payload,
-                         handler,
-                         scope=None,
-                         context=context,
-                         path='payload',
-                         replace=True)
+                                         get_secret_method,
+                                         index=index)
+    if paths is None:
+        scan.scan_properties(payload,
+                             handler,
+                             scope=None,
+                             context=context,
+                             path='payload',
+                             replace=True,
+                             match=is_function)
+    else:
+        scan.scan_paths(payload,
+                        paths,
+                        handler,
+                        scope=None,
+                        context=context,
+                        path='payload',
+                        replace=True)
     return payload
 
 
@@ -622,7 +698,9 @@ def evaluate_outputs(outputs_def,
                      get_node_instances_method,
                      get_node_instance_method,
                      get_node_method,
-                     get_secret_method):
+                     get_secret_method,
+                     index=None,
+                     functions_index=None):
     """Evaluates an outputs definition containing intrinsic functions.
 
     :param outputs_def: Outputs definition.
@@ -630,16 +708,124 @@ def evaluate_outputs(outputs_def,
     :param get_node_instance_method: A method for getting a node instance.
     :param get_node_method: A method for getting a node.
     :param get_secret_method: A method for getting a secret.
+    :param index: A RuntimeEvaluationIndex of the deployment, reused
+                  between evaluations (optional).
+    :param functions_index: The functions index of the deployment plan,
+                            see index_functions (optional). When given,
+                            only the functions it lists are evaluated.
     :return: Outputs dict.
     """
     outputs = dict((k, v['value']) for k, v in outputs_def.iteritems())
+    paths = None
+    if functions_index is not None:
+        paths = [[name] + output_path
+                 for name, output_paths in
+                 functions_index.get('outputs', {}).iteritems()
+                 if name in outputs
+                 for output_path in output_paths]
     return evaluate_functions(
         payload=outputs,
         context={},
         get_node_instances_method=get_node_instances_method,
         get_node_instance_method=get_node_instance_method,
         get_node_method=get_node_method,
-        get_secret_method=get_secret_method)
+        get_secret_method=get_secret_method,
+        index=index,
+        paths=paths)
+
+
+def find_function_paths(value):
+    """Paths of the intrinsic function calls nested in value.
+
+    See scan.find_paths. A function call nested in the arguments of
+    another one is listed after it.
+    """
+    return scan.find_paths(value, match=is_function)
+
+
+def outermost_function_paths(paths):
+    """The function paths of `paths` not nested in another one of them.
+
+    Evaluating the functions at these paths evaluates all of them.
+    """
+    prefixes = set(tuple(path) for path in paths)
+    return [path for path in paths
+            if not any(tuple(path[:i]) in prefixes
+                       for i in range(len(path)))]
+
+
+def index_functions(plan):
+    """Index the intrinsic functions left in a deployment plan.
+
+    Lists the paths of the functions in every node properties set,
+    capability properties set and operation inputs set, and in every
+    output value. Sets and nodes without functions are left out.
+
+    Operations with functions in their inputs are also given the
+    outermost of these paths, as ``function_paths``, so that their inputs
+    are evaluated at these paths only when the operation is executed.
+
+    :return: {'nodes': {node_id: {'properties': [path, ...],
+                                  'capabilities': {name: [path, ...]},
+                                  'operations': {name: [path, ...]},
+                                  'relationships': [
+                                      {'source_operations': {...},
+                                       'target_operations': {...}},
+                                      ...]}},
+              'outputs': {name: [path, ...]}}
+              where each path is relative to its properties set, inputs
+              set or output value.
+    """
+    def operations_index(operations):
+        result = {}
+        for name, operation in operations.iteritems():
+            if isinstance(operation, dict) and 'inputs' in operation:
+                paths = find_function_paths(operation['inputs'])
+                if paths:
+                    result[name] = paths
+                    operation['function_paths'] = \
+                        outermost_function_paths(paths)
+        return result
+
+    nodes = {}
+    for node in plan.node_templates:
+        node_index = {}
+        properties = find_function_paths(node['properties'])
+        if properties:
+            node_index['properties'] = properties
+        capabilities = {}
+        for name, capability in node.get('capabilities', {}).iteritems():
+            paths = find_function_paths(capability.get('properties', {}))
+            if paths:
+                capabilities[name] = paths
+        if capabilities:
+            node_index['capabilities'] = capabilities
+        operations = operations_index(node['operations'])
+        if operations:
+            node_index['operations'] = operations
+        relationships = []
+        for relationship in node.get('relationships', []):
+            relationship_index = {}
+            for key in ('source_operations', 'target_operations'):
+                key_operations = operations_index(relationship.get(key, {}))
+                if key_operations:
+                    relationship_index[key] = key_operations
+            relationships.append(relationship_index)
+        if any(relationships):
+            node_index['relationships'] = relationships
+        if node_index:
+            nodes[node['id']] = node_index
+
+    outputs = {}
+    for name, output in plan.outputs.iteritems():
+        value = output.get('value')
+        if is_function(value):
+            outputs[name] = [[]]
+        else:
+            paths = find_function_paths(value)
+            if paths:
+                outputs[name] = paths
+    return {'nodes': nodes, 'outputs': outputs}
 
 
 def _handler(evaluator, **evaluator_kwargs):
@@ -662,7 +848,8 @@ def _handler(evaluator, **evaluator_kwargs):
                                  scope=scope,
                                  context=context,
                                  path=path,
-                                 replace=True)
+                                 replace=True,
+                                 match=is_function)
             scanned = True
         return evaluated_value
     return handler
@@ -675,33 +862,36 @@ def plan_evaluation_handler(plan):
 def runtime_evaluation_handler(get_node_instances_method,
                                get_node_instance_method,
                                get_node_method,
-                               get_secret_method):
+                               get_secret_method,
+                               index=None):
     return _handler('evaluate_runtime',
                     storage=RuntimeEvaluationStorage(
                         get_node_instances_method=get_node_instances_method,
                         get_node_instance_method=get_node_instance_method,
                         get_node_method=get_node_method,
-                        get_secret_method=get_secret_method))
+                        get_secret_method=get_secret_method,
+                        index=index))
 
 
 def validate_functions(plan):
-    get_property_functions = []
-
-    def handler(v, scope, context, path):
-        _func = parse(v, scope=scope, context=context, path=path)
-        if isinstance(_func, Function):
-            _func.validate(plan)
-        if isinstance(_func, GetProperty):
-            get_property_functions.append(_func)
-            return _func
-        return v
+    get_property_sites = []
 
     # Replace all get_property functions with their instance representation
-    scan.scan_service_template(plan, handler, replace=True)
+    for site in scan.find_sites(plan, match=is_function):
+        _func = parse(site.value,
+                      scope=site.scope,
+                      context=site.context,
+                      path=site.path)
+        _func.validate(plan)
+        if isinstance(_func, GetProperty):
+            site.value = _func
+            get_property_sites.append(site)
 
-    if not get_property_functions:
+    if not get_property_sites:
         return
 
+    get_property_functions = [site.value for site in get_property_sites]
+
     # Validate there are no circular get_property calls
     for func in get_property_functions:
         property_path = [str(prop) for prop in func.property_path]
@@ -735,10 +925,8 @@ def validate_functions(plan):
         result = func.evaluate(plan)
         validate_no_circular_get_property(result)
 
-    def replace_with_raw_function(*args):
-        if isinstance(args[0], GetProperty):
-            return args[0].raw
-        return args[0]
-
-    # Change previously replaced get_property instances with raw values
-    scan.scan_service_template(plan, replace_with_raw_function, replace=True)
+    # Change previously replaced get_property instances with raw values,
+    # sites shared in the plan are found more than once
+    for site in get_property_sites:
+        if isinstance(site.value, GetProperty):
+            site.value = site.value.raw
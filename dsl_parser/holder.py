@@ -15,6 +15,22 @@
 
 
 class Holder(object):
+    """A loaded YAML value, marked with its location in the document.
+
+    Dict holders hold a dict of key holders to value holders. Holders are
+    hashed and compared by their value, so such a dict can be looked up
+    directly by a Holder of the key. The key holders themselves are found
+    through an index, built on the first lookup and rebuilt whenever the
+    dict is replaced or its size changes.
+    """
+
+    __slots__ = ('value',
+                 'start_line',
+                 'start_column',
+                 'end_line',
+                 'end_column',
+                 'filename',
+                 '_keys')
 
     def __init__(self,
                  value,
@@ -29,6 +45,32 @@ class Holder(object):
         self.end_line = end_line
         self.end_column = end_column
         self.filename = filename
+        self._keys = None
+
+    def __getstate__(self):
+        return (self.value,
+                self.start_line,
+                self.start_column,
+                self.end_line,
+                self.end_column,
+                self.filename)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # pickled before holders were slotted
+            state = (state['value'],
+                     state['start_line'],
+                     state['start_column'],
+                     state['end_line'],
+                     state['end_column'],
+                     state['filename'])
+        (self.value,
+         self.start_line,
+         self.start_column,
+         self.end_line,
+         self.end_column,
+         self.filename) = state
+        self._keys = None
 
     def __str__(self):
         return '{0}<{1}.{2}-{3}.{4} [{5}]>'.format(
@@ -53,25 +95,40 @@ class Holder(object):
         return value_holder is not None
 
     def get_item(self, key):
-        if not isinstance(self.value, dict):
+        value = self.value
+        if not isinstance(value, dict):
             raise ValueError('Value is expected to be of type dict while it'
                              'is in fact of type {0}'
-                             .format(type(self.value).__name__))
-        for key_holder, value_holder in self.value.iteritems():
-            if key_holder.value == key:
-                return key_holder, value_holder
-        return None, None
+                             .format(type(value).__name__))
+        try:
+            value_holder = value.get(Holder(key))
+        except TypeError:
+            # unhashable keys can only be compared
+            for key_holder, value_holder in value.iteritems():
+                if key_holder.value == key:
+                    return key_holder, value_holder
+            return None, None
+        if value_holder is None:
+            return None, None
+        keys = self._keys
+        if keys is None or keys[0] is not value or \
+                len(keys[1]) != len(value) or key not in keys[1]:
+            keys = (value, dict((key_holder.value, key_holder)
+                                for key_holder in value))
+            self._keys = keys
+        return keys[1][key], value_holder
 
     def restore(self):
-        if isinstance(self.value, dict):
+        value = self.value
+        if isinstance(value, dict):
             return dict((key_holder.restore(), value_holder.restore())
-                        for key_holder, value_holder in self.value.iteritems())
-        elif isinstance(self.value, list):
-            return [value_holder.restore() for value_holder in self.value]
-        elif isinstance(self.value, set):
-            return set((value_holder.restore() for value_holder in self.value))
+                        for key_holder, value_holder in value.iteritems())
+        elif isinstance(value, list):
+            return [value_holder.restore() for value_holder in value]
+        elif isinstance(value, set):
+            return set((value_holder.restore() for value_holder in value))
         else:
-            return self.value
+            return value
 
     @staticmethod
     def of(obj, filename=None):
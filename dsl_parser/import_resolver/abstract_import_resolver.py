@@ -34,10 +34,18 @@ class AbstractImportResolver(object):
     implementations of import resolver.
     The only mandatory implementation is of resolve, which is expected
     to open the import url and return its data.
+
+    Set ``concurrent_fetch`` to True when ``fetch_import`` may be called
+    from several threads at the same time. The imports of a blueprint are
+    then fetched concurrently, and an import may be fetched even if parsing
+    fails on an import that comes before it. Otherwise the imports are
+    fetched one by one, in the order they are merged.
     """
 
     __metaclass__ = abc.ABCMeta
 
+    concurrent_fetch = False
+
     @abc.abstractmethod
     def resolve(self, import_url):
         raise NotImplementedError
@@ -72,6 +72,9 @@ class DefaultImportResolver(AbstractImportResolver):
         a DSLParsingLogicException will be raise.
     """
 
+    # resolving only reads the rules, so it is safe in several threads
+    concurrent_fetch = True
+
     def __init__(self, rules=None):
         # set the rules
         self.rules = rules
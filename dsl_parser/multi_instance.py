@@ -14,19 +14,32 @@
 #    * limitations under the License.
 
 
+import gc
 import copy
+from contextlib import contextmanager
 
 from dsl_parser import (models,
                         rel_graph,
                         constants)
 
 
-def create_deployment_plan(plan):
+def create_deployment_plan(plan, copy_plan=True):
     """
     Expand node instances based on number of instances to deploy and
     defined relationships
+
+    :param copy_plan: Whether to copy the plan first. Without a copy, the
+                      node relationships of plan are changed while
+                      expanding, and the returned plan shares everything
+                      else with it.
     """
-    deployment_plan = copy.deepcopy(plan)
+    with _gc_paused():
+        if copy_plan:
+            plan = copy.deepcopy(plan)
+        return _create_deployment_plan(plan)
+
+
+def _create_deployment_plan(deployment_plan):
     plan_node_graph = rel_graph.build_node_graph(
         nodes=deployment_plan['nodes'],
         scaling_groups=deployment_plan['scaling_groups'])
@@ -54,6 +67,20 @@ def modify_deployment(nodes,
     :return: a dict of add,extended,reduced and removed instances
      Add a line note
     """
+    with _gc_paused():
+        return _modify_deployment(
+            nodes=nodes,
+            previous_nodes=previous_nodes,
+            previous_node_instances=previous_node_instances,
+            modified_nodes=modified_nodes,
+            scaling_groups=scaling_groups)
+
+
+def _modify_deployment(nodes,
+                       previous_nodes,
+                       previous_node_instances,
+                       modified_nodes,
+                       scaling_groups):
 
     plan_node_graph = rel_graph.build_node_graph(
         nodes=nodes,
@@ -106,7 +133,20 @@ def modify_deployment(nodes,
 
 def filter_out_node_instances(node_instances_to_filter_out,
                               base_node_instances):
-    instance_ids_to_remove = [n['id'] for n in node_instances_to_filter_out
-                              if 'modification' in n]
+    instance_ids_to_remove = set(n['id'] for n in node_instances_to_filter_out
+                                 if 'modification' in n)
     return [n for n in base_node_instances
             if n['id'] not in instance_ids_to_remove]
+
+
+@contextmanager
+def _gc_paused():
+    # The node instance graphs are large and have no reference cycles, yet
+    # building them triggers many full collections that traverse them all
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -25,7 +25,8 @@ def parse_from_path(dsl_file_path,
                     resources_base_path=None,
                     resolver=None,
                     validate_version=True,
-                    additional_resource_sources=()):
+                    additional_resource_sources=(),
+                    cache=None):
     with open(dsl_file_path, 'r') as f:
         dsl_string = f.read()
     return _parse(dsl_string,
@@ -33,19 +34,22 @@ def parse_from_path(dsl_file_path,
                   dsl_location=dsl_file_path,
                   resolver=resolver,
                   validate_version=validate_version,
-                  additional_resource_sources=additional_resource_sources)
+                  additional_resource_sources=additional_resource_sources,
+                  cache=cache)
 
 
 def parse(dsl_string,
           resources_base_path=None,
           dsl_location=None,
           resolver=None,
-          validate_version=True):
+          validate_version=True,
+          cache=None):
     return _parse(dsl_string,
                   resources_base_path=resources_base_path,
                   dsl_location=dsl_location,
                   resolver=resolver,
-                  validate_version=validate_version)
+                  validate_version=validate_version,
+                  cache=cache)
 
 
 def _parse(dsl_string,
@@ -53,10 +57,25 @@ def _parse(dsl_string,
            dsl_location=None,
            resolver=None,
            validate_version=True,
-           additional_resource_sources=()):
-    parsed_dsl_holder = utils.load_yaml(raw_yaml=dsl_string,
-                                        error_message='Failed to parse DSL',
-                                        filename=dsl_location)
+           additional_resource_sources=(),
+           cache=None):
+    """Parse a blueprint into a deployment plan.
+
+    :param cache: An optional `dsl_parser.cache.BlueprintCache`, reusing the
+                  documents and plans of previous parses.
+    """
+    error_message = 'Failed to parse DSL'
+    if cache is None:
+        parsed_dsl_holder = utils.load_yaml(raw_yaml=dsl_string,
+                                            error_message=error_message,
+                                            filename=dsl_location)
+    else:
+        dsl_digest = cache.digest(dsl_string)
+        parsed_dsl_holder = cache.load_yaml(raw_yaml=dsl_string,
+                                            error_message=error_message,
+                                            filename=dsl_location,
+                                            location=dsl_location,
+                                            digest=dsl_digest)
 
     if not resolver:
         resolver = DefaultImportResolver()
@@ -80,7 +99,8 @@ def _parse(dsl_string,
             'blueprint_location': dsl_location,
             'version': version,
             'resolver': resolver,
-            'validate_version': validate_version
+            'validate_version': validate_version,
+            'cache': cache
         },
         element_cls=blueprint.BlueprintImporter,
         strict=False)
@@ -88,6 +108,20 @@ def _parse(dsl_string,
     if additional_resource_sources:
         resource_base.extend(additional_resource_sources)
 
+    if cache is not None:
+        plan_key = cache.plan_key(
+            dsl_digest=dsl_digest,
+            imports_digests=result['imports_digests'],
+            dsl_location=dsl_location,
+            resources_base_path=resources_base_path,
+            resource_base=resource_base,
+            validate_version=validate_version)
+        # the imports were fetched to key the plan by their content, see
+        # BlueprintCache
+        plan = cache.get_plan(plan_key)
+        if plan is not None:
+            return plan
+
     merged_blueprint_holder = result['merged_blueprint']
 
     # parse blueprint
@@ -100,4 +134,6 @@ def _parse(dsl_string,
         element_cls=blueprint.Blueprint)
 
     functions.validate_functions(plan)
+    if cache is not None:
+        cache.put_plan(plan_key, plan)
     return plan
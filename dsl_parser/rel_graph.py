@@ -391,16 +391,30 @@ def _graph_diff_relationships(G, H, node_instance_attributes):
 
 def _handle_contained_in(ctx):
     # for each 'contained' tree, recursively build new trees based on
-    # scaling groups with generated ids
+    # scaling groups with generated ids. The trees are only read, so they
+    # share the node data of the plan graph rather than deep copy it
+    reversed_contained_graph = nx.DiGraph()
+    reversed_contained_graph.add_nodes_from(
+        ctx.plan_contained_graph.nodes_iter(data=True))
+    reversed_contained_graph.add_edges_from(
+        (target, source, data) for source, target, data in
+        ctx.plan_contained_graph.edges_iter(data=True))
     for contained_tree in nx.weakly_connected_component_subgraphs(
-            ctx.plan_contained_graph.reverse(copy=True)):
+            reversed_contained_graph, copy=False):
         # extract tree root node id
         node_id = nx.topological_sort(contained_tree)[0]
         _build_multi_instance_node_tree_rec(
             node_id=node_id,
             contained_tree=contained_tree,
             ctx=ctx)
-    ctx.deployment_contained_graph = ctx.deployment_node_graph.copy()
+    # the contained graph only needs its own edges, connected_to edges are
+    # added to the deployment graph later. Node instances are shared, the
+    # same as in the previous deployment graphs
+    contained_graph = nx.DiGraph()
+    contained_graph.add_nodes_from(
+        ctx.deployment_node_graph.nodes_iter(data=True))
+    contained_graph.add_edges_from(ctx.deployment_node_graph.edges_iter())
+    ctx.deployment_contained_graph = contained_graph
 
 
 def _build_multi_instance_node_tree_rec(node_id,
@@ -417,6 +431,12 @@ def _build_multi_instance_node_tree_rec(node_id,
         parent_node_instance_id=parent_node_instance_id,
         parent_relationship=parent_relationship,
         current_host_instance_id=current_host_instance_id)
+    child_contained_trees = []
+    for child_node_id in contained_tree.neighbors_iter(node_id):
+        descendants = nx.descendants(contained_tree, child_node_id)
+        descendants.add(child_node_id)
+        child_contained_trees.append(
+            (child_node_id, contained_tree.subgraph(descendants)))
     for container in containers:
         node_instance = container.node_instance
         node_instance_id = node_instance['id']
@@ -429,10 +449,7 @@ def _build_multi_instance_node_tree_rec(node_id,
                 node_instance_id, parent_node_instance_id,
                 relationship=relationship_instance,
                 index=parent_relationship_index)
-        for child_node_id in contained_tree.neighbors_iter(node_id):
-            descendants = nx.descendants(contained_tree, child_node_id)
-            descendants.add(child_node_id)
-            child_contained_tree = contained_tree.subgraph(descendants)
+        for child_node_id, child_contained_tree in child_contained_trees:
             _build_multi_instance_node_tree_rec(
                 node_id=child_node_id,
                 contained_tree=child_contained_tree,
@@ -456,15 +473,9 @@ def _build_and_update_node_instances(ctx,
     new_instances_num = 0
     previous_containers = []
     if ctx.is_modification:
-        all_previous_node_instance_ids = ctx.node_ids_to_node_instance_ids[
-            node_id]
-        previous_node_instance_ids = [
-            instance_id for instance_id in all_previous_node_instance_ids
-            if not parent_node_instance_id or
-            (instance_id in ctx.previous_deployment_node_graph and
-             ctx.previous_deployment_node_graph[instance_id].get(
-                 parent_node_instance_id))
-        ]
+        previous_node_instance_ids = ctx.previous_node_instance_ids(
+            node_id=node_id,
+            parent_node_instance_id=parent_node_instance_id)
         previous_instances_num = len(previous_node_instance_ids)
         if node_id in ctx.modified_nodes:
             modified_node = ctx.modified_nodes[node_id]
@@ -527,24 +538,34 @@ def _handle_removed_instances(
         'removed_ids_include_hint', [])
     removed_ids_exclude_hint = modified_node.get(
         'removed_ids_exclude_hint', [])
+    previous_ids = set(previous_node_instance_ids)
+    removed_ids = set()
     for removed_instance_id in removed_ids_include_hint:
         if removed_instances_num <= 0:
             break
-        if removed_instance_id in previous_node_instance_ids:
-            previous_node_instance_ids.remove(removed_instance_id)
+        if (removed_instance_id in previous_ids and
+                removed_instance_id not in removed_ids):
+            removed_ids.add(removed_instance_id)
             removed_instances_num -= 1
-    for removed_instance_id in copy.copy(
-            previous_node_instance_ids):
+    excluded_ids = set(removed_ids_exclude_hint)
+    for removed_instance_id in previous_node_instance_ids:
         if removed_instances_num <= 0:
             break
-        if removed_instance_id in removed_ids_exclude_hint:
+        if (removed_instance_id in removed_ids or
+                removed_instance_id in excluded_ids):
             continue
-        previous_node_instance_ids.remove(removed_instance_id)
+        removed_ids.add(removed_instance_id)
         removed_instances_num -= 1
-    remaining_removed_instance_ids = previous_node_instance_ids[
-        :removed_instances_num]
-    for removed_instance_id in remaining_removed_instance_ids:
-        previous_node_instance_ids.remove(removed_instance_id)
+    for removed_instance_id in previous_node_instance_ids:
+        if removed_instances_num <= 0:
+            break
+        if removed_instance_id in removed_ids:
+            continue
+        removed_ids.add(removed_instance_id)
+        removed_instances_num -= 1
+    previous_node_instance_ids[:] = [
+        instance_id for instance_id in previous_node_instance_ids
+        if instance_id not in removed_ids]
 
 
 def _extract_contained(node, node_instance):
@@ -829,6 +850,7 @@ class Context(object):
         self.modified_nodes = modified_nodes
         self.node_ids_to_node_instance_ids = collections.defaultdict(set)
         self.node_instance_ids = set()
+        self._previous_node_instance_ids_by_target = {}
         if self.is_modification:
             for node_instance_id, data in \
                     self.previous_deployment_node_graph.nodes_iter(data=True):
@@ -842,6 +864,29 @@ class Context(object):
     def is_modification(self):
         return self.previous_deployment_node_graph is not None
 
+    def previous_node_instance_ids(self, node_id, parent_node_instance_id):
+        """Ids of the previous instances of a node, related to a parent.
+
+        The instances of each node are indexed by their relationship
+        targets once, so expanding a node under each of its parent
+        instances does not scan all the instances of the node again.
+        """
+        all_previous_node_instance_ids = self.node_ids_to_node_instance_ids[
+            node_id]
+        if not parent_node_instance_id:
+            return list(all_previous_node_instance_ids)
+        by_target = self._previous_node_instance_ids_by_target.get(node_id)
+        if by_target is None:
+            by_target = collections.defaultdict(list)
+            graph = self.previous_deployment_node_graph
+            for instance_id in all_previous_node_instance_ids:
+                if instance_id not in graph:
+                    continue
+                for target_id in graph.succ[instance_id]:
+                    by_target[target_id].append(instance_id)
+            self._previous_node_instance_ids_by_target[node_id] = by_target
+        return list(by_target.get(parent_node_instance_id, ()))
+
     def minimal_containing_group(self, node_a, node_b):
         a_groups = self._containing_groups(node_a)
         b_groups = self._containing_groups(node_b)
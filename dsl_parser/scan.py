@@ -26,13 +26,70 @@ collect_secrets = False
 secrets = set()
 
 
+class _Container(object):
+    """A dict or list on the scan stack.
+
+    Property paths are only formatted when a handler is called for one of
+    the container items, and each container path at most once.
+    """
+
+    __slots__ = ('value', 'items', 'is_list', 'parent', 'key', '_path')
+
+    def __init__(self, value, parent=None, key=None, path=None):
+        self.value = value
+        self.is_list = isinstance(value, list)
+        self.items = enumerate(value) if self.is_list else value.iteritems()
+        self.parent = parent
+        self.key = key
+        self._path = path
+
+    @property
+    def path(self):
+        if self._path is None:
+            if self.parent.is_list:
+                # items nested in list items are reported under the list
+                self._path = self.parent.path
+            else:
+                self._path = '{0}.{1}'.format(self.parent.path, self.key)
+        return self._path
+
+    def item_path(self, key):
+        if self.is_list:
+            return '{0}[{1}]'.format(self.path, key)
+        return '{0}.{1}'.format(self.path, key)
+
+
+def _walk(value, path, recursive=True, match=None):
+    """Yield (container, key, item) for the items nested in value.
+
+    Items are visited depth first, each item before its own items, using
+    an explicit stack. Only items for which match returns True are
+    yielded, but the items nested in all of them are visited.
+    """
+    if not isinstance(value, (dict, list)):
+        return
+    stack = [_Container(value, path=path)]
+    while stack:
+        container = stack[-1]
+        try:
+            key, item = next(container.items)
+        except StopIteration:
+            stack.pop()
+            continue
+        if match is None or match(item):
+            yield container, key, item
+        if recursive and isinstance(item, (dict, list)):
+            stack.append(_Container(item, container, key))
+
+
 def scan_properties(value,
                     handler,
                     scope=None,
                     context=None,
                     path='',
                     replace=False,
-                    recursive=True):
+                    recursive=True,
+                    match=None):
     """
     Scans properties dict recursively and applies the provided handler
     method for each property.
@@ -49,34 +106,15 @@ def scan_properties(value,
     :param value: The properties container (dict/list).
     :param handler: A method for applying for to each property.
     :param path: The properties base path (for debugging purposes).
+    :param match: If given, the handler is only applied to properties
+                  for which match(value) returns True.
     """
-    if isinstance(value, dict):
-        for k, v in value.iteritems():
-            current_path = '{0}.{1}'.format(path, k)
-            result = handler(v, scope, context, current_path)
+    for container, key, item in _walk(value, path, recursive, match):
+        result = handler(item, scope, context, container.item_path(key))
+        if collect_secrets:
             _collect_secret(result)
-            if replace and result != v:
-                value[k] = result
-            if recursive:
-                scan_properties(v, handler,
-                                scope=scope,
-                                context=context,
-                                path=current_path,
-                                replace=replace)
-    elif isinstance(value, list):
-        for index, item in enumerate(value):
-            current_path = '{0}[{1}]'.format(path, index)
-            result = handler(item, scope, context, current_path)
-            _collect_secret(result)
-            if replace and result != item:
-                value[index] = result
-            if recursive:
-                scan_properties(item,
-                                handler,
-                                scope=scope,
-                                context=context,
-                                path=path,
-                                replace=replace)
+        if replace and result != item:
+            container.value[key] = result
 
 
 def _collect_secret(value):
@@ -84,93 +122,199 @@ def _collect_secret(value):
         secrets.add(value['get_secret'])
 
 
-def _scan_operations(operations,
-                     handler,
-                     scope=None,
-                     context=None,
-                     path='',
-                     replace=False):
+def scan_paths(value,
+               paths,
+               handler,
+               scope=None,
+               context=None,
+               path='',
+               replace=False):
+    """
+    Applies the provided handler method to the properties at the given
+    paths only, in order.
+
+    A path is the list of keys leading from value to a property, as
+    returned by find_paths. Paths leading into a property replaced by the
+    handler, or no longer existing, are skipped.
+
+    :param value: The properties container (dict/list).
+    :param paths: The paths of the properties to handle.
+    :param handler: A method for applying to each property, with the
+                    signature described in scan_properties.
+    :param path: The properties base path (for debugging purposes).
+    """
+    replaced = set()
+    for keys in paths:
+        keys = tuple(keys)
+        if any(keys[:i] in replaced for i in range(1, len(keys))):
+            continue
+        container = value
+        try:
+            for key in keys[:-1]:
+                container = container[key]
+            item = container[keys[-1]]
+        except (KeyError, IndexError, TypeError):
+            continue
+        result = handler(item, scope, context, _format_path(path, keys))
+        if replace and result != item:
+            container[keys[-1]] = result
+            replaced.add(keys)
+
+
+def find_paths(value, match):
+    """Find the paths of the properties nested in value matching a predicate.
+
+    :return: A list of the lists of keys leading to each property, in
+             scanning order.
+    """
+    paths = []
+    for container, key, _ in _walk(value, path=None, match=match):
+        keys = [key]
+        while container.parent is not None:
+            keys.append(container.key)
+            container = container.parent
+        keys.reverse()
+        paths.append(keys)
+    return paths
+
+
+def _format_path(path, keys):
+    for key in keys:
+        if isinstance(key, int):
+            path = '{0}[{1}]'.format(path, key)
+        else:
+            path = '{0}.{1}'.format(path, key)
+    return path
+
+
+class Site(object):
+    """A property found by find_sites, replaceable in place."""
+
+    __slots__ = ('container', 'key', 'scope', 'context', 'path')
+
+    def __init__(self, container, key, scope, context, path):
+        self.container = container
+        self.key = key
+        self.scope = scope
+        self.context = context
+        self.path = path
+
+    @property
+    def value(self):
+        return self.container[self.key]
+
+    @value.setter
+    def value(self, value):
+        self.container[self.key] = value
+
+
+def find_sites(plan, match):
+    """Find the properties of a service template matching a predicate.
+
+    Scans the same properties scan_service_template does, in the same
+    order, in a single pass.
+
+    :param plan: The service template.
+    :param match: A predicate the found property values match.
+    :return: A list of Site.
+    """
+    sites = []
+    for value, scope, context, path in _service_template_properties(plan):
+        for container, key, item in _walk(value, path, match=match):
+            sites.append(Site(container.value, key, scope, context,
+                              container.item_path(key)))
+    return sites
+
+
+def _operations_properties(operations, scope=None, context=None, path=''):
     for name, definition in operations.iteritems():
         if isinstance(definition, dict) and 'inputs' in definition:
             context = context.copy() if context else {}
             context['operation'] = definition
-            scan_properties(definition['inputs'],
-                            handler,
-                            scope=scope,
-                            context=context,
-                            path='{0}.{1}.inputs'.format(path, name),
-                            replace=replace)
+            yield (definition['inputs'],
+                   scope,
+                   context,
+                   '{0}.{1}.inputs'.format(path, name))
 
 
-def scan_node_operation_properties(node_template, handler, replace=False):
-    _scan_operations(node_template['operations'],
-                     handler,
-                     scope=NODE_TEMPLATE_SCOPE,
-                     context=node_template,
-                     path='{0}.operations'.format(node_template['name']),
-                     replace=replace)
+def _node_operations_properties(node_template):
+    for properties in _operations_properties(
+            node_template['operations'],
+            scope=NODE_TEMPLATE_SCOPE,
+            context=node_template,
+            path='{0}.operations'.format(node_template['name'])):
+        yield properties
     for r in node_template.get('relationships', []):
         context = {'node_template': node_template, 'relationship': r}
-        _scan_operations(r.get('source_operations', {}),
-                         handler,
-                         scope=NODE_TEMPLATE_RELATIONSHIP_SCOPE,
-                         context=context,
-                         path='{0}.{1}'.format(node_template['name'],
-                                               r['type']),
-                         replace=replace)
-        _scan_operations(r.get('target_operations', {}),
-                         handler,
-                         scope=NODE_TEMPLATE_RELATIONSHIP_SCOPE,
-                         context=context,
-                         path='{0}.{1}'.format(node_template['name'],
-                                               r['type']),
-                         replace=replace)
-
-
-def scan_service_template(plan, handler, replace=False, search_secrets=False):
-    global collect_secrets
-    collect_secrets = search_secrets
+        path = '{0}.{1}'.format(node_template['name'], r['type'])
+        for operations in (r.get('source_operations', {}),
+                           r.get('target_operations', {})):
+            for properties in _operations_properties(
+                    operations,
+                    scope=NODE_TEMPLATE_RELATIONSHIP_SCOPE,
+                    context=context,
+                    path=path):
+                yield properties
 
-    for node_template in plan.node_templates:
-        scan_properties(node_template['properties'],
+
+def scan_node_operation_properties(node_template, handler, replace=False):
+    for value, scope, context, path in _node_operations_properties(
+            node_template):
+        scan_properties(value,
                         handler,
-                        scope=NODE_TEMPLATE_SCOPE,
-                        context=node_template,
-                        path='{0}.properties'.format(
-                            node_template['name']),
+                        scope=scope,
+                        context=context,
+                        path=path,
                         replace=replace)
+
+
+def _service_template_properties(plan):
+    """Yield (properties, scope, context, path) of a service template."""
+    for node_template in plan.node_templates:
+        yield (node_template['properties'],
+               NODE_TEMPLATE_SCOPE,
+               node_template,
+               '{0}.properties'.format(node_template['name']))
         for name, capability in node_template.get('capabilities', {}).items():
-            scan_properties(capability.get('properties', {}),
-                            handler,
-                            scope=NODE_TEMPLATE_SCOPE,
-                            context=node_template,
-                            path='{0}.capabilities.{1}'.format(
-                                node_template['name'],
-                                name),
-                            replace=replace)
-        scan_node_operation_properties(node_template, handler, replace=replace)
+            yield (capability.get('properties', {}),
+                   NODE_TEMPLATE_SCOPE,
+                   node_template,
+                   '{0}.capabilities.{1}'.format(node_template['name'], name))
+        for properties in _node_operations_properties(node_template):
+            yield properties
     for output_name, output in plan.outputs.iteritems():
-        scan_properties(output,
-                        handler,
-                        scope=OUTPUTS_SCOPE,
-                        context=plan.outputs,
-                        path='outputs.{0}'.format(output_name),
-                        replace=replace)
+        yield (output,
+               OUTPUTS_SCOPE,
+               plan.outputs,
+               'outputs.{0}'.format(output_name))
     for policy_name, policy in plan.get('policies', {}).items():
-        scan_properties(policy.get('properties', {}),
-                        handler,
-                        scope=POLICIES_SCOPE,
-                        context=policy,
-                        path='policies.{0}.properties'.format(policy_name),
-                        replace=replace)
+        yield (policy.get('properties', {}),
+               POLICIES_SCOPE,
+               policy,
+               'policies.{0}.properties'.format(policy_name))
     for group_name, scaling_group in plan.get('scaling_groups', {}).items():
-        scan_properties(scaling_group.get('properties', {}),
+        yield (scaling_group.get('properties', {}),
+               SCALING_GROUPS_SCOPE,
+               scaling_group,
+               'scaling_groups.{0}.properties'.format(group_name))
+
+
+def scan_service_template(plan,
+                          handler,
+                          replace=False,
+                          search_secrets=False,
+                          match=None):
+    global collect_secrets
+    collect_secrets = search_secrets
+
+    for value, scope, context, path in _service_template_properties(plan):
+        scan_properties(value,
                         handler,
-                        scope=SCALING_GROUPS_SCOPE,
-                        context=scaling_group,
-                        path='scaling_groups.{0}.properties'.format(
-                            group_name),
-                        replace=replace)
+                        scope=scope,
+                        context=context,
+                        path=path,
+                        replace=replace,
+                        match=match)
 
     if collect_secrets and len(secrets) > 0:
         plan['secrets'] = list(secrets)
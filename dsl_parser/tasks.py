@@ -16,7 +16,8 @@
 import copy
 import json
 
-from dsl_parser import (functions,
+from dsl_parser import (constants,
+                        functions,
                         exceptions,
                         scan,
                         models,
@@ -81,8 +82,11 @@ def _set_plan_inputs(plan, inputs=None):
 
 def _process_functions(plan):
     handler = functions.plan_evaluation_handler(plan)
-    scan.scan_service_template(
-        plan, handler, replace=True, search_secrets=True)
+    scan.scan_service_template(plan,
+                               handler,
+                               replace=True,
+                               search_secrets=True,
+                               match=functions.is_function)
 
 
 def _validate_secrets(plan, get_secret_method):
@@ -117,9 +121,13 @@ def prepare_deployment_plan(
         plan, get_secret_method=None, inputs=None, **kwargs):
     """
     Prepare a plan for deployment
+
+    The given plan is copied once, and expanded in place from then on, so
+    the returned plan shares nothing with it.
     """
     plan = models.Plan(copy.deepcopy(plan))
     _set_plan_inputs(plan, inputs)
     _process_functions(plan)
     _validate_secrets(plan, get_secret_method)
-    return multi_instance.create_deployment_plan(plan)
+    plan[constants.FUNCTIONS_INDEX] = functions.index_functions(plan)
+    return multi_instance.create_deployment_plan(plan, copy_plan=False)
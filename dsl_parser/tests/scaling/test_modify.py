@@ -681,6 +681,46 @@ class TestMultiInstanceModify(scaling.BaseTestMultiInstance):
         })
         self._assert_modification(modification, 0, 6, 0, 3)
 
+    def test_modified_contained_instances_kept_with_their_hosts(self):
+        yaml = self.BASE_BLUEPRINT + """
+    host:
+        type: cloudify.nodes.Compute
+        capabilities:
+            scalable:
+                properties:
+                    default_instances: 3
+    db:
+        type: db
+        capabilities:
+            scalable:
+                properties:
+                    default_instances: 2
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: host
+"""
+        plan = self.parse_multi(yaml)
+        nodes = plan['node_instances']
+        host_ids = self._node_ids(self._nodes_by_name(nodes, 'host'))
+        modification = self.modify_multi(plan, {
+            'db': {'instances': 3}
+        })
+        self._assert_modification(modification, 6, 0, 3, 0)
+        added = [instance for instance in modification['added_and_related']
+                 if instance.get('modification') == 'added']
+        self.assertEqual(sorted(host_ids),
+                         sorted(instance['host_id'] for instance in added))
+
+        modification = self.modify_multi(plan, {
+            'db': {'instances': 1}
+        })
+        self._assert_modification(modification, 0, 6, 0, 3)
+        removed = [instance for instance in
+                   modification['removed_and_related']
+                   if instance.get('modification') == 'removed']
+        self.assertEqual(sorted(host_ids),
+                         sorted(instance['host_id'] for instance in removed))
+
     def _test_base_nodes(self):
         return self.BASE_BLUEPRINT + """
             without_rel:
@@ -313,3 +313,55 @@ class TestSchemaValidation(testtools.TestCase):
             {'child': 'value'},
             TestElement,
             error_code=exceptions.ERROR_CODE_ILLEGAL_VALUE_ACCESS)
+
+    def test_keyed_predicate(self):
+        evaluated = []
+
+        @requirements.keyed_predicate(lambda source: source.initial_value)
+        def predicate(source, target):
+            evaluated.append(target.name)
+            return target.name in source.initial_value
+
+        class TestTarget(elements.Element):
+            schema = elements.Leaf(type=str)
+
+            def parse(self):
+                return self.name
+
+        class TestTargets(elements.Element):
+            schema = elements.Dict(type=TestTarget)
+
+        class TestSource(elements.Element):
+            schema = elements.Leaf(type=list)
+            requires = {
+                TestTarget: [requirements.Value('targets',
+                                                multiple_results=True,
+                                                predicate=predicate)]
+            }
+
+            def parse(self, targets):
+                return targets
+
+        class TestElement(elements.Element):
+            schema = {
+                'source': TestSource,
+                'targets': TestTargets
+            }
+
+            def parse(self):
+                return self.child(TestSource).value
+
+        targets = dict(('target_{0}'.format(i), '') for i in range(10))
+        result = parser.parse({'source': ['target_7', 'target_2'],
+                               'targets': targets},
+                              element_cls=TestElement)
+        self.assertEqual(['target_2', 'target_7'], sorted(result))
+        self.assertEqual(sorted(result), sorted(set(evaluated)))
+
+        # unhashable keys are matched by evaluating the predicate
+        del evaluated[:]
+        result = parser.parse({'source': [['target_7']],
+                               'targets': targets},
+                              element_cls=TestElement)
+        self.assertEqual([], result)
+        self.assertEqual(sorted(targets), sorted(set(evaluated)))
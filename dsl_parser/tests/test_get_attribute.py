@@ -499,6 +499,109 @@ class TestEvaluateFunctions(AbstractTestParser):
                                          None,
                                          None)
 
+    def test_scaling_group_ancestry_index_reused(self):
+        node_instances = {
+            'host_1': {'node_id': 'host', 'version': 1,
+                       'scaling_groups': [{'name': 'g', 'id': 'g_1'}]},
+            'host_2': {'node_id': 'host', 'version': 1,
+                       'scaling_groups': [{'name': 'g', 'id': 'g_2'}]},
+            'app_1': {'node_id': 'app', 'version': 1,
+                      'relationships': [{'target_name': 'host',
+                                         'target_id': 'host_1'}],
+                      'runtime_properties': {'key': 'value_1'}},
+            'app_2': {'node_id': 'app', 'version': 1,
+                      'relationships': [{'target_name': 'host',
+                                         'target_id': 'host_2'}],
+                      'runtime_properties': {'key': 'value_2'}},
+            'agent_1': {'node_id': 'agent', 'version': 1,
+                        'relationships': [{'target_name': 'host',
+                                           'target_id': 'host_1'}]},
+        }
+        for node_instance_id, node_instance in node_instances.items():
+            node_instance['id'] = node_instance_id
+        contained_in_host = Node({'relationships': [{
+            'target_id': 'host',
+            'type_hierarchy': [constants.CONTAINED_IN_REL_TYPE]}]})
+        nodes = {'host': Node({}),
+                 'app': contained_in_host,
+                 'agent': contained_in_host}
+        fetched = []
+        fetched_nodes = []
+
+        def get_node_instances(node_id):
+            return [NodeInstance(i) for i in node_instances.values()
+                    if i['node_id'] == node_id]
+
+        def get_node_instance(node_instance_id):
+            fetched.append(node_instance_id)
+            return NodeInstance(node_instances[node_instance_id])
+
+        def get_node(node_id):
+            fetched_nodes.append(node_id)
+            return nodes[node_id]
+
+        def evaluate():
+            payload = {'a': {'get_attribute': ['app', 'key']}}
+            functions.evaluate_functions(payload,
+                                         {'self': 'agent_1'},
+                                         get_node_instances,
+                                         get_node_instance,
+                                         get_node,
+                                         None,
+                                         index=index)
+            return payload['a']
+
+        index = functions.RuntimeEvaluationIndex()
+        self.assertEqual('value_1', evaluate())
+        self.assertIn('host_1', fetched)
+        self.assertIn('host_2', fetched)
+
+        del fetched[:]
+        del fetched_nodes[:]
+        self.assertEqual('value_1', evaluate())
+        self.assertEqual(['agent_1', 'host_1', 'host_2'], sorted(fetched))
+        self.assertEqual([], fetched_nodes)
+
+        # a new version of an instance is indexed again
+        node_instances['app_1']['version'] = 2
+        node_instances['app_1']['relationships'][0]['target_id'] = 'host_2'
+        node_instances['app_2']['version'] = 2
+        node_instances['app_2']['relationships'][0]['target_id'] = 'host_1'
+        self.assertEqual('value_2', evaluate())
+
+    def test_scaling_group_ancestry_index_checks_ancestors(self):
+        node_instances = {
+            'host_1': {'node_id': 'host', 'version': 1,
+                       'scaling_groups': [{'name': 'g', 'id': 'g_1'}]},
+            'app_1': {'node_id': 'app', 'version': 1,
+                      'relationships': [{'target_name': 'host',
+                                         'target_id': 'host_1'}]},
+        }
+        nodes = {'host': Node({}),
+                 'app': Node({'relationships': [{
+                     'target_id': 'host',
+                     'type_hierarchy': [constants.CONTAINED_IN_REL_TYPE]}]})}
+        index = functions.RuntimeEvaluationIndex()
+
+        def ancestry():
+            storage = functions.RuntimeEvaluationStorage(
+                get_node_instances_method=None,
+                get_node_instance_method=lambda node_instance_id:
+                    NodeInstance(dict(node_instances[node_instance_id],
+                                      id=node_instance_id)),
+                get_node_method=lambda node_id: nodes[node_id],
+                get_secret_method=None,
+                index=index)
+            return storage.get_scaling_group_ancestry('app_1')
+
+        self.assertEqual([('g', 'g_1')], ancestry())
+        # the host is scaled into another group instance, while the
+        # instance contained in it is unchanged
+        node_instances['host_1']['version'] = 2
+        node_instances['host_1']['scaling_groups'] = [{'name': 'g',
+                                                       'id': 'g_2'}]
+        self.assertEqual([('g', 'g_2')], ancestry())
+
 
 class NodeInstance(dict):
 
@@ -513,6 +616,10 @@ class NodeInstance(dict):
     def node_id(self):
         return self.get('node_id')
 
+    @property
+    def version(self):
+        return self.get('version')
+
     @property
     def runtime_properties(self):
         return self.get('runtime_properties')
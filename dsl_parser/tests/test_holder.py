@@ -0,0 +1,62 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import cPickle as pickle
+
+import testtools
+
+from dsl_parser.holder import Holder
+
+
+class TestHolder(testtools.TestCase):
+
+    def test_get_item(self):
+        holder = Holder.of({'a': 1, 'b': 2})
+        key_holder, value_holder = holder.get_item('a')
+        self.assertEqual('a', key_holder.value)
+        self.assertEqual(1, value_holder.value)
+        self.assertEqual((None, None), holder.get_item('c'))
+        self.assertIn('b', holder)
+        self.assertNotIn('c', holder)
+
+    def test_get_item_after_changes(self):
+        holder = Holder.of({'a': 1})
+        holder.get_item('a')
+        key_holder = Holder('b', start_line=3)
+        holder.value[key_holder] = Holder(2)
+        self.assertIs(key_holder, holder.get_item('b')[0])
+        holder.value = {Holder('c'): Holder(3)}
+        self.assertEqual((None, None), holder.get_item('a'))
+        self.assertEqual(3, holder.get_item('c')[1].value)
+
+    def test_get_item_not_dict(self):
+        self.assertRaises(ValueError, Holder.of([1]).get_item, 0)
+
+    def test_pickle(self):
+        holder = Holder.of({'a': [1, 2]}, filename='blueprint.yaml')
+        holder.get_item('a')
+        loaded = pickle.loads(pickle.dumps(holder, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual({'a': [1, 2]}, loaded.restore())
+        self.assertEqual('blueprint.yaml', loaded.get_item('a')[0].filename)
+
+    def test_unpickle_unslotted_state(self):
+        holder = Holder.__new__(Holder)
+        holder.__setstate__({'value': 'a',
+                             'start_line': 1,
+                             'start_column': 2,
+                             'end_line': 3,
+                             'end_column': 4,
+                             'filename': 'blueprint.yaml'})
+        self.assertEqual('a<1.2-3.4 [blueprint.yaml]>', str(holder))
@@ -13,6 +13,8 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import copy
+
 from dsl_parser.tasks import prepare_deployment_plan
 from dsl_parser.exceptions import (MissingRequiredInputError,
                                    UnknownInputError,
@@ -408,6 +410,73 @@ node_templates:
             target_ops['target_interface.op2']['inputs']['target_port'])
         self.assertEqual(8000, target_ops['op2']['inputs']['target_port'])
 
+    def test_prepare_leaves_plan_unchanged(self):
+        yaml = """
+plugins:
+    plugin:
+        executor: central_deployment_agent
+        source: dummy
+inputs:
+    port:
+        default: 8080
+node_types:
+    webserver_type:
+        properties:
+            port: {}
+            static: {}
+relationships:
+    cloudify.relationships.contained_in: {}
+node_templates:
+    host:
+        type: webserver_type
+        properties:
+            port: 22
+            static: [1, 2]
+    webserver:
+        type: webserver_type
+        properties:
+            port: { get_input: port }
+            static: [1, 2]
+        interfaces:
+            lifecycle:
+                configure:
+                    implementation: plugin.operation
+                    inputs:
+                        port: { get_input: port }
+                        address: { get_attribute: [host, ip] }
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: host
+outputs:
+    port:
+        value: { get_input: port }
+"""
+        parsed = self.parse(yaml)
+        original = copy.deepcopy(parsed)
+
+        prepared = prepare_deployment_plan(parsed)
+        self.assertEqual(original, parsed)
+        prepared = prepare_deployment_plan(parsed, inputs={'port': 8000})
+        self.assertEqual(original, parsed)
+
+        node_template = \
+            [x for x in prepared['nodes'] if x['name'] == 'webserver'][0]
+        self.assertEqual(8000, node_template['properties']['port'])
+        op = node_template['operations']['configure']
+        self.assertEqual(8000, op['inputs']['port'])
+        self.assertTrue(op['has_intrinsic_functions'])
+        self.assertEqual('host',
+                         node_template['relationships'][0]['target_id'])
+        self.assertEqual(8000, prepared['outputs']['port']['value'])
+
+        # the prepared plan shares nothing with the given plan
+        prepared['relationships'].clear()
+        for node in prepared['nodes']:
+            node['properties']['static'].append(3)
+            node['type_hierarchy'].append('changed')
+            node['operations'].clear()
+        self.assertEqual(original, parsed)
+
     def test_invalid_input_in_interfaces(self):
         yaml = """
 plugins:
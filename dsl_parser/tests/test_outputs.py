@@ -234,6 +234,86 @@ outputs:
                          'valueinput_valuesecret_valuesix',
                          o['concatenated'])
 
+    def test_evaluation_by_functions_index(self):
+        yaml = """
+node_types:
+    webserver_type:
+        properties:
+            port: {}
+node_templates:
+    webserver:
+        type: webserver_type
+        properties:
+            port: {get_secret: port}
+        interfaces:
+            test:
+                op:
+                    implementation: test.task
+                    inputs:
+                        plain: value
+                        port: {get_attribute: [SELF, port]}
+                        url:
+                            concat: [host, {get_attribute: [SELF, port]}]
+plugins:
+    test:
+        executor: central_deployment_agent
+        install: false
+outputs:
+    plain:
+        value: [1, 2]
+    port:
+        value: { get_attribute: [ webserver, port ] }
+    endpoint:
+        value:
+            - host
+            - port: { get_attribute: [ webserver, port ] }
+"""
+        parsed = prepare_deployment_plan(self.parse_1_1(yaml),
+                                         self._get_secret_mock)
+        functions_index = parsed['functions_index']
+        operation_paths = [['port'], ['url'], ['url', 'concat', 1]]
+        webserver_index = functions_index['nodes']['webserver']
+        for name in ('op', 'test.op'):
+            webserver_index['operations'][name].sort()
+        self.assertEqual({
+            'nodes': {
+                'webserver': {
+                    'properties': [['port']],
+                    'operations': {'op': operation_paths,
+                                   'test.op': operation_paths}
+                }
+            },
+            'outputs': {
+                'port': [[]],
+                'endpoint': [[1, 'port']]
+            }
+        }, functions_index)
+        # the nested function is evaluated with the one containing it
+        operation = parsed['nodes'][0]['operations']['test.op']
+        self.assertEqual([['port'], ['url']],
+                         sorted(operation['function_paths']))
+
+        def get_node_instances(node_id=None):
+            return [NodeInstance({'id': 'webserver1',
+                                  'node_id': 'webserver',
+                                  'runtime_properties': {'port': 8080}})]
+
+        def get_node_instance(node_instance_id):
+            return get_node_instances()[0]
+
+        def get_node(node_id):
+            return Node({'id': node_id})
+
+        o = functions.evaluate_outputs(parsed['outputs'],
+                                       get_node_instances,
+                                       get_node_instance,
+                                       get_node,
+                                       self._get_secret_mock,
+                                       functions_index=functions_index)
+        self.assertEqual({'plain': [1, 2],
+                          'port': 8080,
+                          'endpoint': ['host', {'port': 8080}]}, o)
+
     def test_unknown_node_instance_evaluation(self):
         yaml = """
 node_types:
@@ -13,6 +13,12 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import time
+import threading
+
+import mock
+
+from dsl_parser.elements import imports
 from dsl_parser.tests.abstract_test_parser import AbstractTestParser
 from dsl_parser.import_resolver.abstract_import_resolver import \
     AbstractImportResolver
@@ -61,3 +67,116 @@ imports:
         self.assertEqual(len(urls), 2)
         self.assertIn('http://url1', urls)
         self.assertIn('http://url2', urls)
+
+    def test_parse_fetches_sibling_imports_concurrently(self):
+        yaml_to_parse = """
+imports:
+    -   http://url1
+    -   http://url2
+    -   http://url3
+node_templates:
+    node_1:
+        type: type_1
+    node_2:
+        type: type_2
+    node_3:
+        type: type_3
+    node_4:
+        type: type_4
+"""
+        imported = {
+            'http://url1': """
+imports:
+    -   http://url4
+node_types:
+    type_1: {}
+""",
+            'http://url2': """
+imports:
+    -   http://url4
+node_types:
+    type_2: {}
+""",
+            'http://url3': """
+node_types:
+    type_3: {}
+""",
+            'http://url4': """
+node_types:
+    type_4: {}
+"""
+        }
+        lock = threading.Lock()
+        fetching = []
+        concurrency = []
+
+        class SlowResolver(AbstractImportResolver):
+            concurrent_fetch = True
+
+            def resolve(self, url):
+                with lock:
+                    fetching.append(url)
+                    concurrency.append(len(fetching))
+                time.sleep(0.1)
+                with lock:
+                    fetching.remove(url)
+                return imported[url]
+
+        with mock.patch.object(imports, 'MAX_CONCURRENT_IMPORTS', 1):
+            sequential_plan = self.parse(yaml_to_parse,
+                                         resolver=SlowResolver())
+        self.assertEqual(1, max(concurrency))
+        del concurrency[:]
+        plan = self.parse(yaml_to_parse, resolver=SlowResolver())
+
+        self.assertEqual(len(imported), len(concurrency))
+        self.assertGreater(max(concurrency), 1)
+        self.assertEqual(sequential_plan, plan)
+        self.assertEqual(['node_1', 'node_2', 'node_3', 'node_4'],
+                         sorted(node['id'] for node in plan['nodes']))
+
+    def test_parse_fetches_sequentially_unless_resolver_allows(self):
+        yaml_to_parse = """
+imports:
+    -   http://url1
+    -   http://url2"""
+        threads = set()
+
+        class CustomResolver(AbstractImportResolver):
+            def resolve(self, url):
+                threads.add(threading.current_thread())
+                return BLUEPRINT_1 if url == 'http://url1' else BLUEPRINT_2
+
+        self.parse(yaml_to_parse, resolver=CustomResolver())
+        self.assertEqual(set([threading.current_thread()]), threads)
+
+    def test_parse_skips_fetching_after_failed_import(self):
+        yaml_to_parse = """
+imports:
+    -   http://url1
+    -   http://url2"""
+        imported = {
+            'http://url2': """
+imports:
+    -   http://url3
+"""
+        }
+        fetched = []
+
+        class FailingResolver(AbstractImportResolver):
+            concurrent_fetch = True
+
+            def resolve(self, url):
+                fetched.append(url)
+                if url not in imported:
+                    raise RuntimeError('cannot fetch {0}'.format(url))
+                return imported[url]
+
+        self.assertRaises(RuntimeError, self.parse, yaml_to_parse,
+                          resolver=FailingResolver())
+        self.assertNotIn('http://url3', fetched)
+        del fetched[:]
+        with mock.patch.object(imports, 'MAX_CONCURRENT_IMPORTS', 1):
+            self.assertRaises(RuntimeError, self.parse, yaml_to_parse,
+                              resolver=FailingResolver())
+        self.assertEqual(['http://url1'], fetched)
@@ -0,0 +1,114 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+
+from mock import patch
+
+from dsl_parser import utils
+from dsl_parser.cache import BlueprintCache
+from dsl_parser.parser import parse_from_path
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+
+
+class TestParserCache(AbstractTestParser):
+
+    def setUp(self):
+        super(TestParserCache, self).setUp()
+        self.types_path = self.make_yaml_file(
+            self.BASIC_VERSION_SECTION_DSL_1_3 + self.BASIC_PLUGIN +
+            self.BASIC_TYPE)
+
+    def _make_blueprint(self, node_templates):
+        return self.make_yaml_file("""
+tosca_definitions_version: cloudify_dsl_1_3
+imports:
+    -   {0}
+""".format(self.types_path) + node_templates)
+
+    def _parse(self, path, cache):
+        with patch('dsl_parser.cache.utils.load_yaml',
+                   side_effect=utils.load_yaml) as load_yaml:
+            plan = parse_from_path(path, cache=cache)
+        return plan, load_yaml.call_count
+
+    def test_plan_cached(self):
+        cache = BlueprintCache()
+        path = self._make_blueprint(self.BASIC_NODE_TEMPLATES_SECTION)
+        plan, loads = self._parse(path, cache)
+        self.assertEqual(2, loads)
+        cached_plan, loads = self._parse(path, cache)
+        self.assertEqual(0, loads)
+        self.assertEqual(plan, cached_plan)
+        self.assertEqual(parse_from_path(path), cached_plan)
+        self.assertEqual(1, cache.stats()['plans']['hits'])
+
+        # cached plans are copies
+        cached_plan['nodes'][0]['id'] = 'changed'
+        self.assertEqual('test_node', self._parse(path, cache)[0]
+                         ['nodes'][0]['id'])
+
+    def test_imports_shared_between_blueprints(self):
+        cache = BlueprintCache()
+        self._parse(self._make_blueprint(self.BASIC_NODE_TEMPLATES_SECTION),
+                    cache)
+        plan, loads = self._parse(self._make_blueprint("""
+node_templates:
+    other_node:
+        type: test_type
+        properties:
+            key: "val"
+"""), cache)
+        # only the main blueprint is loaded, the types are reused
+        self.assertEqual(1, loads)
+        self.assertEqual(['other_node'], [n['id'] for n in plan['nodes']])
+        self.assertEqual(0, cache.stats()['plans']['hits'])
+
+    def test_changed_import_invalidates_plan(self):
+        cache = BlueprintCache()
+        path = self._make_blueprint(self.BASIC_NODE_TEMPLATES_SECTION)
+        self._parse(path, cache)
+        with open(self.types_path, 'a') as f:
+            f.write("""
+    other_type:
+        properties: {}
+""")
+        _, loads = self._parse(path, cache)
+        # only the changed types are loaded again
+        self.assertEqual(1, loads)
+        self.assertEqual(0, cache.stats()['plans']['hits'])
+        self.assertEqual(1, cache.stats()['documents']['hits'])
+
+    def test_disk_cache(self):
+        directory = os.path.join(self._temp_dir, 'cache')
+        path = self._make_blueprint(self.BASIC_NODE_TEMPLATES_SECTION)
+        plan, _ = self._parse(path, BlueprintCache(directory=directory))
+
+        cache = BlueprintCache(directory=directory)
+        cached_plan, loads = self._parse(path, cache)
+        self.assertEqual(0, loads)
+        self.assertEqual(plan, cached_plan)
+        self.assertEqual(3, cache.stats()['disk_hits'])
+
+    def test_lru_eviction(self):
+        cache = BlueprintCache(max_plans=1)
+        first = self._make_blueprint(self.BASIC_NODE_TEMPLATES_SECTION)
+        second = self._make_blueprint('node_templates: {}\n')
+        self._parse(first, cache)
+        self._parse(second, cache)
+        self._parse(first, cache)
+        stats = cache.stats()['plans']
+        self.assertEqual(0, stats['hits'])
+        self.assertEqual(1, stats['size'])
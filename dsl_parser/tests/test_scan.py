@@ -0,0 +1,120 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import testtools
+
+from dsl_parser import functions
+from dsl_parser import scan
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+
+
+class TestScanProperties(testtools.TestCase):
+
+    def _scan(self, value, **kwargs):
+        visited = []
+
+        def handler(v, scope, context, path):
+            visited.append((v, path))
+            return v
+        scan.scan_properties(value, handler, path='p', **kwargs)
+        return visited
+
+    def test_visit_order_and_paths(self):
+        value = {'a': [1, {'b': [{'c': 2}]}]}
+        self.assertEqual([
+            (value['a'], 'p.a'),
+            (1, 'p.a[0]'),
+            (value['a'][1], 'p.a[1]'),
+            (value['a'][1]['b'], 'p.a.b'),
+            ({'c': 2}, 'p.a.b[0]'),
+            (2, 'p.a.b.c'),
+        ], self._scan(value))
+
+    def test_not_recursive(self):
+        value = {'a': {'b': 1}}
+        self.assertEqual([({'b': 1}, 'p.a')],
+                         self._scan(value, recursive=False))
+
+    def test_match(self):
+        value = {'a': [{'get_input': 'x'}, {'b': {'get_input': 'y'}}]}
+        self.assertEqual([
+            ({'get_input': 'x'}, 'p.a[0]'),
+            ({'get_input': 'y'}, 'p.a.b'),
+        ], self._scan(value, match=functions.is_function))
+
+    def test_replace(self):
+        value = {'a': [1, 2], 'b': 1}
+
+        def handler(v, scope, context, path):
+            return v + 1 if isinstance(v, int) else v
+        scan.scan_properties(value, handler, replace=True)
+        self.assertEqual({'a': [2, 3], 'b': 2}, value)
+
+
+class TestScanPaths(testtools.TestCase):
+
+    def test_find_paths(self):
+        value = {'a': [1, {'get_input': {'get_input': 'x'}}],
+                 'b': {'c': {'get_input': 'y'}}}
+        self.assertEqual(
+            sorted([['a', 1], ['a', 1, 'get_input'], ['b', 'c']]),
+            sorted(scan.find_paths(value, match=functions.is_function)))
+
+    def test_scan_paths(self):
+        value = {'a': [1, {'b': 2}], 'c': 3, 'd': {'e': 4}}
+        visited = []
+
+        def handler(v, scope, context, path):
+            visited.append(path)
+            return 'replaced' if v == {'e': 4} else v
+        scan.scan_paths(value,
+                        [['a', 1, 'b'], ['missing', 'x'], ['d'], ['d', 'e']],
+                        handler,
+                        path='p',
+                        replace=True)
+        self.assertEqual(['p.a[1].b', 'p.d'], visited)
+        self.assertEqual('replaced', value['d'])
+
+
+class TestFindSites(AbstractTestParser):
+
+    def test_find_sites(self):
+        yaml = self.BASIC_VERSION_SECTION_DSL_1_3 + """
+inputs:
+    port: {}
+node_types:
+    type:
+        properties:
+            port: {}
+            settings: {}
+node_templates:
+    node:
+        type: type
+        properties:
+            port: {get_input: port}
+            settings:
+                plain: [1, 2]
+outputs:
+    out:
+        value: {get_attribute: [node, address]}
+"""
+        plan = self.parse(yaml)
+        sites = scan.find_sites(plan, match=functions.is_function)
+        self.assertEqual(
+            [('node.properties.port', scan.NODE_TEMPLATE_SCOPE),
+             ('outputs.out.value', scan.OUTPUTS_SCOPE)],
+            [(site.path, site.scope) for site in sites])
+        sites[1].value = 'replaced'
+        self.assertEqual('replaced', plan['outputs']['out']['value'])
@@ -0,0 +1,104 @@
+########
+# Copyright (c) 2018 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import testtools
+from yaml.parser import ParserError
+from yaml.scanner import ScannerError
+
+from dsl_parser import yaml_loader
+from dsl_parser.exceptions import DSLParsingInputTypeException
+
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_3
+node_types:
+    my_type:
+        properties:
+            prop1: &default
+                default: [1, 2.5, true, null]
+            prop2: *default
+node_templates:
+    node:
+        type: my_type
+        properties:
+            prop1: 'quoted'
+            prop2: |
+                multi
+                line
+"""
+
+
+def _flatten(holder, result=None):
+    if result is None:
+        result = []
+    result.append((holder.start_line, holder.start_column,
+                   holder.end_line, holder.end_column, holder.filename))
+    if isinstance(holder.value, dict):
+        for key, value in sorted(holder.value.items(),
+                                 key=lambda item: item[0].start_line):
+            _flatten(key, result)
+            _flatten(value, result)
+    elif isinstance(holder.value, list):
+        for item in holder.value:
+            _flatten(item, result)
+    else:
+        result.append(holder.value)
+    return result
+
+
+@testtools.skipIf(yaml_loader.CMarkedLoader is None, 'libyaml is missing')
+class TestCMarkedLoader(testtools.TestCase):
+
+    def test_same_holders_as_pure_python_loader(self):
+        expected = yaml_loader.load(BLUEPRINT, 'bp.yaml', use_libyaml=False)
+        loaded = yaml_loader.load(BLUEPRINT, 'bp.yaml')
+        self.assertEqual(expected.restore(), loaded.restore())
+        self.assertEqual(_flatten(expected), _flatten(loaded))
+
+    def test_empty_document(self):
+        self.assertEqual({}, yaml_loader.load('', 'bp.yaml').restore())
+
+    def test_illegal_characters(self):
+        e = self.assertRaises(DSLParsingInputTypeException,
+                              yaml_loader.load,
+                              'key: \xd7\x90', 'bp.yaml')
+        self.assertIn('line: 0, column: 5', str(e))
+
+
+class TestLoadErrors(testtools.TestCase):
+    """Errors show the offending line, whichever loader is used"""
+
+    def test_parser_error_shows_line(self):
+        e = self.assertRaises(ParserError, yaml_loader.load,
+                              'a: [1, 2\nb: 3', 'bp.yaml')
+        self.assertEqual(
+            'while parsing a flow sequence\n'
+            '  in "<string>", line 1, column 4:\n'
+            '    a: [1, 2\n'
+            '       ^\n'
+            'expected \',\' or \']\', but got \':\'\n'
+            '  in "<string>", line 2, column 2:\n'
+            '    b: 3\n'
+            '     ^', str(e))
+
+    def test_scanner_error_shows_line(self):
+        e = self.assertRaises(ScannerError, yaml_loader.load,
+                              'a:\n\tb: 1', 'bp.yaml')
+        self.assertEqual(
+            'while scanning for the next token\n'
+            'found character \'\\t\' that cannot start any token\n'
+            '  in "<string>", line 2, column 1:\n'
+            '    \tb: 1\n'
+            '    ^', str(e))
@@ -13,12 +13,18 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+from yaml.error import YAMLError
 from yaml.reader import Reader
 from yaml.scanner import Scanner
 from yaml.composer import Composer
 from yaml.resolver import Resolver
 from yaml.parser import Parser
 from yaml.constructor import SafeConstructor
+try:
+    from yaml.cyaml import CParser
+except ImportError:
+    # PyYAML was built without libyaml
+    CParser = None
 
 from dsl_parser import holder
 from .exceptions import DSLParsingInputTypeException, ERROR_INVALID_CHARS
@@ -155,8 +161,34 @@ class MarkedLoader(Reader, Scanner, Parser, Composer, HolderConstructor,
         Resolver.__init__(self)
 
 
-def load(stream, filename):
-    result = MarkedLoader(stream, filename).get_single_data()
+if CParser is not None:
+    class CMarkedLoader(CParser, HolderConstructor, Resolver):
+        """A MarkedLoader whose reading, scanning, parsing and composing
+        are done by libyaml, keeping the node marks"""
+
+        def __init__(self, stream, filename=None):
+            CParser.__init__(self, stream)
+            HolderConstructor.__init__(self, filename)
+            Resolver.__init__(self)
+else:
+    CMarkedLoader = None
+
+
+def load(stream, filename, use_libyaml=True):
+    """Load a YAML document into holders.
+
+    :param use_libyaml: Load using libyaml when it is available, falling
+                        back to the pure python loader otherwise. Documents
+                        libyaml fails to load are loaded again by the pure
+                        python loader, whose errors show the offending line.
+    """
+    if use_libyaml and CMarkedLoader is not None:
+        try:
+            result = CMarkedLoader(stream, filename).get_single_data()
+        except YAMLError:
+            result = MarkedLoader(stream, filename).get_single_data()
+    else:
+        result = MarkedLoader(stream, filename).get_single_data()
     if result is None:
         # load of empty string returns None so we convert it to an empty
         # dict